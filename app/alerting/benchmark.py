@@ -0,0 +1,112 @@
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from app.alerting.rules import RuleEngine
+from app.models import AlertRule
+
+SENSOR_TYPES = [
+    "temperature",
+    "humidity",
+    "light",
+    "soil_moisture",
+    "co2",
+    "voc",
+    "nox",
+]
+
+
+def build_engine(n_rules: int, n_sensors: int) -> RuleEngine:
+    sensors = [
+        (sid, sid // 7, SENSOR_TYPES[sid % 7]) for sid in range(1, n_sensors + 1)
+    ]
+    rules = []
+    for rid in range(1, n_rules + 1):
+        kind = rid % 4
+        if kind == 0:
+            rule = AlertRule(
+                id=rid,
+                name=f"rate {rid}",
+                rule_type="rate_of_change",
+                sensor_id=random.randint(1, n_sensors),
+                params=json.dumps({"max_delta": 5, "window_minutes": 10}),
+            )
+        elif kind == 1:
+            rule = AlertRule(
+                id=rid,
+                name=f"sustained {rid}",
+                rule_type="sustained",
+                sensor_id=random.randint(1, n_sensors),
+                params=json.dumps(
+                    {"op": "below", "threshold": 20, "window_minutes": 30}
+                ),
+            )
+        elif kind == 2:
+            rule = AlertRule(
+                id=rid,
+                name=f"no data {rid}",
+                rule_type="no_data",
+                sensor_id=random.randint(1, n_sensors),
+                params=json.dumps({"window_minutes": 15}),
+            )
+        else:
+            rule = AlertRule(
+                id=rid,
+                name=f"cross {rid}",
+                rule_type="cross_sensor",
+                parcel_id=random.randint(0, n_sensors // 7),
+                params=json.dumps(
+                    {
+                        "conditions": [
+                            {
+                                "sensor_type": "temperature",
+                                "op": "above",
+                                "threshold": 30,
+                            },
+                            {"sensor_type": "humidity", "op": "below", "threshold": 40},
+                        ]
+                    }
+                ),
+            )
+        rules.append(rule)
+    engine = RuleEngine()
+    engine.compile(rules, sensors)
+    return engine
+
+
+def run(n_rules: int, n_sensors: int, n_readings: int) -> dict:
+    random.seed(42)
+    engine = build_engine(n_rules, n_sensors)
+    start_ts = datetime(2025, 1, 1)
+    readings = [
+        (
+            random.randint(1, n_sensors),
+            random.gauss(25, 8),
+            start_ts + timedelta(seconds=i * 0.1),
+        )
+        for i in range(n_readings)
+    ]
+    hits = 0
+    t0 = time.perf_counter()
+    for sensor_id, value, ts in readings:
+        hits += len(engine.evaluate(sensor_id, value, ts))
+    hits += len(engine.scan(readings[-1][2] + timedelta(minutes=20)))
+    elapsed = time.perf_counter() - t0
+    return {
+        "rules": n_rules,
+        "sensors": n_sensors,
+        "readings": n_readings,
+        "seconds": round(elapsed, 3),
+        "readings_per_second": round(n_readings / elapsed),
+        "rule_evaluations": hits,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the alert rule engine")
+    parser.add_argument("--rules", type=int, default=1000)
+    parser.add_argument("--sensors", type=int, default=700)
+    parser.add_argument("--readings", type=int, default=100000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rules, args.sensors, args.readings), indent=2))
\ No newline at end of file
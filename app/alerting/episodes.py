@@ -0,0 +1,197 @@
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from sqlmodel import select, update
+from app.models import Alert, Sensor
+from app.metrics import ALERTS_CREATED
+
+HYSTERESIS_RATIO = 0.02
+
+
+@dataclass
+class Episode:
+    alert_id: int
+    peak_value: float
+    reading_count: int
+    last_seen: datetime
+
+
+class EpisodeTracker:
+    """
+    Keeps the open alert episode per (sensor_id, source) in memory so that a
+    reading only costs a dict lookup, plus an UPDATE while the episode is open.
+
+    The alert worker observes from its own thread while the event loop
+    forgets and invalidates, so the map is only ever changed in place.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._open: dict[tuple[int, str], Episode] = {}
+        self._loaded = False
+
+    def ensure_loaded(self, session):
+        with self._lock:
+            if self._loaded:
+                return
+            rows = session.exec(
+                select(Alert).where(Alert.closed_at == None, Alert.source != None)
+            ).all()
+            self._open = {
+                (a.sensor_id, a.source): Episode(
+                    alert_id=a.id,
+                    peak_value=a.peak_value if a.peak_value is not None else 0.0,
+                    reading_count=a.reading_count,
+                    last_seen=a.last_seen or a.timestamp,
+                )
+                for a in rows
+            }
+            self._loaded = True
+        logging.info(f"Loaded {len(rows)} open alert episodes.")
+
+    def invalidate(self):
+        """Drop the cache; it is reloaded from the database on next use."""
+        with self._lock:
+            self._open = {}
+            self._loaded = False
+
+    def forget(self, alert_ids: set[int]):
+        with self._lock:
+            for key, ep in list(self._open.items()):
+                if ep.alert_id in alert_ids:
+                    del self._open[key]
+
+    def is_open(self, sensor_id: int, source: str) -> bool:
+        return (sensor_id, source) in self._open
+
+    def observe(
+        self,
+        session,
+        sensor_id: int,
+        source: str,
+        value: float,
+        ts: datetime,
+        breached: bool,
+        cleared: bool,
+        severity: str,
+        message: str,
+        higher_is_worse: bool = True,
+    ) -> Optional[Alert]:
+        """
+        Feed one reading into the episode for (sensor_id, source).
+        Opens an episode on the first breach, folds later breaches into it and
+        closes it once the reading is `cleared`. Returns the Alert when opened.
+        """
+        self.ensure_loaded(session)
+        key = (sensor_id, source)
+        episode = self._open.get(key)
+        if episode is None:
+            if not breached:
+                return None
+            alert = Alert(
+                sensor_id=sensor_id,
+                timestamp=ts,
+                severity=severity,
+                message=message,
+                is_active=True,
+                source=source,
+                reading_count=1,
+                peak_value=value,
+                last_seen=ts,
+            )
+            session.add(alert)
+            session.flush()
+            ALERTS_CREATED.inc(source.partition(":")[0], severity)
+            self._open[key] = Episode(
+                alert_id=alert.id, peak_value=value, reading_count=1, last_seen=ts
+            )
+            return alert
+        if breached:
+            worse = (
+                value > episode.peak_value
+                if higher_is_worse
+                else value < episode.peak_value
+            )
+            if worse:
+                episode.peak_value = value
+            episode.reading_count += 1
+            episode.last_seen = ts
+            session.exec(
+                update(Alert)
+                .where(Alert.id == episode.alert_id)
+                .values(
+                    reading_count=episode.reading_count,
+                    peak_value=episode.peak_value,
+                    last_seen=ts,
+                )
+            )
+        elif cleared:
+            session.exec(
+                update(Alert).where(Alert.id == episode.alert_id).values(closed_at=ts)
+            )
+            self._open.pop(key, None)
+        return None
+
+
+def hysteresis_margin(sensor: Sensor) -> float:
+    if sensor.hysteresis is not None:
+        return sensor.hysteresis
+    if sensor.threshold_min is not None and sensor.threshold_max is not None:
+        return abs(sensor.threshold_max - sensor.threshold_min) * HYSTERESIS_RATIO
+    bound = (
+        sensor.threshold_min
+        if sensor.threshold_min is not None
+        else sensor.threshold_max
+    )
+    return abs(bound or 0.0) * HYSTERESIS_RATIO
+
+
+def check_thresholds(
+    session,
+    tracker: EpisodeTracker,
+    sensor: Sensor,
+    value: float,
+    unit: str,
+    ts: datetime,
+) -> list[Alert]:
+    """Run the min/max threshold episodes for one reading."""
+    tracker.ensure_loaded(session)
+    opened = []
+    margin = hysteresis_margin(sensor)
+    if sensor.threshold_min is not None or tracker.is_open(sensor.id, "threshold_min"):
+        limit = sensor.threshold_min
+        alert = tracker.observe(
+            session,
+            sensor.id,
+            "threshold_min",
+            value,
+            ts,
+            breached=limit is not None and value < limit,
+            cleared=limit is None or value >= limit + margin,
+            severity="warning",
+            message=f"Value {value} {unit} is below minimum threshold {limit}",
+            higher_is_worse=False,
+        )
+        if alert:
+            opened.append(alert)
+    if sensor.threshold_max is not None or tracker.is_open(sensor.id, "threshold_max"):
+        limit = sensor.threshold_max
+        alert = tracker.observe(
+            session,
+            sensor.id,
+            "threshold_max",
+            value,
+            ts,
+            breached=limit is not None and value > limit,
+            cleared=limit is None or value <= limit - margin,
+            severity="warning",
+            message=f"Value {value} {unit} is above maximum threshold {limit}",
+        )
+        if alert:
+            opened.append(alert)
+    return opened
+
+
+tracker = EpisodeTracker()
\ No newline at end of file
@@ -0,0 +1,459 @@
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlmodel import select
+from app.models import AlertRule, Sensor
+
+RULE_TYPES = ("rate_of_change", "sustained", "no_data", "cross_sensor")
+OPS = ("below", "above")
+RELOAD_INTERVAL = 60
+
+
+def _minutes(params: dict, key: str, default: float) -> float:
+    minutes = float(params.get(key, default))
+    if minutes <= 0:
+        raise ValueError(f"{key} must be positive")
+    return minutes
+
+
+def _op(value) -> str:
+    if value not in OPS:
+        raise ValueError(f"op must be one of {', '.join(OPS)}")
+    return value
+
+
+def parse_params(rule_type: str, params: dict) -> dict:
+    """
+    Typed parameters of a rule, with defaults filled in. Raises ValueError
+    naming the first missing or invalid parameter.
+    """
+    if "minutes" in params:
+        raise ValueError("unknown parameter 'minutes', use window_minutes")
+    try:
+        if rule_type == "rate_of_change":
+            return {
+                "max_delta": float(params["max_delta"]),
+                "minutes": _minutes(params, "window_minutes", 10),
+            }
+        if rule_type == "sustained":
+            return {
+                "op": _op(params.get("op", "below")),
+                "threshold": float(params["threshold"]),
+                "minutes": _minutes(params, "window_minutes", 30),
+            }
+        if rule_type == "no_data":
+            return {"minutes": _minutes(params, "window_minutes", 15)}
+        if rule_type == "cross_sensor":
+            conditions = [
+                (str(c["sensor_type"]), _op(c["op"]) == "below", float(c["threshold"]))
+                for c in params["conditions"]
+            ]
+            if not conditions:
+                raise ValueError("conditions must not be empty")
+            return {
+                "conditions": conditions,
+                "max_age_minutes": _minutes(params, "max_age_minutes", 15),
+            }
+    except KeyError as e:
+        raise ValueError(f"missing parameter {e}") from e
+    except TypeError as e:
+        raise ValueError(f"invalid parameter: {e}") from e
+    raise ValueError(f"Unknown rule type {rule_type}")
+
+
+@dataclass
+class RuleHit:
+    rule_id: int
+    sensor_id: int
+    value: float
+    ts: datetime
+    breached: bool
+    cleared: bool
+    severity: str
+    message: str
+    higher_is_worse: bool = True
+
+
+def rename_duration_params(session):
+    """Move stored rules from the old `minutes` parameter to window_minutes."""
+    for rule in session.exec(select(AlertRule)).all():
+        params = json.loads(rule.params or "{}")
+        if "minutes" not in params:
+            continue
+        params.setdefault("window_minutes", params["minutes"])
+        del params["minutes"]
+        rule.params = json.dumps(params)
+        session.add(rule)
+
+
+class RateOfChangeRule:
+    """max - min over a sliding time window, kept with monotonic deques."""
+
+    __slots__ = (
+        "rule_id",
+        "severity",
+        "max_delta",
+        "minutes",
+        "window",
+        "_mins",
+        "_maxs",
+    )
+
+    def __init__(self, rule_id: int, severity: str, max_delta: float, minutes: float):
+        self.rule_id = rule_id
+        self.severity = severity
+        self.max_delta = max_delta
+        self.minutes = minutes
+        self.window = timedelta(minutes=minutes)
+        self._mins: deque = deque()
+        self._maxs: deque = deque()
+
+    def inherit(self, previous: "RateOfChangeRule"):
+        # Expired samples fall out on the next update if the window shrank.
+        self._mins = previous._mins
+        self._maxs = previous._maxs
+
+    def update(self, sensor_id: int, value: float, ts: datetime) -> RuleHit:
+        mins, maxs = self._mins, self._maxs
+        while mins and mins[-1][1] >= value:
+            mins.pop()
+        mins.append((ts, value))
+        while maxs and maxs[-1][1] <= value:
+            maxs.pop()
+        maxs.append((ts, value))
+        cutoff = ts - self.window
+        while mins[0][0] < cutoff:
+            mins.popleft()
+        while maxs[0][0] < cutoff:
+            maxs.popleft()
+        delta = maxs[0][1] - mins[0][1]
+        breached = delta > self.max_delta
+        return RuleHit(
+            self.rule_id,
+            sensor_id,
+            round(delta, 2),
+            ts,
+            breached=breached,
+            cleared=not breached,
+            severity=self.severity,
+            message=f"Changed by {delta:.2f} within {self.minutes:g} min (limit {self.max_delta})"
+            if breached
+            else "",
+        )
+
+
+class SustainedRule:
+    """Condition held continuously for at least `minutes`."""
+
+    __slots__ = (
+        "rule_id",
+        "severity",
+        "below",
+        "threshold",
+        "duration",
+        "message",
+        "_since",
+    )
+
+    def __init__(
+        self, rule_id: int, severity: str, op: str, threshold: float, minutes: float
+    ):
+        self.rule_id = rule_id
+        self.severity = severity
+        self.below = op == "below"
+        self.threshold = threshold
+        self.duration = timedelta(minutes=minutes)
+        self.message = f"Value {op} {threshold} for {minutes:g} min"
+        self._since: Optional[datetime] = None
+
+    def inherit(self, previous: "SustainedRule"):
+        if (previous.below, previous.threshold) == (self.below, self.threshold):
+            self._since = previous._since
+
+    def update(self, sensor_id: int, value: float, ts: datetime) -> RuleHit:
+        holds = value < self.threshold if self.below else value > self.threshold
+        if not holds:
+            self._since = None
+        elif self._since is None:
+            self._since = ts
+        breached = holds and ts - self._since >= self.duration
+        return RuleHit(
+            self.rule_id,
+            sensor_id,
+            value,
+            ts,
+            breached=breached,
+            cleared=not holds,
+            severity=self.severity,
+            message=self.message,
+            higher_is_worse=not self.below,
+        )
+
+
+class NoDataRule:
+    __slots__ = ("rule_id", "severity", "sensor_id", "timeout", "message", "stale")
+
+    def __init__(self, rule_id: int, severity: str, sensor_id: int, minutes: float):
+        self.rule_id = rule_id
+        self.severity = severity
+        self.sensor_id = sensor_id
+        self.timeout = timedelta(minutes=minutes)
+        self.message = f"No data received for {minutes:g} min"
+        self.stale = False
+
+    def inherit(self, previous: "NoDataRule"):
+        self.stale = previous.stale
+
+
+class CrossSensorRule:
+    """All conditions true on the latest readings of a parcel's sensor types."""
+
+    __slots__ = (
+        "rule_id",
+        "severity",
+        "parcel_id",
+        "anchor_sensor_id",
+        "conditions",
+        "max_age",
+        "message",
+    )
+
+    def __init__(
+        self,
+        rule_id: int,
+        severity: str,
+        parcel_id: int,
+        anchor_sensor_id: int,
+        conditions: list[tuple[str, bool, float]],
+        max_age_minutes: float,
+    ):
+        self.rule_id = rule_id
+        self.severity = severity
+        self.parcel_id = parcel_id
+        self.anchor_sensor_id = anchor_sensor_id
+        self.conditions = conditions
+        self.max_age = timedelta(minutes=max_age_minutes)
+        parts = " and ".join(
+            f"{t} {'below' if b else 'above'} {th}" for t, b, th in conditions
+        )
+        self.message = f"Parcel condition met: {parts}"
+
+    def update(self, latest: dict, value: float, ts: datetime) -> RuleHit:
+        breached = True
+        for sensor_type, below, threshold in self.conditions:
+            reading = latest.get((self.parcel_id, sensor_type))
+            if reading is None or ts - reading[1] > self.max_age:
+                breached = False
+                break
+            if (reading[0] >= threshold) if below else (reading[0] <= threshold):
+                breached = False
+                break
+        return RuleHit(
+            self.rule_id,
+            self.anchor_sensor_id,
+            value,
+            ts,
+            breached=breached,
+            cleared=not breached,
+            severity=self.severity,
+            message=self.message,
+        )
+
+
+class RuleEngine:
+    """
+    Compiles AlertRule rows into per-sensor rule objects and evaluates them
+    incrementally. evaluate() and scan() are pure in-memory operations; the
+    caller persists the returned hits.
+    """
+
+    def __init__(self):
+        self._by_sensor: dict[int, list] = {}
+        self._cross: dict[tuple[int, str], list[CrossSensorRule]] = {}
+        self._no_data: dict[int, list[NoDataRule]] = {}
+        self._sensor_meta: dict[int, tuple[int, str]] = {}
+        self._latest: dict[tuple[int, str], tuple[float, datetime]] = {}
+        self._last_seen: dict[int, datetime] = {}
+        self._loaded_at: Optional[float] = None
+        self.rule_count = 0
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def ensure_loaded(self, session):
+        if self._loaded_at is not None:
+            return
+        rules = session.exec(select(AlertRule).where(AlertRule.enabled == True)).all()
+        sensors = session.exec(
+            select(Sensor.id, Sensor.parcel_id, Sensor.sensor_type).where(
+                Sensor.deleted_at == None
+            )
+        ).all()
+        self.compile(rules, sensors)
+
+    def compile(self, rules: list[AlertRule], sensors: list[tuple[int, int, str]]):
+        """
+        Rebuild the rule objects. Window state of rules that survive the
+        recompile is carried over by (rule id, sensor id), so editing an
+        unrelated sensor or rule does not restart open windows.
+        """
+        previous = {
+            (r.rule_id, sid): r
+            for sid, compiled in self._by_sensor.items()
+            for r in compiled
+        }
+        previous.update(
+            ((r.rule_id, sid), r)
+            for sid, compiled in self._no_data.items()
+            for r in compiled
+        )
+
+        def carried(compiled, sid: int):
+            old = previous.get((compiled.rule_id, sid))
+            if type(old) is type(compiled):
+                compiled.inherit(old)
+            return compiled
+
+        by_sensor: dict[int, list] = {}
+        cross: dict[tuple[int, str], list[CrossSensorRule]] = {}
+        no_data: dict[int, list[NoDataRule]] = {}
+        meta = {sid: (pid, stype) for sid, pid, stype in sensors}
+        by_parcel: dict[int, list[int]] = {}
+        for sid, (pid, _) in sorted(meta.items()):
+            by_parcel.setdefault(pid, []).append(sid)
+        for rule in rules:
+            try:
+                params = parse_params(rule.rule_type, json.loads(rule.params or "{}"))
+                if rule.rule_type == "cross_sensor":
+                    conditions = params["conditions"]
+                    anchors = [
+                        sid
+                        for sid in by_parcel.get(rule.parcel_id, [])
+                        if meta[sid][1] == conditions[0][0]
+                    ]
+                    if not anchors:
+                        continue
+                    compiled = CrossSensorRule(
+                        rule.id,
+                        rule.severity,
+                        rule.parcel_id,
+                        anchors[0],
+                        conditions,
+                        params["max_age_minutes"],
+                    )
+                    for sensor_type, _, _ in conditions:
+                        cross.setdefault((rule.parcel_id, sensor_type), []).append(
+                            compiled
+                        )
+                    continue
+                if rule.sensor_id is not None:
+                    targets = [rule.sensor_id] if rule.sensor_id in meta else []
+                else:
+                    targets = [
+                        sid
+                        for sid in by_parcel.get(rule.parcel_id, [])
+                        if rule.sensor_type is None or meta[sid][1] == rule.sensor_type
+                    ]
+                for sid in targets:
+                    if rule.rule_type == "rate_of_change":
+                        by_sensor.setdefault(sid, []).append(
+                            carried(
+                                RateOfChangeRule(
+                                    rule.id,
+                                    rule.severity,
+                                    params["max_delta"],
+                                    params["minutes"],
+                                ),
+                                sid,
+                            )
+                        )
+                    elif rule.rule_type == "sustained":
+                        by_sensor.setdefault(sid, []).append(
+                            carried(
+                                SustainedRule(
+                                    rule.id,
+                                    rule.severity,
+                                    params["op"],
+                                    params["threshold"],
+                                    params["minutes"],
+                                ),
+                                sid,
+                            )
+                        )
+                    elif rule.rule_type == "no_data":
+                        no_data.setdefault(sid, []).append(
+                            carried(
+                                NoDataRule(
+                                    rule.id,
+                                    rule.severity,
+                                    sid,
+                                    params["minutes"],
+                                ),
+                                sid,
+                            )
+                        )
+            except (KeyError, ValueError, TypeError, IndexError) as e:
+                logging.exception(f"Skipping invalid alert rule {rule.id}: {e}")
+        self._by_sensor = by_sensor
+        self._cross = cross
+        self._no_data = no_data
+        self._sensor_meta = meta
+        self.rule_count = len(rules)
+        self._loaded_at = time.monotonic()
+
+    def evaluate(self, sensor_id: int, value: float, ts: datetime) -> list[RuleHit]:
+        if sensor_id not in self._sensor_meta and self._loaded_at is not None:
+            if time.monotonic() - self._loaded_at > RELOAD_INTERVAL:
+                self.invalidate()
+        self._last_seen[sensor_id] = ts
+        hits = [
+            rule.update(sensor_id, value, ts)
+            for rule in self._by_sensor.get(sensor_id, ())
+        ]
+        for rule in self._no_data.get(sensor_id, ()):
+            if rule.stale:
+                rule.stale = False
+                hits.append(self._no_data_hit(rule, ts, breached=False))
+        meta = self._sensor_meta.get(sensor_id)
+        if meta is not None:
+            cross = self._cross.get(meta)
+            if cross:
+                self._latest[meta] = (value, ts)
+                hits.extend(rule.update(self._latest, value, ts) for rule in cross)
+        return hits
+
+    def scan(self, now: datetime) -> list[RuleHit]:
+        """Raise no_data hits for sensors that have been silent too long."""
+        hits = []
+        for sensor_id, rules in self._no_data.items():
+            last = self._last_seen.get(sensor_id)
+            for rule in rules:
+                if rule.stale:
+                    continue
+                if last is None:
+                    # Start the clock at the first scan after a (re)load.
+                    self._last_seen[sensor_id] = now
+                    continue
+                if now - last > rule.timeout:
+                    rule.stale = True
+                    hits.append(self._no_data_hit(rule, now, breached=True))
+        return hits
+
+    def _no_data_hit(self, rule: NoDataRule, ts: datetime, breached: bool) -> RuleHit:
+        return RuleHit(
+            rule.rule_id,
+            rule.sensor_id,
+            0.0,
+            ts,
+            breached=breached,
+            cleared=not breached,
+            severity=rule.severity,
+            message=rule.message,
+        )
+
+
+engine = RuleEngine()
\ No newline at end of file
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import time
+import reflex as rx
+from datetime import datetime
+from typing import Optional
+from sqlmodel import select, update
+from app.models import Sensor, SensorData
+from app.alerting.episodes import check_thresholds, tracker as episode_tracker
+from app.alerting.rules import engine as rule_engine
+from app.tracing import tracer
+
+QUEUE_SIZE = 50000
+BATCH_SIZE = 500
+SCAN_INTERVAL = 60
+
+
+class AlertWorker:
+    """
+    Evaluates thresholds and alert rules in the background, fed by ingest
+    through an in-process queue so the HTTP response never waits on alerting.
+
+    Ingest stores each reading with alert_pending=True and the worker clears
+    the flag in the same transaction that writes the resulting alerts. Rows
+    still pending at startup, or left behind by a full queue or a failed
+    batch, are replayed from the database, so every reading is evaluated at
+    least once.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._replay_needed = True
+        self._replayed_upto = 0
+        # data_id -> (trace_id, submitted perf_counter) for traced readings.
+        self._traces: dict[int, tuple[str, float]] = {}
+
+    def submit(
+        self,
+        data_id: int,
+        sensor_id: int,
+        value: float,
+        unit: str,
+        ts: datetime,
+        trace_id: Optional[str] = None,
+    ):
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait((data_id, sensor_id, value, unit, ts))
+        except asyncio.QueueFull:
+            self._replay_needed = True
+            logging.warning(f"Alert queue full, deferring reading {data_id} to replay")
+            return
+        if trace_id:
+            self._traces[data_id] = (trace_id, time.perf_counter())
+
+    async def run(self):
+        self._queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        loop = asyncio.get_running_loop()
+        next_scan = loop.time() + SCAN_INTERVAL
+        logging.info("Alert worker started.")
+        while True:
+            if self._replay_needed:
+                await self.replay()
+            batch = []
+            try:
+                batch.append(
+                    await asyncio.wait_for(
+                        self._queue.get(), max(0.0, next_scan - loop.time())
+                    )
+                )
+            except asyncio.TimeoutError:
+                pass
+            while batch and len(batch) < BATCH_SIZE and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            if self._traces:
+                for item in batch:
+                    if item[0] <= self._replayed_upto:
+                        self._traces.pop(item[0], None)
+            batch = [item for item in batch if item[0] > self._replayed_upto]
+            scan = loop.time() >= next_scan
+            if scan:
+                next_scan = loop.time() + SCAN_INTERVAL
+            started = time.perf_counter()
+            try:
+                # Off the event loop; this task awaits each batch, so batches
+                # are still evaluated one at a time.
+                await asyncio.to_thread(self.process, batch, scan)
+                if self._traces:
+                    self._trace_batch(batch, started)
+            except Exception as e:
+                logging.exception(f"Alert evaluation failed, will replay: {e}")
+                for item in batch:
+                    self._traces.pop(item[0], None)
+                episode_tracker.invalidate()
+                self._replay_needed = True
+                await asyncio.sleep(1)
+
+    def _trace_batch(self, batch: list[tuple], started: float):
+        """Queue wait and batch evaluation time for each traced reading."""
+        now = time.perf_counter()
+        epoch = time.time()
+        for item in batch:
+            traced = self._traces.pop(item[0], None)
+            if traced is None:
+                continue
+            trace_id, submitted = traced
+            tracer.record(
+                trace_id,
+                "alerts.queue",
+                epoch - (now - submitted),
+                started - submitted,
+            )
+            tracer.record(
+                trace_id,
+                "alerts.evaluate",
+                epoch - (now - started),
+                now - started,
+                batch=len(batch),
+            )
+
+    async def replay(self):
+        """Evaluate readings still flagged alert_pending, oldest first."""
+        self._replay_needed = False
+        last_id = 0
+        replayed = 0
+        while True:
+            with rx.session() as session:
+                rows = session.exec(
+                    select(
+                        SensorData.id,
+                        SensorData.sensor_id,
+                        SensorData.value,
+                        SensorData.unit,
+                        SensorData.timestamp,
+                    )
+                    .where(SensorData.alert_pending == True, SensorData.id > last_id)
+                    .order_by(SensorData.id)
+                    .limit(BATCH_SIZE)
+                ).all()
+            if not rows:
+                break
+            try:
+                await asyncio.to_thread(self.process, [tuple(r) for r in rows])
+            except Exception as e:
+                logging.exception(f"Alert replay failed: {e}")
+                episode_tracker.invalidate()
+                self._replay_needed = True
+                return
+            last_id = rows[-1][0]
+            self._replayed_upto = max(self._replayed_upto, last_id)
+            replayed += len(rows)
+        if replayed:
+            logging.info(f"Replayed {replayed} pending readings for alert evaluation.")
+
+    def process(
+        self, batch: list[tuple[int, int, float, str, datetime]], scan: bool = False
+    ):
+        with rx.session() as session:
+            rule_engine.ensure_loaded(session)
+            sensor_ids = {item[1] for item in batch}
+            sensors = (
+                {
+                    s.id: s
+                    for s in session.exec(
+                        select(Sensor).where(
+                            Sensor.id.in_(sensor_ids), Sensor.deleted_at == None
+                        )
+                    ).all()
+                }
+                if sensor_ids
+                else {}
+            )
+            hits = []
+            for _, sensor_id, value, unit, ts in batch:
+                sensor = sensors.get(sensor_id)
+                if sensor is not None:
+                    check_thresholds(session, episode_tracker, sensor, value, unit, ts)
+                hits.extend(rule_engine.evaluate(sensor_id, value, ts))
+            if scan:
+                hits.extend(rule_engine.scan(datetime.utcnow()))
+            for hit in hits:
+                episode_tracker.observe(
+                    session,
+                    hit.sensor_id,
+                    f"rule:{hit.rule_id}",
+                    hit.value,
+                    hit.ts,
+                    breached=hit.breached,
+                    cleared=hit.cleared,
+                    severity=hit.severity,
+                    message=hit.message,
+                    higher_is_worse=hit.higher_is_worse,
+                )
+            if batch:
+                session.exec(
+                    update(SensorData)
+                    .where(SensorData.id.in_([item[0] for item in batch]))
+                    .values(alert_pending=False)
+                )
+            session.commit()
+
+
+worker = AlertWorker()
\ No newline at end of file
@@ -1,10 +1,30 @@
 import reflex as rx
-from fastapi import HTTPException, Query
+from fastapi import Header, HTTPException, Query, UploadFile
+from fastapi.responses import PlainTextResponse
 from typing import Optional
+from dataclasses import asdict
 from datetime import datetime
 from sqlmodel import select, desc, func
 from pydantic import BaseModel
-from app.models import Parcel, Sensor, SensorData, Alert
+import json
+import time
+from app.models import Parcel, Sensor, SensorData, Alert, AlertRule, User
+from app.alerting.rules import RULE_TYPES, engine as rule_engine, parse_params
+from app.alerting.worker import worker as alert_worker
+from app.search import SEARCH_TABLES, search_ids
+from app.importer import import_inventory, parse_rows
+from app.cache import invalidate_user
+from app.liveness import liveness
+from app.purge import purger
+from app.security import hash_pool
+from app.metrics import READINGS_INGESTED, render as render_metrics, timed_handler
+from app.profiler import (
+    EVENT_PROFILE_ENABLED,
+    PROFILE_ENABLED,
+    event_profiler,
+    profiler,
+)
+from app.tracing import tracer
 
 
 class SensorDataPayload(BaseModel):
@@ -39,6 +59,59 @@ class SensorOut(BaseModel):
     last_unit: Optional[str] = None
 
 
+class AlertRuleIn(BaseModel):
+    name: str
+    rule_type: str
+    sensor_id: Optional[int] = None
+    parcel_id: Optional[int] = None
+    sensor_type: Optional[str] = None
+    params: dict = {}
+    severity: str = "warning"
+    enabled: bool = True
+
+
+class AlertRuleOut(AlertRuleIn):
+    id: int
+
+
+class SearchResult(BaseModel):
+    kind: str
+    query: str
+    ids: list[int]
+
+
+class ImportResultOut(BaseModel):
+    rows: int
+    parcels_created: int
+    sensors_created: int
+    errors: list[str]
+    invalid_rows: int
+    committed: bool
+
+
+class PurgeStatus(BaseModel):
+    running: bool
+    pending_sensors: int
+    pending_parcels: int
+    current_sensor_id: Optional[int]
+    current_remaining: int
+    readings_deleted: int
+    alerts_deleted: int
+    sensors_purged: int
+    parcels_purged: int
+    last_error: Optional[str]
+
+
+class HashPoolStats(BaseModel):
+    workers: int
+    queued: int
+    running: int
+    completed: int
+    avg_queue_ms: float
+    max_queue_ms: float
+    avg_hash_ms: float
+
+
 class ParcelOut(BaseModel):
     id: int
     name: str
@@ -48,51 +121,70 @@ class ParcelOut(BaseModel):
     sensors: list[SensorOut]
 
 
-async def ingest_sensor_data(unique_id: str, payload: SensorDataPayload):
+@timed_handler
+async def ingest_sensor_data(
+    unique_id: str,
+    payload: SensorDataPayload,
+    x_trace_id: Optional[str] = Header(None),
+    x_trace_start: Optional[float] = Header(None),
+):
     """
     Ingest data for a specific sensor identified by its unique_id.
     POST /api/sensors/{unique_id}/data
+    An X-Trace-Id header (sent by the MQTT bridge) records a span per phase;
+    X-Trace-Start, the bridge's receive time, adds the end-to-end span.
     """
-    with rx.session() as session:
-        sensor = session.exec(
-            select(Sensor).where(Sensor.unique_id == unique_id)
-        ).first()
-        if not sensor:
-            raise HTTPException(
-                status_code=404, detail=f"Sensor with ID {unique_id} not found"
-            )
-        ts = payload.timestamp if payload.timestamp else datetime.utcnow()
-        new_data = SensorData(
-            sensor_id=sensor.id, value=payload.value, unit=payload.unit, timestamp=ts
-        )
-        session.add(new_data)
-        if sensor.threshold_min is not None and payload.value < sensor.threshold_min:
-            alert = Alert(
-                sensor_id=sensor.id,
-                timestamp=ts,
-                severity="warning",
-                message=f"Value {payload.value} {payload.unit} is below minimum threshold {sensor.threshold_min}",
-                is_active=True,
+    trace_id = x_trace_id if tracer.enabled else None
+    with tracer.span(trace_id, "ingest", sensor=unique_id):
+        with rx.session() as session:
+            with tracer.span(trace_id, "ingest.lookup"):
+                sensor = session.exec(
+                    select(Sensor.id, Sensor.sensor_type).where(
+                        Sensor.unique_id == unique_id, Sensor.deleted_at == None
+                    )
+                ).first()
+            if not sensor:
+                raise HTTPException(
+                    status_code=404, detail=f"Sensor with ID {unique_id} not found"
+                )
+            sensor_id, sensor_type = sensor
+            ts = payload.timestamp if payload.timestamp else datetime.utcnow()
+            with tracer.span(trace_id, "ingest.insert"):
+                new_data = SensorData(
+                    sensor_id=sensor_id,
+                    value=payload.value,
+                    unit=payload.unit,
+                    timestamp=ts,
+                    alert_pending=True,
+                )
+                session.add(new_data)
+                session.flush()
+                data_id = new_data.id
+            with tracer.span(trace_id, "ingest.commit"):
+                session.commit()
+        if trace_id and x_trace_start:
+            tracer.record(
+                trace_id,
+                "e2e.committed",
+                x_trace_start,
+                time.time() - x_trace_start,
+                sensor=unique_id,
+                data_id=data_id,
             )
-            session.add(alert)
-        if sensor.threshold_max is not None and payload.value > sensor.threshold_max:
-            alert = Alert(
-                sensor_id=sensor.id,
-                timestamp=ts,
-                severity="warning",
-                message=f"Value {payload.value} {payload.unit} is above maximum threshold {sensor.threshold_max}",
-                is_active=True,
+        READINGS_INGESTED.inc(sensor_type)
+        with tracer.span(trace_id, "ingest.alerts"):
+            liveness.touch(sensor_id, ts)
+            alert_worker.submit(
+                data_id, sensor_id, payload.value, payload.unit, ts, trace_id
             )
-            session.add(alert)
-        session.commit()
-        session.refresh(new_data)
-        return {
-            "status": "success",
-            "data_id": new_data.id,
-            "message": "Data ingested successfully",
-        }
+    return {
+        "status": "success",
+        "data_id": data_id,
+        "message": "Data ingested successfully",
+    }
 
 
+@timed_handler
 async def get_sensor_history(
     unique_id: str,
     from_date: Optional[datetime] = Query(None, alias="from"),
@@ -106,7 +198,9 @@ async def get_sensor_history(
     """
     with rx.session() as session:
         sensor = session.exec(
-            select(Sensor).where(Sensor.unique_id == unique_id)
+            select(Sensor).where(
+                Sensor.unique_id == unique_id, Sensor.deleted_at == None
+            )
         ).first()
         if not sensor:
             raise HTTPException(
@@ -125,22 +219,32 @@ async def get_sensor_history(
         ]
 
 
+@timed_handler
 async def get_dashboard_summary() -> DashboardSummary:
     """
     Get high-level stats for the dashboard.
     GET /api/dashboard
     """
     with rx.session() as session:
-        total_sensors = session.exec(select(func.count(Sensor.id))).one()
+        live_sensors = select(func.count(Sensor.id)).where(Sensor.deleted_at == None)
+        total_sensors = session.exec(live_sensors).one()
         active_sensors = session.exec(
-            select(func.count(Sensor.id)).where(Sensor.status == "active")
+            live_sensors.where(Sensor.status == "active")
+        ).one()
+        total_parcels = session.exec(
+            select(func.count(Parcel.id)).where(Parcel.deleted_at == None)
         ).one()
-        total_parcels = session.exec(select(func.count(Parcel.id))).one()
         active_alerts = session.exec(
-            select(func.count(Alert.id)).where(Alert.is_active == True)
+            select(func.count(Alert.id))
+            .join(Sensor, Alert.sensor_id == Sensor.id)
+            .where(Alert.is_active == True, Sensor.deleted_at == None)
         ).one()
         recent_logs = session.exec(
-            select(SensorData).order_by(desc(SensorData.timestamp)).limit(5)
+            select(SensorData)
+            .join(Sensor, SensorData.sensor_id == Sensor.id)
+            .where(Sensor.deleted_at == None)
+            .order_by(desc(SensorData.timestamp))
+            .limit(5)
         ).all()
         activity = []
         for log in recent_logs:
@@ -158,16 +262,21 @@ async def get_dashboard_summary() -> DashboardSummary:
         )
 
 
+@timed_handler
 async def list_parcels() -> list[ParcelOut]:
     """
     List all parcels with their sensors and latest reading.
     GET /api/parcels
     """
     with rx.session() as session:
-        parcels = session.exec(select(Parcel)).all()
+        parcels = session.exec(select(Parcel).where(Parcel.deleted_at == None)).all()
         result = []
         for p in parcels:
-            sensors = session.exec(select(Sensor).where(Sensor.parcel_id == p.id)).all()
+            sensors = session.exec(
+                select(Sensor).where(
+                    Sensor.parcel_id == p.id, Sensor.deleted_at == None
+                )
+            ).all()
             sensor_outs = []
             for s in sensors:
                 last_data = session.exec(
@@ -200,6 +309,7 @@ async def list_parcels() -> list[ParcelOut]:
         return result
 
 
+@timed_handler
 async def get_parcel_sensors(parcel_id: int) -> list[SensorOut]:
     """
     Get all sensors for a specific parcel ID.
@@ -207,10 +317,12 @@ async def get_parcel_sensors(parcel_id: int) -> list[SensorOut]:
     """
     with rx.session() as session:
         parcel = session.get(Parcel, parcel_id)
-        if not parcel:
+        if not parcel or parcel.deleted_at is not None:
             raise HTTPException(status_code=404, detail=f"Parcel {parcel_id} not found")
         sensors = session.exec(
-            select(Sensor).where(Sensor.parcel_id == parcel_id)
+            select(Sensor).where(
+                Sensor.parcel_id == parcel_id, Sensor.deleted_at == None
+            )
         ).all()
         output = []
         for s in sensors:
@@ -231,4 +343,180 @@ async def get_parcel_sensors(parcel_id: int) -> list[SensorOut]:
                     last_unit=last_data.unit if last_data else None,
                 )
             )
-        return output
\ No newline at end of file
+        return output
+
+
+def _rule_out(rule: AlertRule) -> AlertRuleOut:
+    return AlertRuleOut(
+        id=rule.id,
+        name=rule.name,
+        rule_type=rule.rule_type,
+        sensor_id=rule.sensor_id,
+        parcel_id=rule.parcel_id,
+        sensor_type=rule.sensor_type,
+        params=json.loads(rule.params),
+        severity=rule.severity,
+        enabled=rule.enabled,
+    )
+
+
+@timed_handler
+async def list_alert_rules() -> list[AlertRuleOut]:
+    """
+    List configured streaming alert rules.
+    GET /api/rules
+    """
+    with rx.session() as session:
+        rules = session.exec(select(AlertRule)).all()
+        return [_rule_out(r) for r in rules]
+
+
+@timed_handler
+async def create_alert_rule(payload: AlertRuleIn) -> AlertRuleOut:
+    """
+    Create a streaming alert rule.
+    POST /api/rules
+    rule_type: rate_of_change | sustained | no_data | cross_sensor
+    """
+    if payload.rule_type not in RULE_TYPES:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown rule type {payload.rule_type}"
+        )
+    if payload.rule_type == "cross_sensor" and payload.parcel_id is None:
+        raise HTTPException(
+            status_code=400, detail="cross_sensor rules require a parcel_id"
+        )
+    if payload.sensor_id is None and payload.parcel_id is None:
+        raise HTTPException(
+            status_code=400, detail="A rule needs a sensor_id or a parcel_id"
+        )
+    try:
+        parse_params(payload.rule_type, payload.params)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400, detail=f"Invalid {payload.rule_type} params: {e}"
+        )
+    with rx.session() as session:
+        rule = AlertRule(
+            name=payload.name,
+            rule_type=payload.rule_type,
+            sensor_id=payload.sensor_id,
+            parcel_id=payload.parcel_id,
+            sensor_type=payload.sensor_type,
+            params=json.dumps(payload.params),
+            severity=payload.severity,
+            enabled=payload.enabled,
+        )
+        session.add(rule)
+        session.commit()
+        session.refresh(rule)
+        rule_engine.invalidate()
+        return _rule_out(rule)
+
+
+@timed_handler
+async def search(
+    q: str,
+    kind: str = "sensor",
+    owner_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=500),
+) -> SearchResult:
+    """
+    Ranked full-text search over sensors or parcels, with prefix and fuzzy matching.
+    GET /api/search?q=...&kind=sensor|parcel
+    """
+    if kind not in SEARCH_TABLES:
+        raise HTTPException(status_code=400, detail=f"Unknown search kind {kind}")
+    with rx.session() as session:
+        ids = search_ids(session, q, kind, owner_id, limit)
+    return SearchResult(kind=kind, query=q, ids=ids)
+
+
+@timed_handler
+async def import_sensors(
+    owner_id: int, file: UploadFile, dry_run: bool = False
+) -> ImportResultOut:
+    """
+    Bulk import parcels and sensors from a CSV or JSON file.
+    POST /api/import?owner_id=...&dry_run=false
+    Columns: parcel, location, area, name, unique_id, sensor_type, status,
+    threshold_min, threshold_max, hysteresis. Responds 422 with per-row
+    errors when any row is invalid; nothing is imported in that case.
+    """
+    try:
+        rows, first_row = parse_rows(await file.read(), file.filename or "")
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse file: {e}")
+    with rx.session() as session:
+        if not session.get(User, owner_id):
+            raise HTTPException(status_code=404, detail=f"User {owner_id} not found")
+        report = import_inventory(
+            session, rows, owner_id, dry_run=dry_run, first_row=first_row
+        )
+    if report.errors:
+        raise HTTPException(status_code=422, detail=asdict(report))
+    if report.committed:
+        rule_engine.invalidate()
+        liveness.invalidate()
+        invalidate_user(owner_id)
+    return ImportResultOut(**asdict(report))
+
+
+@timed_handler
+async def get_purge_status() -> PurgeStatus:
+    """
+    Progress of the background purge of deleted parcels and sensors.
+    GET /api/purge
+    """
+    return PurgeStatus(**purger.progress)
+
+
+@timed_handler
+async def get_hash_pool_stats() -> HashPoolStats:
+    """
+    Queueing and timing of password hashing in the bcrypt worker pool.
+    GET /api/auth/pool
+    """
+    return HashPoolStats(**hash_pool.stats())
+
+
+async def metrics() -> PlainTextResponse:
+    """
+    Counters and latency histograms in the Prometheus text format.
+    GET /metrics
+    """
+    return PlainTextResponse(
+        render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+async def get_sql_profile(reset: bool = False) -> dict:
+    """
+    SQL profiler report: statements per handler, likely N+1 patterns,
+    top fingerprints and slow queries. Needs SQL_PROFILE=1.
+    GET /api/profile?reset=false
+    """
+    if not PROFILE_ENABLED:
+        raise HTTPException(
+            status_code=404, detail="SQL profiling is off; start with SQL_PROFILE=1"
+        )
+    report = profiler.report()
+    if reset:
+        profiler.reset()
+    return report
+
+
+async def get_event_profile(reset: bool = False) -> dict:
+    """
+    Event handler report: wall and DB time per handler, the size of the
+    deltas it sent and the heaviest state vars. Needs EVENT_PROFILE=1.
+    GET /api/profile/events?reset=false
+    """
+    if not EVENT_PROFILE_ENABLED:
+        raise HTTPException(
+            status_code=404, detail="Event profiling is off; start with EVENT_PROFILE=1"
+        )
+    report = event_profiler.report()
+    if reset:
+        event_profiler.reset()
+    return report
\ No newline at end of file
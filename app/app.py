@@ -12,13 +12,29 @@ from app.pages.history import history_page
 from app.states.dashboard_state import DashboardState
 from app.states.alert_state import AlertState
 from app.states.history_state import HistoryState
+from app.states.profile_state import ProfileState
 from app.api import (
     ingest_sensor_data,
     get_sensor_history,
     get_dashboard_summary,
     list_parcels,
     get_parcel_sensors,
+    list_alert_rules,
+    create_alert_rule,
+    search,
+    import_sensors,
+    get_purge_status,
+    get_hash_pool_stats,
+    metrics,
+    get_sql_profile,
+    get_event_profile,
 )
+from app.alerting.worker import worker as alert_worker
+from app.liveness import liveness
+from app.purge import purger
+from app.seed import prepare_database
+from app.metrics import EventMetricsMiddleware, instrument_engines
+from app.profiler import install_event_profiler, install_profiler
 
 
 def api_routes(app):
@@ -29,6 +45,15 @@ def api_routes(app):
     app.add_route(
         "/api/parcels/{parcel_id}/sensors", get_parcel_sensors, methods=["GET"]
     )
+    app.add_route("/api/rules", list_alert_rules, methods=["GET"])
+    app.add_route("/api/rules", create_alert_rule, methods=["POST"])
+    app.add_route("/api/search", search, methods=["GET"])
+    app.add_route("/api/import", import_sensors, methods=["POST"])
+    app.add_route("/api/purge", get_purge_status, methods=["GET"])
+    app.add_route("/api/auth/pool", get_hash_pool_stats, methods=["GET"])
+    app.add_route("/metrics", metrics, methods=["GET"])
+    app.add_route("/api/profile", get_sql_profile, methods=["GET"])
+    app.add_route("/api/profile/events", get_event_profile, methods=["GET"])
     return app
 
 
@@ -44,10 +69,21 @@ app = rx.App(
     ],
     api_transformer=api_routes,
 )
+instrument_engines()
+install_profiler()
+app.add_middleware(EventMetricsMiddleware())
+install_event_profiler(app)
+# Runs to completion before the background tasks below start.
+app.register_lifespan_task(prepare_database)
+app.register_lifespan_task(alert_worker.run)
+app.register_lifespan_task(liveness.run)
+app.register_lifespan_task(purger.run)
+app.add_page(index, route="/", on_load=AuthState.check_auth_index)
 app.add_page(
-    index, route="/", on_load=[AuthState.seed_database, AuthState.check_auth_index]
+    profile_page,
+    route="/profile",
+    on_load=[AuthState.check_auth_redirect, ProfileState.load_profile],
 )
-app.add_page(profile_page, route="/profile", on_load=AuthState.check_auth_redirect)
 app.add_page(
     parcels_page,
     route="/parcels",
@@ -0,0 +1,310 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+# Generated datasets, smallest first. Each is built once with
+# app.generate_data and reused while its parameters are unchanged.
+SIZES = {
+    "small": {"users": 2, "parcels": 4, "sensors": 28, "days": 30},
+    "medium": {"users": 5, "parcels": 20, "sensors": 140, "days": 90},
+    "large": {"users": 10, "parcels": 80, "sensors": 560, "days": 365},
+}
+PREFIX = "bench"
+DATA_DIR = os.getenv("BENCH_DATA_DIR", ".bench")
+# History windows are relative to now, so data older than this is rebuilt
+# to keep runs on different days comparable.
+MAX_DATA_AGE_HOURS = 24
+REPEAT = 20
+REGRESSION_THRESHOLD = 0.2
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def measure(
+    call: Callable[[], Awaitable[Optional[int]]], repeat: int, counter: list[int]
+) -> dict:
+    """
+    Latency over `repeat` calls after a cold first call, then the query count
+    and peak Python memory of one more call each. `call` may return the size
+    in bytes of what it would send to the client.
+    """
+    start = time.perf_counter()
+    await call()
+    first = time.perf_counter() - start
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await call()
+        times.append(time.perf_counter() - start)
+    counter[0] = 0
+    payload = await call()
+    queries = counter[0]
+    tracemalloc.start()
+    try:
+        await call()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    times.sort()
+    result = {
+        "first_ms": round(1000 * first, 3),
+        "p50_ms": round(1000 * _percentile(times, 0.50), 3),
+        "p95_ms": round(1000 * _percentile(times, 0.95), 3),
+        "mean_ms": round(1000 * statistics.fmean(times), 3),
+        "min_ms": round(1000 * times[0], 3),
+        "queries": queries,
+        "peak_kb": round(peak / 1024, 1),
+    }
+    if payload is not None:
+        result["payload_kb"] = round(payload / 1024, 1)
+    return result
+
+
+async def run_cases(repeat: int) -> dict:
+    """Benchmark the API handlers and state events against the configured DB."""
+    import reflex as rx
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from sqlmodel import func, select
+    from reflex.state import State
+    from reflex.utils import format
+    import app.app  # noqa: F401  registers the states
+    from app import api
+    from app.models import Parcel, Sensor, SensorData, User
+    from app.states.alert_state import AlertState
+    from app.states.auth_state import AuthState
+    from app.states.dashboard_state import DashboardState
+    from app.states.history_state import HistoryState
+
+    counter = [0]
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        counter[0] += 1
+
+    event.listen(Engine, "before_cursor_execute", count)
+    with rx.session() as session:
+        user_id = session.exec(
+            select(User.id).where(User.username == f"{PREFIX}_user0001")
+        ).one()
+        parcel_id = session.exec(
+            select(Parcel.id).where(Parcel.owner_id == user_id).order_by(Parcel.id)
+        ).first()
+        unique_id = session.exec(
+            select(Sensor.unique_id)
+            .where(Sensor.parcel_id == parcel_id)
+            .order_by(Sensor.id)
+        ).first()
+        readings = session.exec(select(func.count(SensorData.id))).one()
+
+    root = State(_reflex_internal_init=True)
+    (await root.get_state(AuthState)).user_id = user_id
+
+    def state_call(state_cls, handler, **fields):
+        async def call():
+            state = await root.get_state(state_cls)
+            for name, value in fields.items():
+                setattr(state, name, value)
+            result = await handler.fn(state)
+            delta = await root._get_resolved_delta()
+            root._clean()
+            size = len(format.json_dumps(delta))
+            if result is not None:
+                size += len(format.json_dumps(result))
+            return size
+
+        return call
+
+    def api_call(handler, *args, **kwargs):
+        async def call():
+            await handler(*args, **kwargs)
+
+        return call
+
+    cases = {
+        "api.get_sensor_history": api_call(
+            api.get_sensor_history, unique_id, from_date=None, to_date=None, limit=100
+        ),
+        "api.get_dashboard_summary": api_call(api.get_dashboard_summary),
+        "api.list_parcels": api_call(api.list_parcels),
+        "api.get_parcel_sensors": api_call(api.get_parcel_sensors, parcel_id),
+        "DashboardState.load_data": state_call(
+            DashboardState, DashboardState.load_data
+        ),
+        "HistoryState.load_history[7d]": state_call(
+            HistoryState, HistoryState.load_history, days_range="7"
+        ),
+        "HistoryState.load_history[30d]": state_call(
+            HistoryState, HistoryState.load_history, days_range="30"
+        ),
+        "HistoryState.export_csv[30d]": state_call(
+            HistoryState, HistoryState.export_csv, days_range="30"
+        ),
+        "AlertState.load_alerts": state_call(AlertState, AlertState.load_alerts),
+        # Last: it adds rows.
+        "api.ingest_sensor_data": api_call(
+            api.ingest_sensor_data,
+            unique_id,
+            api.SensorDataPayload(value=21.5, unit="C"),
+            x_trace_id=None,
+            x_trace_start=None,
+        ),
+    }
+    results = {}
+    for name, call in cases.items():
+        results[name] = await measure(call, repeat, counter)
+        logging.info(
+            f"{name}: p50 {results[name]['p50_ms']} ms, {results[name]['queries']} queries"
+        )
+    return {"readings": readings, "results": results}
+
+
+def _ensure_dataset(name: str, params: dict, data_dir: str, regenerate: bool) -> str:
+    path = os.path.abspath(os.path.join(data_dir, f"{name}.db"))
+    meta_path = path + ".json"
+    meta = None
+    if os.path.exists(path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        age = datetime.utcnow() - datetime.fromisoformat(meta["generated_at"])
+        if meta["params"] != params or age.total_seconds() > 3600 * MAX_DATA_AGE_HOURS:
+            meta = None
+    if meta is not None and not regenerate:
+        return path
+    os.makedirs(data_dir, exist_ok=True)
+    for stale in (path, meta_path):
+        if os.path.exists(stale):
+            os.remove(stale)
+    logging.info(f"Generating the {name} dataset ({params})...")
+    command = [sys.executable, "-m", "app.generate_data", "--prefix", PREFIX]
+    for key, value in params.items():
+        command += [f"--{key}", str(value)]
+    subprocess.run(
+        command, check=True, env={**os.environ, "REFLEX_DB_URL": f"sqlite:///{path}"}
+    )
+    with open(meta_path, "w") as f:
+        json.dump({"params": params, "generated_at": datetime.utcnow().isoformat()}, f)
+    return path
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes: list[str], data_dir: str, repeat: int, regenerate: bool) -> dict:
+    """
+    One child process per dataset, since the database URL is fixed when
+    Reflex loads its config.
+    """
+    report = {
+        "commit": _git_commit(),
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "repeat": repeat,
+        "sizes": {},
+    }
+    for name in sizes:
+        path = _ensure_dataset(name, SIZES[name], data_dir, regenerate)
+        child = subprocess.run(
+            [sys.executable, "-m", "app.bench", "one", "--repeat", str(repeat)],
+            check=True,
+            capture_output=True,
+            text=True,
+            env={**os.environ, "REFLEX_DB_URL": f"sqlite:///{path}"},
+        )
+        report["sizes"][name] = {
+            "params": SIZES[name],
+            **json.loads(child.stdout.strip().splitlines()[-1]),
+        }
+    return report
+
+
+def compare(old: dict, new: dict, threshold: float = REGRESSION_THRESHOLD) -> list[str]:
+    """Print p50 changes per case; returns the cases slower by over `threshold`."""
+    regressions = []
+    print(
+        f"{'size':<8}{'case':<34}{'old p50':>10}{'new p50':>10}{'change':>9}{'queries':>12}"
+    )
+    for size, new_size in new["sizes"].items():
+        old_size = old["sizes"].get(size)
+        if old_size is None:
+            continue
+        for case, result in new_size["results"].items():
+            before = old_size["results"].get(case)
+            if before is None:
+                continue
+            change = result["p50_ms"] / before["p50_ms"] - 1 if before["p50_ms"] else 0
+            flag = ""
+            if change > threshold:
+                flag = " !"
+                regressions.append(f"{size}/{case}")
+            print(
+                f"{size:<8}{case:<34}{before['p50_ms']:>10.2f}{result['p50_ms']:>10.2f}"
+                f"{change:>+9.0%}{before['queries']:>6}->{result['queries']:<5}{flag}"
+            )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark API handlers and state events on generated data"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="benchmark and write JSON results")
+    run_parser.add_argument(
+        "--sizes", default="small,medium", help=f"comma-separated: {', '.join(SIZES)}"
+    )
+    run_parser.add_argument("--data-dir", default=DATA_DIR)
+    run_parser.add_argument("--repeat", type=int, default=REPEAT)
+    run_parser.add_argument("--regenerate", action="store_true")
+    run_parser.add_argument("--out", help="results file (default bench-<commit>.json)")
+    one_parser = commands.add_parser(
+        "one", help="benchmark the database in REFLEX_DB_URL and print JSON"
+    )
+    one_parser.add_argument("--repeat", type=int, default=REPEAT)
+    compare_parser = commands.add_parser("compare", help="compare two results files")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    if args.command == "one":
+        print(json.dumps(asyncio.run(run_cases(args.repeat))))
+    elif args.command == "run":
+        sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+        unknown = [s for s in sizes if s not in SIZES]
+        if unknown:
+            parser.error(f"unknown sizes: {', '.join(unknown)}")
+        report = run(sizes, args.data_dir, args.repeat, args.regenerate)
+        out = args.out or f"bench-{report['commit'] or 'local'}.json"
+        with open(out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {out}")
+    else:
+        with open(args.old) as f:
+            old = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        regressions = compare(old, new, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+            sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,85 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+from sqlmodel import select
+from app.models import Parcel, Sensor
+
+
+class UserCache:
+    """
+    Per-user values kept in process memory. Writers call invalidate() when
+    the underlying rows change; the TTL is only a safety net for changes
+    made outside this process.
+    """
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self._entries: dict[int, tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[Any]:
+        entry = self._entries.get(user_id)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        return entry[1]
+
+    def set(self, user_id: int, value: Any):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic(), value)
+
+    def invalidate(self, user_id: Optional[int] = None):
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+
+@dataclass
+class UserContext:
+    """What a user owns, for scoping queries and checking ownership."""
+
+    parcels: dict[int, str]
+    sensor_ids: set[int]
+
+    @property
+    def parcel_ids(self) -> list[int]:
+        return list(self.parcels)
+
+
+parcel_cache = UserCache()
+context_cache = UserCache()
+
+
+def user_context(session, user_id: int) -> UserContext:
+    """The user's live parcels (id -> name, by name) and sensor ids, cached."""
+    context = context_cache.get(user_id)
+    if context is None:
+        parcels = dict(
+            session.exec(
+                select(Parcel.id, Parcel.name)
+                .where(Parcel.owner_id == user_id, Parcel.deleted_at == None)
+                .order_by(Parcel.name)
+            ).all()
+        )
+        sensor_ids = set(
+            session.exec(
+                select(Sensor.id)
+                .join(Parcel, Sensor.parcel_id == Parcel.id)
+                .where(
+                    Parcel.owner_id == user_id,
+                    Parcel.deleted_at == None,
+                    Sensor.deleted_at == None,
+                )
+            ).all()
+        )
+        context = UserContext(parcels=parcels, sensor_ids=sensor_ids)
+        context_cache.set(user_id, context)
+    return context
+
+
+def invalidate_user(user_id: Optional[int] = None):
+    """Drop every cached view of a user's parcels and sensors."""
+    parcel_cache.invalidate(user_id)
+    context_cache.invalidate(user_id)
\ No newline at end of file
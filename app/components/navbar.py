@@ -12,11 +12,13 @@ def navbar() -> rx.Component:
             rx.el.div(
                 rx.el.div(
                     rx.el.span(
-                        rx.cond(AuthState.user, AuthState.user.username, "Guest"),
+                        rx.cond(
+                            AuthState.is_authenticated, AuthState.display_name, "Guest"
+                        ),
                         class_name="text-sm font-medium text-gray-700",
                     ),
                     rx.el.span(
-                        rx.cond(AuthState.user, AuthState.user.role, ""),
+                        AuthState.role,
                         class_name="text-xs text-gray-500 uppercase tracking-wider",
                     ),
                     class_name="flex flex-col items-end mr-3",
@@ -0,0 +1,85 @@
+import logging
+from sqlalchemy import inspect, literal, text
+from sqlmodel import SQLModel
+from app.devices import ensure_touch_trigger
+from app.search import ensure_search_index
+
+# Bump whenever models, indexes or search triggers change so the next start
+# runs ensure_schema again. Stored in SQLite's PRAGMA user_version.
+SCHEMA_VERSION = 7
+
+
+def _add_missing_columns(engine):
+    """SQLite-friendly ALTER TABLE for columns added to existing models."""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+                if column.default is not None and column.default.is_scalar:
+                    default = literal(column.default.arg).compile(
+                        dialect=engine.dialect, compile_kwargs={"literal_binds": True}
+                    )
+                    ddl += f" DEFAULT {default}"
+                    if not column.nullable:
+                        ddl += " NOT NULL"
+                conn.execute(text(ddl))
+                logging.info(f"Added column {table.name}.{column.name}")
+
+
+def _dedupe_usernames(engine):
+    """
+    Rename repeated usernames so the unique index can be built. Login only
+    ever found the oldest account, so the later ones get an id suffix.
+    """
+    if "user" not in inspect(engine).get_table_names():
+        return
+    with engine.begin() as conn:
+        duplicates = conn.execute(
+            text(
+                'SELECT id, username FROM "user" WHERE id NOT IN '
+                '(SELECT MIN(id) FROM "user" GROUP BY username)'
+            )
+        ).all()
+        for user_id, username in duplicates:
+            conn.execute(
+                text('UPDATE "user" SET username = :name WHERE id = :id'),
+                {"name": f"{username}#{user_id}", "id": user_id},
+            )
+            logging.warning(
+                f"Renamed duplicate username {username!r} to {username}#{user_id}"
+            )
+
+
+def ensure_schema(engine):
+    """Create missing tables, columns and indexes for the current models."""
+    SQLModel.metadata.create_all(engine)
+    _add_missing_columns(engine)
+    _dedupe_usernames(engine)
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    ensure_search_index(engine)
+    ensure_touch_trigger(engine)
+    logging.info("Database tables and indexes verified/created.")
+
+
+def schema_version(engine) -> int:
+    """Schema version recorded in the database, or 0 if unknown."""
+    if engine.dialect.name != "sqlite":
+        return 0
+    with engine.connect() as conn:
+        return conn.execute(text("PRAGMA user_version")).scalar() or 0
+
+
+def set_schema_version(engine, version: int = SCHEMA_VERSION):
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        conn.execute(text(f"PRAGMA user_version = {int(version)}"))
\ No newline at end of file
@@ -0,0 +1,166 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy import text
+from sqlmodel import Session, func, select
+from app.models import DeviceMapping
+
+# The gateway the bridge served before mappings moved into the database. It
+# is seeded with DEFAULT_MAPPING, which is also used while the table cannot
+# be read.
+LEGACY_DEVICE = "15046220"
+DEFAULT_MAPPING = {
+    "D1": {"id": "SENS-002", "factor": 0.01, "unit": "C", "type": "temperature"},
+    "D2": {"id": "SENS-004", "factor": 0.01, "unit": "%", "type": "humidity"},
+    "D3": {"id": "SENS-001", "factor": 0.01, "unit": "%", "type": "soil_moisture"},
+    "D4": {"id": "SENS-003", "factor": 0.1, "unit": "lx", "type": "light"},
+    "D5": {"id": "SENS-005", "factor": 0.1, "unit": "ppm", "type": "co2"},
+    "D6": {"id": "SENS-006", "factor": 0.1, "unit": "ppb", "type": "voc"},
+    "D7": {"id": "SENS-007", "factor": 0.1, "unit": "ppb", "type": "nox"},
+}
+REFRESH_INTERVAL = float(os.getenv("DEVICE_MAPPING_REFRESH", "10"))
+# Changes are found by the row count, max id and max updated_at; a full
+# reload this often is only a safety net.
+FULL_RELOAD_INTERVAL = 300
+
+# The model's onupdate only covers ORM writes; this also stamps rows edited
+# with plain SQL, so refresh() sees them. Same storage format as SQLAlchemy.
+TOUCH_TRIGGER = """
+CREATE TRIGGER devicemapping_touch AFTER UPDATE ON devicemapping
+WHEN new.updated_at IS old.updated_at BEGIN
+    UPDATE devicemapping
+    SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') || '000'
+    WHERE id = new.id;
+END
+"""
+
+
+def ensure_touch_trigger(engine):
+    """Create the trigger that keeps DeviceMapping.updated_at current."""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        conn.execute(text("DROP TRIGGER IF EXISTS devicemapping_touch"))
+        conn.execute(text(TOUCH_TRIGGER))
+
+
+@dataclass(frozen=True, slots=True)
+class KeyMapping:
+    sensor_id: str
+    factor: float
+    unit: str
+    type: str
+
+
+def key_mappings(mapping: dict[str, dict]) -> dict[str, KeyMapping]:
+    """KeyMappings from a DEFAULT_MAPPING-shaped dict."""
+    return {
+        key: KeyMapping(m["id"], m["factor"], m["unit"], m["type"])
+        for key, m in mapping.items()
+    }
+
+
+def seed_device_mappings(session):
+    """Map the legacy gateway's keys to the demo sensors if it has no rows."""
+    existing = session.exec(
+        select(DeviceMapping.id).where(DeviceMapping.device_id == LEGACY_DEVICE)
+    ).first()
+    if existing is not None:
+        return
+    for key, m in DEFAULT_MAPPING.items():
+        session.add(
+            DeviceMapping(
+                device_id=LEGACY_DEVICE,
+                key=key,
+                sensor_unique_id=m["id"],
+                factor=m["factor"],
+                unit=m["unit"],
+                sensor_type=m["type"],
+            )
+        )
+
+
+class DeviceMappingCache:
+    """
+    device id -> payload key -> KeyMapping, loaded from DeviceMapping and
+    kept current by a background thread. Lookups read whichever dict was
+    swapped in last, without locking.
+    """
+
+    def __init__(self, engine=None, refresh_interval: float = REFRESH_INTERVAL):
+        self._engine = engine
+        self.refresh_interval = refresh_interval
+        self.devices: dict[str, dict[str, KeyMapping]] = {}
+        self._fingerprint: Optional[tuple] = None
+        self._loaded_at = 0.0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from reflex.model import get_engine
+
+            self._engine = get_engine()
+        return self._engine
+
+    def get(self, device_id: str) -> Optional[dict[str, KeyMapping]]:
+        return self.devices.get(device_id)
+
+    def replace(self, devices: dict[str, dict[str, KeyMapping]]):
+        """Serve a fixed mapping instead of the table (load generation)."""
+        self.devices = devices
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reload when the table changed. Returns True if it reloaded."""
+        with Session(self.engine) as session:
+            fingerprint = tuple(
+                session.exec(
+                    select(
+                        func.count(DeviceMapping.id),
+                        func.max(DeviceMapping.id),
+                        func.max(DeviceMapping.updated_at),
+                    )
+                ).one()
+            )
+            stale = time.monotonic() - self._loaded_at > FULL_RELOAD_INTERVAL
+            if fingerprint == self._fingerprint and not (force or stale):
+                return False
+            rows = session.exec(select(DeviceMapping)).all()
+        devices: dict[str, dict[str, KeyMapping]] = {}
+        for row in rows:
+            devices.setdefault(row.device_id, {})[row.key] = KeyMapping(
+                row.sensor_unique_id, row.factor, row.unit, row.sensor_type
+            )
+        changed = devices != self.devices
+        self.devices = devices
+        self._fingerprint = fingerprint
+        self._loaded_at = time.monotonic()
+        if changed:
+            logging.info(f"Loaded {len(rows)} key mappings for {len(devices)} devices.")
+        return True
+
+    def _run(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.warning(f"Device mapping refresh failed, keeping the last: {e}")
+
+    def start(self):
+        """Load once, then refresh from a daemon thread."""
+        try:
+            self.refresh(force=True)
+        except Exception as e:
+            logging.warning(
+                f"Could not load device mappings, serving {LEGACY_DEVICE} only: {e}"
+            )
+            self.devices = {LEGACY_DEVICE: key_mappings(DEFAULT_MAPPING)}
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="device-mappings", daemon=True
+            )
+            self._thread.start()
\ No newline at end of file
@@ -0,0 +1,500 @@
+import argparse
+import logging
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional
+import bcrypt
+from sqlalchemy import insert, text
+from sqlmodel import Session, select
+from reflex.model import get_engine
+from app.models import Parcel, Sensor, SensorData, User
+from app.alerting.episodes import HYSTERESIS_RATIO
+from app.db import set_schema_version
+from app.seed import prepare_database
+
+# Unit and default (min, max) thresholds per sensor type; sensors are spread
+# round-robin over these.
+SENSOR_TYPES = {
+    "temperature": ("C", 2.0, 35.0),
+    "humidity": ("%", 25.0, 95.0),
+    "soil_moisture": ("%", 20.0, 60.0),
+    "light": ("lx", None, None),
+    "co2": ("ppm", None, 1000.0),
+    "voc": ("ppb", None, 500.0),
+    "nox": ("ppb", None, 150.0),
+}
+TYPE_LABELS = {
+    "temperature": "Temp",
+    "humidity": "Humidity",
+    "soil_moisture": "Soil",
+    "light": "Light",
+    "co2": "CO2",
+    "voc": "VOC",
+    "nox": "NOx",
+}
+# Size of an excursion at its peak (sensor fault, heatwave, pump failure...),
+# large enough to cross the thresholds above.
+EXCURSION_SIZE = {
+    "temperature": 14.0,
+    "humidity": -45.0,
+    "soil_moisture": -30.0,
+    "light": 0.0,
+    "co2": 900.0,
+    "voc": 550.0,
+    "nox": 160.0,
+}
+INSERT_BATCH = 200000
+READING_SQL = (
+    "INSERT INTO sensordata (sensor_id, timestamp, value, unit, alert_pending) "
+    "VALUES (?, ?, ?, ?, 0)"
+)
+ALERT_SQL = (
+    "INSERT INTO alert (sensor_id, timestamp, severity, message, is_active, "
+    "acknowledged_at, source, reading_count, peak_value, last_seen, closed_at) "
+    "VALUES (?, ?, 'warning', ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+# SQLAlchemy's SQLite DATETIME storage format, so generated rows compare
+# correctly with the ones the app writes.
+TS_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+@dataclass
+class _SensorModel:
+    id: int
+    sensor_type: str
+    unit: str
+    low: float
+    high: float
+    margin: float
+    offset: float
+    # soil moisture level and next irrigation, in epoch seconds
+    level: float = 0.0
+    next_irrigation: float = 0.0
+    excursion_start: float = 0.0
+    excursion_end: float = 0.0
+    # open threshold episode: [source, opened, limit, first value, count, peak, last]
+    episode: Optional[list] = None
+    alerts: int = 0
+
+
+@dataclass
+class GenerateReport:
+    users: int = 0
+    parcels: int = 0
+    sensors: int = 0
+    readings: int = 0
+    alerts: int = 0
+    seconds: float = 0.0
+    sensor_ids: list[int] = field(default_factory=list)
+
+
+def _ts(epoch: float) -> str:
+    return datetime.utcfromtimestamp(epoch).strftime(TS_FORMAT)
+
+
+def _create_inventory(
+    session: Session,
+    users: int,
+    parcels: int,
+    sensors: int,
+    prefix: str,
+    password: str,
+    created: datetime,
+    rng: random.Random,
+) -> list[tuple[int, str]]:
+    """Users, parcels and sensors; returns (sensor id, type) pairs."""
+    taken = session.exec(
+        select(User.id).where(User.username.like(f"{prefix}\\_%", escape="\\"))
+    ).first()
+    if taken is not None:
+        raise ValueError(
+            f"Users with prefix '{prefix}_' already exist; pick another --prefix"
+        )
+    password_hash = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode(
+        "utf-8"
+    )
+    user_ids = (
+        session.execute(
+            insert(User).returning(User.id, sort_by_parameter_order=True),
+            [
+                {
+                    "username": f"{prefix}_user{i:04d}",
+                    "email": f"{prefix}_user{i:04d}@example.com",
+                    "password_hash": password_hash,
+                    "role": "farmer",
+                    "created_at": created,
+                }
+                for i in range(1, users + 1)
+            ],
+        )
+        .scalars()
+        .all()
+    )
+    parcel_ids = (
+        session.execute(
+            insert(Parcel).returning(Parcel.id, sort_by_parameter_order=True),
+            [
+                {
+                    "name": f"Field {i:05d}",
+                    "location": f"Sector {chr(65 + i % 26)}{i // 26 % 100}",
+                    "area": round(rng.uniform(2.0, 60.0), 1),
+                    "owner_id": user_ids[i % len(user_ids)],
+                    "created_at": created,
+                }
+                for i in range(parcels)
+            ],
+        )
+        .scalars()
+        .all()
+    )
+    types = list(SENSOR_TYPES)
+    values = []
+    for i in range(sensors):
+        sensor_type = types[i % len(types)]
+        _, low, high = SENSOR_TYPES[sensor_type]
+        values.append(
+            {
+                "name": f"{TYPE_LABELS[sensor_type]} Sensor {i + 1:06d}",
+                "sensor_type": sensor_type,
+                "parcel_id": parcel_ids[(i // len(types)) % len(parcel_ids)],
+                "unique_id": f"{prefix.upper()}-{i + 1:06d}",
+                "threshold_min": low,
+                "threshold_max": high,
+                "created_at": created,
+            }
+        )
+    sensor_ids = []
+    for start in range(0, len(values), INSERT_BATCH):
+        sensor_ids.extend(
+            session.execute(
+                insert(Sensor).returning(Sensor.id, sort_by_parameter_order=True),
+                values[start : start + INSERT_BATCH],
+            )
+            .scalars()
+            .all()
+        )
+    session.commit()
+    return [(sid, v["sensor_type"]) for sid, v in zip(sensor_ids, values)]
+
+
+def _models(
+    sensors: list[tuple[int, str]], start: float, rng: random.Random
+) -> list[_SensorModel]:
+    models = []
+    for sensor_id, sensor_type in sensors:
+        unit, low, high = SENSOR_TYPES[sensor_type]
+        low = low if low is not None else -math.inf
+        high = high if high is not None else math.inf
+        margin = (high - low) * HYSTERESIS_RATIO if math.isfinite(high - low) else 0.0
+        if not margin:
+            bound = high if math.isfinite(high) else low
+            margin = abs(bound) * HYSTERESIS_RATIO if math.isfinite(bound) else 0.0
+        models.append(
+            _SensorModel(
+                id=sensor_id,
+                sensor_type=sensor_type,
+                unit=unit,
+                low=low,
+                high=high,
+                margin=margin,
+                offset=rng.gauss(0.0, 1.0),
+                level=rng.uniform(30.0, 45.0),
+                next_irrigation=start + rng.uniform(0, 3) * 86400,
+            )
+        )
+    return models
+
+
+class _Climate:
+    """Shared weather for one time step; sensors add their own offset and noise."""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.day = None
+        self.cloud = 1.0
+        self.anomaly = 0.0
+
+    def at(self, epoch: float) -> dict:
+        moment = datetime.utcfromtimestamp(epoch)
+        day = moment.toordinal()
+        if day != self.day:
+            self.day = day
+            self.cloud = self.rng.uniform(0.25, 1.0)
+            self.anomaly = 0.7 * self.anomaly + self.rng.gauss(0.0, 1.5)
+        hour = moment.hour + moment.minute / 60 + moment.second / 3600
+        season = math.cos(2 * math.pi * (moment.timetuple().tm_yday - 200) / 365)
+        daylight = max(0.0, math.sin(math.pi * (hour - 6) / 12))
+        temperature = (
+            16.0
+            + 8.0 * season
+            + 6.0 * math.sin(2 * math.pi * (hour - 9) / 24)
+            + self.anomaly
+        )
+        return {
+            "hour": hour,
+            "season": season,
+            "daylight": daylight,
+            "temperature": temperature,
+            "light": 60000.0 * daylight * (0.75 + 0.25 * season) * self.cloud,
+            "traffic": math.exp(-((hour - 8) ** 2) / 2)
+            + math.exp(-((hour - 18) ** 2) / 2),
+        }
+
+
+def _value(
+    model: _SensorModel,
+    climate: dict,
+    epoch: float,
+    interval_hours: float,
+    rng: random.Random,
+) -> float:
+    kind = model.sensor_type
+    gauss = rng.gauss
+    if kind == "temperature":
+        value = climate["temperature"] + model.offset + gauss(0.0, 0.3)
+    elif kind == "humidity":
+        value = 65.0 - 2.2 * (climate["temperature"] - 16.0) + 3 * model.offset
+        value = min(100.0, max(15.0, value + gauss(0.0, 1.5)))
+    elif kind == "soil_moisture":
+        # Evaporation, faster in daylight and summer, then an irrigation
+        # pulse every two to four days.
+        model.level -= (
+            0.08 + 0.35 * climate["daylight"] * (1 + 0.5 * climate["season"])
+        ) * interval_hours
+        if epoch >= model.next_irrigation:
+            model.level = 42.0 + 6.0 * rng.random()
+            model.next_irrigation = epoch + (2 + 2 * rng.random()) * 86400
+        model.level = max(5.0, model.level)
+        value = model.level + gauss(0.0, 0.2)
+    elif kind == "light":
+        value = max(0.0, climate["light"] * (1 + 0.05 * model.offset) + gauss(0, 50))
+    elif kind == "co2":
+        daylight = climate["daylight"]
+        value = 420.0 + 70.0 * (1 - daylight) - 25.0 * daylight + gauss(0.0, 8.0)
+    elif kind == "voc":
+        value = max(
+            0.0, 110.0 + 4.0 * (climate["temperature"] - 16.0) + gauss(0.0, 10.0)
+        )
+    else:
+        value = max(0.0, 35.0 + 25.0 * climate["traffic"] + gauss(0.0, 5.0))
+    if model.excursion_end > epoch >= model.excursion_start:
+        progress = (epoch - model.excursion_start) / (
+            model.excursion_end - model.excursion_start
+        )
+        value += EXCURSION_SIZE[kind] * math.sin(math.pi * progress)
+        if kind in ("soil_moisture", "humidity", "voc", "nox", "co2"):
+            value = max(0.0, value)
+    return round(value, 2)
+
+
+def _track_episode(model: _SensorModel, value: float, ts: str, alerts: list):
+    """Open/close threshold episodes the way episodes.check_thresholds does."""
+    episode = model.episode
+    if episode is None:
+        if value > model.high:
+            model.episode = ["threshold_max", ts, model.high, value, 1, value, ts]
+        elif value < model.low:
+            model.episode = ["threshold_min", ts, model.low, value, 1, value, ts]
+        return
+    source, limit = episode[0], episode[2]
+    if source == "threshold_max":
+        cleared = value <= limit - model.margin
+        breached = value > limit
+    else:
+        cleared = value >= limit + model.margin
+        breached = value < limit
+    if breached:
+        episode[4] += 1
+        episode[6] = ts
+        if (value > episode[5]) == (source == "threshold_max"):
+            episode[5] = value
+    if cleared:
+        alerts.append(_alert_row(model, episode, closed_at=ts))
+        model.episode = None
+
+
+def _alert_row(model: _SensorModel, episode: list, closed_at: Optional[str]) -> tuple:
+    source, opened, limit, first, count, peak, last = episode
+    direction = "above maximum" if source == "threshold_max" else "below minimum"
+    model.alerts += 1
+    return (
+        model.id,
+        opened,
+        f"Value {first} {model.unit} is {direction} threshold {limit}",
+        closed_at is None,
+        closed_at,
+        source,
+        count,
+        peak,
+        last,
+        closed_at,
+    )
+
+
+def generate(
+    users: int = 5,
+    parcels: int = 20,
+    sensors: int = 140,
+    days: float = 365,
+    interval: int = 900,
+    excursions_per_day: float = 0.05,
+    end: Optional[datetime] = None,
+    prefix: str = "gen",
+    password: str = "password123",
+    seed: int = 42,
+    keep_indexes: bool = False,
+) -> GenerateReport:
+    """
+    Create `users` farmers owning `parcels` parcels with `sensors` sensors
+    (round-robin over the seven types), and `days` of readings every
+    `interval` seconds up to `end`. Readings are written time-major, as live
+    ingest would, with alert_pending cleared; threshold episodes found in the
+    generated series are written as closed (or still open) alerts.
+    """
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    engine = get_engine()
+    if engine.dialect.name != "sqlite":
+        raise ValueError("The data generator writes through SQLite bulk inserts")
+    prepare_database()
+    end = end or datetime.utcnow()
+    end_epoch = (end - datetime(1970, 1, 1)).total_seconds() // interval * interval
+    steps = int(days * 86400 // interval)
+    start_epoch = end_epoch - (steps - 1) * interval
+    created = datetime.utcfromtimestamp(start_epoch) - timedelta(days=1)
+    report = GenerateReport(users=users, parcels=parcels, sensors=sensors)
+    with Session(engine) as session:
+        inventory = _create_inventory(
+            session, users, parcels, sensors, prefix, password, created, rng
+        )
+    report.sensor_ids = [sensor_id for sensor_id, _ in inventory]
+    models = _models(inventory, start_epoch, rng)
+    logging.info(
+        f"Created {users} users, {parcels} parcels, {sensors} sensors; "
+        f"generating {steps * sensors:,} readings over {steps:,} steps."
+    )
+    indexes = list(SensorData.__table__.indexes)
+    if not keep_indexes:
+        # Building the indexes once at the end is far cheaper than keeping
+        # them up to date row by row. The schema version stays cleared until
+        # they are back, so a start after a killed load recreates them.
+        set_schema_version(engine, 0)
+        with engine.begin() as conn:
+            for index in indexes:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+    excursion_chance = excursions_per_day * interval / 86400
+    interval_hours = interval / 3600
+    climate = _Climate(rng)
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute("PRAGMA synchronous = OFF")
+        cursor.execute("PRAGMA cache_size = -262144")
+        cursor.execute("PRAGMA temp_store = MEMORY")
+        rows: list[tuple] = []
+        alerts: list[tuple] = []
+        last_log = time.perf_counter()
+        for step in range(steps):
+            epoch = start_epoch + step * interval
+            ts = _ts(epoch)
+            weather = climate.at(epoch)
+            for model in models:
+                if epoch >= model.excursion_end and rng.random() < excursion_chance:
+                    model.excursion_start = epoch
+                    model.excursion_end = epoch + rng.uniform(0.5, 4) * 3600
+                value = _value(model, weather, epoch, interval_hours, rng)
+                rows.append((model.id, ts, value, model.unit))
+                if model.episode is not None or not model.low <= value <= model.high:
+                    _track_episode(model, value, ts, alerts)
+            if len(rows) >= INSERT_BATCH:
+                cursor.executemany(READING_SQL, rows)
+                raw.commit()
+                report.readings += len(rows)
+                rows.clear()
+                if time.perf_counter() - last_log > 10:
+                    last_log = time.perf_counter()
+                    elapsed = last_log - started
+                    logging.info(
+                        f"{report.readings:,} readings ({report.readings / elapsed:,.0f}/s), "
+                        f"{100 * (step + 1) / steps:.0f}%"
+                    )
+        for model in models:
+            if model.episode is not None:
+                alerts.append(_alert_row(model, model.episode, closed_at=None))
+        if rows:
+            cursor.executemany(READING_SQL, rows)
+            report.readings += len(rows)
+        cursor.executemany(ALERT_SQL, alerts)
+        report.alerts = len(alerts)
+        cursor.executemany(
+            "UPDATE sensor SET last_seen = ? WHERE id = ?",
+            [(_ts(end_epoch), model.id) for model in models],
+        )
+        raw.commit()
+    finally:
+        raw.close()
+        if not keep_indexes:
+            logging.info("Rebuilding reading indexes...")
+            for index in indexes:
+                index.create(engine, checkfirst=True)
+            set_schema_version(engine)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate users, parcels, sensors and readings for load testing"
+    )
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--parcels", type=int, default=20, help="total parcels")
+    parser.add_argument("--sensors", type=int, default=140, help="total sensors")
+    parser.add_argument("--days", type=float, default=365, help="history length")
+    parser.add_argument(
+        "--interval", type=int, default=900, help="seconds between readings"
+    )
+    parser.add_argument(
+        "--excursions",
+        type=float,
+        default=0.05,
+        help="out-of-range excursions per sensor per day",
+    )
+    parser.add_argument(
+        "--end", type=datetime.fromisoformat, help="last reading (default now)"
+    )
+    parser.add_argument("--prefix", default="gen", help="username/unique_id prefix")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--keep-indexes",
+        action="store_true",
+        help="keep reading indexes during the load (for small appends)",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    try:
+        report = generate(
+            users=args.users,
+            parcels=args.parcels,
+            sensors=args.sensors,
+            days=args.days,
+            interval=args.interval,
+            excursions_per_day=args.excursions,
+            end=args.end,
+            prefix=args.prefix,
+            password=args.password,
+            seed=args.seed,
+            keep_indexes=args.keep_indexes,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    print(
+        f"{report.readings:,} readings and {report.alerts:,} alerts for "
+        f"{report.sensors} sensors in {report.seconds:.1f}s "
+        f"({report.readings / max(report.seconds, 1e-9):,.0f} readings/s)"
+    )
\ No newline at end of file
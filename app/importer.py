@@ -0,0 +1,199 @@
+import csv
+import io
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import insert
+from sqlmodel import select
+from app.models import Parcel, Sensor
+
+SENSOR_STATUSES = ("active", "inactive", "maintenance")
+INSERT_BATCH = 1000
+SENSOR_FIELDS = (
+    "name",
+    "unique_id",
+    "sensor_type",
+    "status",
+    "threshold_min",
+    "threshold_max",
+    "hysteresis",
+)
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    parcels_created: int = 0
+    sensors_created: int = 0
+    errors: list[str] = field(default_factory=list)
+    invalid_rows: int = 0
+    committed: bool = False
+
+
+def parse_rows(content: bytes, filename: str = "") -> tuple[list[dict], int]:
+    """
+    Decode an upload into row dicts and the number errors should give its
+    first row. JSON must be a list of objects, numbered from 1; anything else
+    is read as CSV with a header row, so its data starts at row 2.
+    """
+    text = content.decode("utf-8-sig")
+    if filename.lower().endswith(".json") or text.lstrip().startswith("["):
+        rows = json.loads(text)
+        if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+            raise ValueError("JSON import must be a list of objects")
+        return rows, 1
+    return list(csv.DictReader(io.StringIO(text))), 2
+
+
+def _clean(value) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _float(
+    row: dict, key: str, errors: list[tuple[int, str]], line: int
+) -> Optional[float]:
+    value = _clean(row.get(key))
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        errors.append((line, f"{key} '{value}' is not a number"))
+        return None
+
+
+def import_inventory(
+    session,
+    rows: list[dict],
+    owner_id: int,
+    dry_run: bool = False,
+    first_row: int = 2,
+) -> ImportReport:
+    """
+    Validate and import parcels and sensors for `owner_id`.
+
+    Each row names a `parcel`. Rows that also carry sensor fields create a
+    sensor on it. A parcel that does not exist yet is created from the first
+    row that gives it a `location` (and optional `area`). Every row is
+    validated before anything is written. If any row fails, nothing is
+    imported and the report lists the errors. Otherwise everything is inserted
+    in one transaction.
+    """
+    report = ImportReport(rows=len(rows))
+    errors: list[tuple[int, str]] = []
+    existing_parcels = dict(
+        session.exec(
+            select(Parcel.name, Parcel.id).where(
+                Parcel.owner_id == owner_id, Parcel.deleted_at == None
+            )
+        ).all()
+    )
+    new_parcels: dict[str, dict] = {}
+    parcel_refs: list[tuple[int, str]] = []
+    sensors: list[tuple[int, str, dict]] = []
+    seen_unique_ids: dict[str, int] = {}
+    for line, row in enumerate(rows, start=first_row):
+        parcel_name = _clean(row.get("parcel"))
+        if parcel_name is None:
+            errors.append((line, "parcel is required"))
+            continue
+        parcel_refs.append((line, parcel_name))
+        location = _clean(row.get("location"))
+        if parcel_name not in existing_parcels and parcel_name not in new_parcels:
+            if location is not None:
+                area = _float(row, "area", errors, line)
+                new_parcels[parcel_name] = {
+                    "name": parcel_name,
+                    "location": location,
+                    "area": area or 0.0,
+                    "owner_id": owner_id,
+                    "created_at": datetime.utcnow(),
+                }
+        if not any(_clean(row.get(key)) for key in SENSOR_FIELDS):
+            continue
+        name = _clean(row.get("name"))
+        unique_id = _clean(row.get("unique_id"))
+        sensor_type = _clean(row.get("sensor_type"))
+        status = _clean(row.get("status")) or "active"
+        if not name or not unique_id or not sensor_type:
+            errors.append((line, "name, unique_id and sensor_type are required"))
+            continue
+        if status not in SENSOR_STATUSES:
+            errors.append((line, f"unknown status '{status}'"))
+        if unique_id in seen_unique_ids:
+            errors.append(
+                (
+                    line,
+                    f"unique_id '{unique_id}' repeats row {seen_unique_ids[unique_id]}",
+                )
+            )
+        seen_unique_ids.setdefault(unique_id, line)
+        t_min = _float(row, "threshold_min", errors, line)
+        t_max = _float(row, "threshold_max", errors, line)
+        hysteresis = _float(row, "hysteresis", errors, line)
+        if t_min is not None and t_max is not None and t_min > t_max:
+            errors.append((line, "threshold_min is above threshold_max"))
+        sensors.append(
+            (
+                line,
+                parcel_name,
+                {
+                    "name": name,
+                    "sensor_type": sensor_type,
+                    "unique_id": unique_id,
+                    "status": status,
+                    "threshold_min": t_min,
+                    "threshold_max": t_max,
+                    "hysteresis": hysteresis,
+                },
+            )
+        )
+    for line, parcel_name in parcel_refs:
+        if parcel_name not in existing_parcels and parcel_name not in new_parcels:
+            errors.append((line, f"new parcel '{parcel_name}' needs a location"))
+    if seen_unique_ids:
+        taken = session.exec(
+            select(Sensor.unique_id).where(
+                Sensor.unique_id.in_(list(seen_unique_ids)), Sensor.deleted_at == None
+            )
+        ).all()
+        for unique_id in sorted(taken, key=seen_unique_ids.get):
+            errors.append(
+                (seen_unique_ids[unique_id], f"unique_id '{unique_id}' already exists")
+            )
+    report.errors = [f"Row {line}: {message}" for line, message in sorted(errors)]
+    report.invalid_rows = len({line for line, _ in errors})
+    if errors or dry_run:
+        return report
+    try:
+        parcel_ids = dict(existing_parcels)
+        if new_parcels:
+            created = session.execute(
+                insert(Parcel).returning(
+                    Parcel.name, Parcel.id, sort_by_parameter_order=True
+                ),
+                list(new_parcels.values()),
+            ).all()
+            parcel_ids.update(created)
+        now = datetime.utcnow()
+        values = [
+            {**sensor, "parcel_id": parcel_ids[parcel_name], "created_at": now}
+            for _, parcel_name, sensor in sensors
+        ]
+        for start in range(0, len(values), INSERT_BATCH):
+            session.execute(insert(Sensor), values[start : start + INSERT_BATCH])
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logging.exception(f"Inventory import failed: {e}")
+        report.errors.append(f"Import failed: {e}")
+        return report
+    report.parcels_created = len(new_parcels)
+    report.sensors_created = len(values)
+    report.committed = True
+    return report
\ No newline at end of file
@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+import reflex as rx
+from sqlalchemy import bindparam
+from sqlmodel import select, update, func
+from app.models import Sensor, Parcel, SensorData
+from app.alerting.episodes import tracker as episode_tracker
+
+# How often each sensor type is expected to report, in seconds. A sensor is
+# offline once it has been silent for MISSED_INTERVALS of these.
+EXPECTED_INTERVALS = {
+    "temperature": 300,
+    "humidity": 300,
+    "light": 300,
+    "soil_moisture": 900,
+    "co2": 300,
+    "voc": 300,
+    "nox": 300,
+}
+DEFAULT_INTERVAL = 600
+MISSED_INTERVALS = 3
+SCAN_INTERVAL = 30
+RELOAD_INTERVAL = 300
+LIVENESS_SOURCE = "liveness"
+# Only these statuses are managed automatically; "inactive" and
+# "maintenance" are operator decisions and are left alone.
+MANAGED_STATUSES = ("active", "offline")
+
+
+def _duration(delta: timedelta) -> str:
+    minutes = delta.total_seconds() / 60
+    if minutes < 120:
+        return f"{minutes:.0f} min"
+    if minutes < 48 * 60:
+        return f"{minutes / 60:.0f} h"
+    return f"{minutes / 1440:.0f} days"
+
+
+class LivenessTracker:
+    """
+    Last-seen time per sensor, kept in memory and touched on every ingest.
+    A background loop flushes it to Sensor.last_seen and flips sensors
+    between "active" and "offline", raising a liveness alert episode on the
+    way down and closing it when the sensor reports again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_seen: dict[int, datetime] = {}
+        self._dirty: dict[int, datetime] = {}
+        self._status: dict[int, str] = {}
+        self._timeout: dict[int, timedelta] = {}
+        self._created: dict[int, datetime] = {}
+        self._by_owner: dict[int, set[int]] = {}
+        self._loaded_at: Optional[float] = None
+
+    def touch(self, sensor_id: int, ts: datetime):
+        with self._lock:
+            last = self._last_seen.get(sensor_id)
+            if last is None or ts > last:
+                self._last_seen[sensor_id] = ts
+                self._dirty[sensor_id] = ts
+
+    def invalidate(self):
+        """Reload sensor metadata (status, type, owner) on the next scan."""
+        self._loaded_at = None
+
+    def active_count(self, owner_id: int) -> Optional[int]:
+        """Active sensors for `owner_id`, or None before the first load."""
+        if self._loaded_at is None and not self._status:
+            return None
+        status = self._status
+        return sum(
+            1 for sid in self._by_owner.get(owner_id, ()) if status.get(sid) == "active"
+        )
+
+    def ensure_loaded(self, session):
+        if (
+            self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < RELOAD_INTERVAL
+        ):
+            return
+        rows = session.exec(
+            select(
+                Sensor.id,
+                Sensor.sensor_type,
+                Sensor.status,
+                Sensor.last_seen,
+                Sensor.created_at,
+                Parcel.owner_id,
+            )
+            .join(Parcel, Sensor.parcel_id == Parcel.id)
+            .where(Sensor.deleted_at == None)
+        ).all()
+        missing = [r.id for r in rows if r.last_seen is None]
+        backfill = {}
+        if missing and self._loaded_at is None and not self._last_seen:
+            # First run after the column was added: derive it once from data.
+            backfill = dict(
+                session.exec(
+                    select(SensorData.sensor_id, func.max(SensorData.timestamp))
+                    .where(SensorData.sensor_id.in_(missing))
+                    .group_by(SensorData.sensor_id)
+                ).all()
+            )
+        by_owner: dict[int, set[int]] = {}
+        with self._lock:
+            for r in rows:
+                seen = r.last_seen or backfill.get(r.id)
+                if seen is not None:
+                    if r.id in backfill:
+                        self._dirty[r.id] = seen
+                    last = self._last_seen.get(r.id)
+                    if last is None or seen > last:
+                        self._last_seen[r.id] = seen
+                by_owner.setdefault(r.owner_id, set()).add(r.id)
+            known = {r.id for r in rows}
+            for sid in list(self._last_seen):
+                if sid not in known:
+                    del self._last_seen[sid]
+                    self._dirty.pop(sid, None)
+        self._status = {r.id: r.status for r in rows}
+        self._timeout = {
+            r.id: timedelta(
+                seconds=EXPECTED_INTERVALS.get(r.sensor_type, DEFAULT_INTERVAL)
+                * MISSED_INTERVALS
+            )
+            for r in rows
+        }
+        self._created = {r.id: r.created_at for r in rows}
+        self._by_owner = by_owner
+        self._loaded_at = time.monotonic()
+
+    def flush(self, session, dirty: dict[int, datetime]):
+        """Write last-seen times touched since the previous flush."""
+        if not dirty:
+            return
+        # Only last_seen is written; the search index triggers ignore it.
+        session.connection().execute(
+            update(Sensor.__table__)
+            .where(Sensor.__table__.c.id == bindparam("sensor_id"))
+            .values(last_seen=bindparam("seen")),
+            [{"sensor_id": sid, "seen": ts} for sid, ts in dirty.items()],
+        )
+
+    def scan(self, session, now: datetime) -> list[tuple[int, str]]:
+        """Flip managed sensors whose liveness changed. Returns the transitions."""
+        changes = []
+        for sid, status in self._status.items():
+            if status not in MANAGED_STATUSES:
+                continue
+            last = self._last_seen.get(sid) or self._created.get(sid)
+            if last is None:
+                continue
+            silent = now - last
+            offline = silent > self._timeout[sid]
+            if offline == (status == "offline"):
+                continue
+            new_status = "offline" if offline else "active"
+            changes.append((sid, new_status))
+            expected = self._timeout[sid] / MISSED_INTERVALS
+            episode_tracker.observe(
+                session,
+                sid,
+                LIVENESS_SOURCE,
+                round(silent.total_seconds() / 60, 1),
+                now,
+                breached=offline,
+                cleared=not offline,
+                severity="warning",
+                message=f"Sensor offline: no data for {_duration(silent)} (expected every {_duration(expected)})",
+            )
+        for new_status in ("offline", "active"):
+            ids = [sid for sid, s in changes if s == new_status]
+            if ids:
+                session.exec(
+                    update(Sensor)
+                    .where(Sensor.id.in_(ids), Sensor.status.in_(MANAGED_STATUSES))
+                    .values(status=new_status)
+                )
+        for sid, new_status in changes:
+            self._status[sid] = new_status
+        return changes
+
+    def tick(self, now: Optional[datetime] = None) -> list[tuple[int, str]]:
+        with rx.session() as session:
+            self.ensure_loaded(session)
+            with self._lock:
+                dirty, self._dirty = self._dirty, {}
+            try:
+                self.flush(session, dirty)
+                changes = self.scan(session, now or datetime.utcnow())
+                session.commit()
+            except Exception:
+                with self._lock:
+                    for sid, ts in dirty.items():
+                        self._dirty.setdefault(sid, ts)
+                raise
+        if changes:
+            offline = sum(1 for _, s in changes if s == "offline")
+            logging.info(
+                f"Liveness: {offline} sensors went offline, {len(changes) - offline} recovered."
+            )
+        return changes
+
+    async def run(self):
+        logging.info("Liveness scanner started.")
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                logging.exception(f"Liveness scan failed: {e}")
+                episode_tracker.invalidate()
+                self.invalidate()
+            await asyncio.sleep(SCAN_INTERVAL)
+
+
+liveness = LivenessTracker()
\ No newline at end of file
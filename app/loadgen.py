@@ -0,0 +1,646 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import zlib
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Optional
+import app.mqtt_client as bridge_module
+from app.devices import DEFAULT_MAPPING, key_mappings
+from app.mqtt_client import MAIoTAMQTTClient, MQTT_TOPIC_ROOT, QUEUE_DROPPED
+
+# Raw (mean, spread) per payload key, before the bridge applies its factor.
+RAW_VALUES = {
+    "D1": (2200, 300),
+    "D2": (5500, 800),
+    "D3": (4000, 600),
+    "D4": (5000, 3000),
+    "D5": (4200, 300),
+    "D6": (1200, 200),
+    "D7": (450, 100),
+}
+INBOX_SIZE = 100000
+# A step is saturated when it delivers less than this share of the offered
+# readings, or leaves more than SATURATED_BACKLOG readings queued.
+SATURATION_RATIO = 0.95
+SATURATED_BACKLOG = 1000
+
+
+@dataclass(slots=True)
+class StandInMessage:
+    topic: str
+    payload: bytes
+    published: float
+
+
+class _Connection:
+    """One subscriber's inbox and network thread, delivering in order like paho's loop."""
+
+    def __init__(self, callback, inbox_size: int):
+        self.callback = callback
+        self.inbox: queue.Queue = queue.Queue(maxsize=inbox_size)
+
+    def deliver(self):
+        while True:
+            msg = self.inbox.get()
+            if msg is None:
+                break
+            try:
+                self.callback(None, None, msg)
+            except Exception as e:
+                logging.exception(f"Subscriber failed: {e}")
+
+
+class StandInBroker:
+    """
+    In-process MQTT broker stand-in. Plain subscribers get every message;
+    a shared-subscription group gets each message once, on one member
+    picked round robin or, with hash_topic, by topic as EMQX can.
+    """
+
+    def __init__(self, inbox_size: int = INBOX_SIZE, strategy: str = "round_robin"):
+        self.inbox_size = inbox_size
+        self.strategy = strategy
+        self.subscribers: list[_Connection] = []
+        self.groups: dict[str, list[_Connection]] = {}
+        self._next: dict[str, int] = {}
+        self._threads: list[threading.Thread] = []
+        self.dropped = 0
+
+    def subscribe(self, callback, group: Optional[str] = None):
+        connection = _Connection(callback, self.inbox_size)
+        if group is None:
+            self.subscribers.append(connection)
+        else:
+            self.groups.setdefault(group, []).append(connection)
+            self._next.setdefault(group, 0)
+
+    @property
+    def connections(self) -> list[_Connection]:
+        return self.subscribers + [c for g in self.groups.values() for c in g]
+
+    @property
+    def fanout(self) -> int:
+        """Copies of each message the broker delivers."""
+        return len(self.subscribers) + len(self.groups)
+
+    def pending(self) -> int:
+        return sum(c.inbox.qsize() for c in self.connections)
+
+    def _pick(self, group: str, topic: str) -> _Connection:
+        members = self.groups[group]
+        if self.strategy == "hash_topic":
+            return members[zlib.crc32(topic.encode("utf-8")) % len(members)]
+        index = self._next[group]
+        self._next[group] = (index + 1) % len(members)
+        return members[index]
+
+    def publish(self, topic: str, payload: bytes) -> bool:
+        msg = StandInMessage(topic, payload, time.time())
+        targets = self.subscribers + [self._pick(g, topic) for g in self.groups]
+        delivered = True
+        for connection in targets:
+            try:
+                connection.inbox.put_nowait(msg)
+            except queue.Full:
+                self.dropped += 1
+                delivered = False
+        return delivered
+
+    def start(self):
+        self._threads = [
+            threading.Thread(target=connection.deliver, name=f"broker-{i}", daemon=True)
+            for i, connection in enumerate(self.connections)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def close(self) -> int:
+        """Discard undelivered messages and end the delivery threads."""
+        discarded = sum(_discard(c.inbox) for c in self.connections)
+        for connection in self.connections:
+            connection.inbox.put(None)
+        for thread in self._threads:
+            thread.join()
+        return discarded
+
+
+def _discard(pending: queue.Queue) -> int:
+    count = 0
+    while True:
+        try:
+            pending.get_nowait()
+        except queue.Empty:
+            return count
+        count += 1
+
+
+class VirtualDevice:
+    """One field gateway reporting all seven channels as a random walk."""
+
+    def __init__(self, serial: str, rng: random.Random):
+        self.serial = serial
+        self.topic = f"{MQTT_TOPIC_ROOT}/{serial}"
+        self.rng = rng
+        self.raw = {
+            key: mean + rng.uniform(-spread, spread)
+            for key, (mean, spread) in RAW_VALUES.items()
+        }
+
+    def payload(self) -> bytes:
+        parts = []
+        for key, (mean, spread) in RAW_VALUES.items():
+            value = self.raw[key] + self.rng.gauss(0, spread * 0.05)
+            value += (mean - value) * 0.05
+            self.raw[key] = value
+            parts.append(f"{key}={max(0, int(value))}")
+        return ("CIoTA-" + "&".join(parts)).encode("utf-8")
+
+
+@dataclass
+class Window:
+    started: float
+    published: int = 0
+    dropped: int = 0
+    ok: int = 0
+    errors: dict[str, int] = field(default_factory=dict)
+    latencies: list[float] = field(default_factory=list)
+
+
+class _StubResponse:
+    status_code = 200
+    text = ""
+
+
+class StubAPI:
+    """Answers every POST with 200 after a fixed delay, to load the bridges alone."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def post(self, *args, **kwargs):
+        time.sleep(self.delay)
+        return _StubResponse()
+
+
+class _StatusRecorder:
+    """Wraps the bridge's HTTP client to keep the last status for its thread."""
+
+    def __init__(self, http):
+        self.http = http
+        self._local = threading.local()
+
+    @property
+    def status(self) -> Optional[int]:
+        return getattr(self._local, "status", None)
+
+    def post(self, *args, **kwargs):
+        self._local.status = None
+        response = self.http.post(*args, **kwargs)
+        self._local.status = response.status_code
+        return response
+
+
+class MeasuredBridge(MAIoTAMQTTClient):
+    """
+    The real bridge, with the publish time used as the trace start so the
+    latency covers broker, parse, send queue, HTTP and commit.
+    """
+
+    def __init__(self, http, **kwargs):
+        super().__init__(**kwargs)
+        self.http = _StatusRecorder(http)
+        self._published = 0.0
+        self._lock = threading.Lock()
+        self.window = Window(time.perf_counter())
+
+    def on_message(self, client, userdata, msg):
+        self._published = getattr(msg, "published", None) or time.time()
+        super().on_message(client, userdata, msg)
+
+    def process_data(self, device_id, data, trace_id=None, received=None):
+        super().process_data(device_id, data, trace_id, self._published)
+
+    def send_to_api(self, sensor_unique_id, payload, trace_id=None, received=None):
+        super().send_to_api(sensor_unique_id, payload, trace_id, received)
+        status = self.http.status
+        latency = time.time() - received
+        with self._lock:
+            if status == 200:
+                self.window.ok += 1
+                self.window.latencies.append(latency)
+            else:
+                key = str(status) if status is not None else "error"
+                self.window.errors[key] = self.window.errors.get(key, 0) + 1
+
+    def take_window(self) -> Window:
+        with self._lock:
+            window, self.window = self.window, Window(time.perf_counter())
+        return window
+
+    def close(self) -> int:
+        """Discard queued readings and stop once in-flight requests finish."""
+        discarded = sum(_discard(shard) for shard in self.shards)
+        self.stop_senders()
+        return discarded
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class DBProbe:
+    """Reading count (by max id) and file size of the app database, if reachable."""
+
+    def __init__(self):
+        try:
+            from sqlmodel import func, select
+            from reflex.model import get_engine
+            from app.models import SensorData
+
+            self.engine = get_engine()
+            self.query = select(func.max(SensorData.id))
+            self.path = (
+                self.engine.url.database
+                if self.engine.dialect.name == "sqlite"
+                else None
+            )
+            self.start = self.sample()
+        except Exception as e:
+            logging.warning(f"Database growth will not be reported: {e}")
+            self.engine = None
+            self.start = None
+
+    def sample(self) -> Optional[dict]:
+        if self.engine is None:
+            return None
+        with self.engine.connect() as conn:
+            rows = conn.execute(self.query).scalar() or 0
+        size = (
+            os.path.getsize(self.path) if self.path and os.path.exists(self.path) else 0
+        )
+        return {"max_id": rows, "bytes": size}
+
+
+class LoadGenerator:
+    def __init__(
+        self,
+        bridges: list[MeasuredBridge],
+        devices: int,
+        broker: Optional[StandInBroker],
+        seed: int = 1,
+    ):
+        rng = random.Random(seed)
+        self.bridges = bridges
+        self.devices = [VirtualDevice(f"LOAD-{i:06d}", rng) for i in range(devices)]
+        self.broker = broker
+        # Every virtual device reports for the demo sensors, spread over the
+        # bridges' shards by serial.
+        mappings = key_mappings(DEFAULT_MAPPING)
+        for bridge in bridges:
+            bridge.mappings.replace({d.serial: mappings for d in self.devices})
+        self.readings_per_message = sum(
+            1 for key in RAW_VALUES if key in DEFAULT_MAPPING
+        )
+        self.db = DBProbe()
+        self._next_device = 0
+        self._published = 0
+        self._window_started = time.perf_counter()
+        self._dropped = self._dropped_total()
+
+    def _dropped_total(self) -> int:
+        """Readings dropped by any bridge's send queue and messages the broker dropped."""
+        dropped = int(sum(QUEUE_DROPPED.collect().values()))
+        return dropped + (self.broker.dropped if self.broker else 0)
+
+    def take_window(self) -> Window:
+        """The published count plus every bridge's results since the last call."""
+        dropped = self._dropped_total()
+        window = Window(
+            self._window_started,
+            published=self._published,
+            dropped=dropped - self._dropped,
+        )
+        self._dropped = dropped
+        for bridge in self.bridges:
+            part = bridge.take_window()
+            window.ok += part.ok
+            window.latencies += part.latencies
+            for key, count in part.errors.items():
+                window.errors[key] = window.errors.get(key, 0) + count
+        self._published = 0
+        self._window_started = time.perf_counter()
+        return window
+
+    def _publish(self, count: int):
+        for _ in range(count):
+            device = self.devices[self._next_device]
+            self._next_device = (self._next_device + 1) % len(self.devices)
+            payload = device.payload()
+            if self.broker is not None:
+                if not self.broker.publish(device.topic, payload):
+                    continue
+            else:
+                self.bridges[0].on_message(
+                    None, None, StandInMessage(device.topic, payload, time.time())
+                )
+            self._published += 1
+
+    def drive(self, rate: float, seconds: float):
+        """Publish at `rate` messages/s, spread over the devices, for `seconds`."""
+        tick = 0.01
+        started = time.perf_counter()
+        sent = 0
+        while True:
+            elapsed = time.perf_counter() - started
+            if elapsed >= seconds:
+                break
+            due = int(rate * elapsed) - sent
+            if due > 0:
+                self._publish(due)
+                sent += due
+            time.sleep(tick)
+
+    def report(self, window: Window, offered_rate: float) -> dict:
+        seconds = time.perf_counter() - window.started
+        latencies = sorted(window.latencies)
+        errors = sum(window.errors.values())
+        done = window.ok + errors
+        offered = window.published * self.readings_per_message
+        backlog = sum(b.queue_depth() for b in self.bridges)
+        if self.broker:
+            backlog += (
+                self.broker.pending() * self.readings_per_message // self.broker.fanout
+            )
+        result = {
+            "offered_msgs_per_s": round(offered_rate, 1),
+            "published_msgs_per_s": round(window.published / seconds, 1),
+            "readings_per_s": round(window.ok / seconds, 1),
+            "error_rate": round(errors / done, 4) if done else 0.0,
+            "errors": window.errors,
+            "p50_ms": round(1000 * _percentile(latencies, 0.50), 1),
+            "p95_ms": round(1000 * _percentile(latencies, 0.95), 1),
+            "p99_ms": round(1000 * _percentile(latencies, 0.99), 1),
+            "backlog": backlog,
+            "dropped": window.dropped,
+            "saturated": bool(
+                (offered and done < SATURATION_RATIO * offered)
+                or backlog > SATURATED_BACKLOG
+            ),
+        }
+        db = self.db.sample()
+        if db is not None and self.db.start is not None:
+            result["db_rows_added"] = db["max_id"] - self.db.start["max_id"]
+            result["db_mb"] = round(db["bytes"] / 1024 / 1024, 1)
+        logging.info(
+            f"offered {result['offered_msgs_per_s']}/s -> {result['readings_per_s']} readings/s, "
+            f"p50 {result['p50_ms']} ms p99 {result['p99_ms']} ms, "
+            f"errors {result['error_rate']:.1%}, backlog {backlog}"
+            + (" SATURATED" if result["saturated"] else "")
+        )
+        return result
+
+    def step_load(
+        self,
+        start_rate: float,
+        step: float,
+        max_rate: float,
+        step_seconds: float,
+        keep_going: bool = False,
+    ) -> dict:
+        """Raise the rate step by step; the last unsaturated step is the sustained max."""
+        steps = []
+        sustained = None
+        rate = start_rate
+        while rate <= max_rate:
+            self.take_window()
+            self.drive(rate, step_seconds)
+            result = self.report(self.take_window(), rate)
+            steps.append(result)
+            if result["saturated"]:
+                if not keep_going:
+                    break
+            else:
+                sustained = rate
+            rate += step
+        return {
+            "mode": "step",
+            "max_sustained_msgs_per_s": sustained,
+            "max_sustained_readings_per_s": sustained * self.readings_per_message
+            if sustained
+            else None,
+            "steps": steps,
+        }
+
+    def soak(self, rate: float, duration: float, report_every: float) -> dict:
+        """Hold one rate, reporting every `report_every` seconds."""
+        windows = []
+        self.take_window()
+        remaining = duration
+        while remaining > 0:
+            chunk = min(report_every, remaining)
+            self.drive(rate, chunk)
+            windows.append(self.report(self.take_window(), rate))
+            remaining -= chunk
+        return {"mode": "soak", "rate_msgs_per_s": rate, "windows": windows}
+
+    def close(self):
+        """
+        Throw away the backlog and stop the broker and bridges, so a later
+        run does not share the API with this one's leftovers.
+        """
+        messages = self.broker.close() if self.broker else 0
+        readings = sum(bridge.close() for bridge in self.bridges)
+        logging.info(
+            f"Stopped {len(self.bridges)} bridge(s), discarding {messages} "
+            f"queued messages and {readings} queued readings."
+        )
+
+
+def start_bridges(
+    http_factory,
+    instances: int,
+    broker: Optional[StandInBroker],
+    partition: bool = False,
+    share_group: str = "loadgen",
+) -> list[MeasuredBridge]:
+    """
+    K bridges with their own client ids, either in one shared-subscription
+    group or each keeping its own device partition.
+    """
+    bridges = []
+    for i in range(instances):
+        if partition:
+            options = {"instance": i, "instances": instances, "share_group": None}
+        else:
+            group = share_group if instances > 1 else None
+            options = {"instance": 0, "instances": 1, "share_group": group}
+        bridge = MeasuredBridge(http_factory(), client_id=f"loadgen-{i}", **options)
+        if broker is not None:
+            broker.subscribe(bridge.on_message, options["share_group"])
+        bridge.start_senders()
+        bridges.append(bridge)
+    if broker is not None:
+        broker.start()
+    return bridges
+
+
+def in_process_api():
+    """
+    The ingest route on its own ASGI app, with the alert worker running as
+    it does in the real app, reached through Starlette's in-process client.
+    """
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.api import ingest_sensor_data
+    from app.alerting.worker import worker as alert_worker
+    from app.seed import prepare_database
+
+    prepare_database()
+
+    @asynccontextmanager
+    async def lifespan(_):
+        task = asyncio.create_task(alert_worker.run())
+        yield
+        task.cancel()
+
+    api = FastAPI(lifespan=lifespan)
+    api.add_api_route(
+        "/api/sensors/{unique_id}/data", ingest_sensor_data, methods=["POST"]
+    )
+    return TestClient(api, raise_server_exceptions=False), "http://testserver/api"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Drive the MQTT bridge and ingest API with synthetic devices"
+    )
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument(
+        "--api", default=bridge_module.API_BASE_URL, help="ingest API base URL"
+    )
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="serve the ingest route in this process against REFLEX_DB_URL",
+    )
+    parser.add_argument(
+        "--stub-api-ms",
+        type=float,
+        help="answer every POST with 200 after this many ms, to load the bridges alone",
+    )
+    parser.add_argument(
+        "--direct",
+        action="store_true",
+        help="call on_message from the generator instead of the broker stand-in",
+    )
+    parser.add_argument("--instances", type=int, default=1, help="bridge instances")
+    parser.add_argument(
+        "--partition",
+        action="store_true",
+        help="split devices by hash instead of using a shared subscription",
+    )
+    parser.add_argument(
+        "--share-strategy", choices=("round_robin", "hash_topic"), default="round_robin"
+    )
+    parser.add_argument(
+        "--shards", type=int, default=bridge_module.SHARDS, help="senders per bridge"
+    )
+    parser.add_argument("--out", help="write the results as JSON")
+    parser.add_argument("--seed", type=int, default=1)
+    modes = parser.add_subparsers(dest="mode", required=True)
+    step_parser = modes.add_parser("step", help="step the rate up until saturation")
+    scale_parser = modes.add_parser(
+        "scale", help="step load with 1..--instances bridges and compare"
+    )
+    for p in (step_parser, scale_parser):
+        p.add_argument("--start-rate", type=float, default=5)
+        p.add_argument("--step", type=float, default=5)
+        p.add_argument("--max-rate", type=float, default=500)
+        p.add_argument("--step-seconds", type=float, default=20)
+    step_parser.add_argument(
+        "--keep-going", action="store_true", help="continue past saturation"
+    )
+    soak_parser = modes.add_parser("soak", help="hold one rate for a long run")
+    soak_parser.add_argument("--rate", type=float, required=True)
+    soak_parser.add_argument("--duration", type=float, default=600)
+    soak_parser.add_argument("--report-every", type=float, default=10)
+    args = parser.parse_args()
+    if args.direct and (args.instances > 1 or args.mode == "scale"):
+        parser.error("--direct drives a single bridge; drop it to run several")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    bridge_module.SHARDS = args.shards
+    if args.stub_api_ms is not None:
+        delay = args.stub_api_ms / 1000
+        http_factory, base_url = (lambda: StubAPI(delay)), "http://stub/api"
+    elif args.in_process:
+        client, base_url = in_process_api()
+        client.__enter__()
+        http_factory = lambda: client
+    else:
+        import requests
+
+        http_factory, base_url = requests.Session, args.api
+    bridge_module.API_BASE_URL = base_url
+
+    def generator_for(instances: int) -> LoadGenerator:
+        broker = None if args.direct else StandInBroker(strategy=args.share_strategy)
+        bridges = start_bridges(http_factory, instances, broker, args.partition)
+        return LoadGenerator(bridges, args.devices, broker, seed=args.seed)
+
+    if args.mode == "step":
+        result = generator_for(args.instances).step_load(
+            args.start_rate,
+            args.step,
+            args.max_rate,
+            args.step_seconds,
+            args.keep_going,
+        )
+        print(
+            f"Max sustained: {result['max_sustained_msgs_per_s']} msgs/s "
+            f"({result['max_sustained_readings_per_s']} readings/s)"
+        )
+    elif args.mode == "scale":
+        runs = []
+        for instances in range(1, args.instances + 1):
+            logging.info(f"--- {instances} bridge(s)")
+            generator = generator_for(instances)
+            try:
+                run = generator.step_load(
+                    args.start_rate, args.step, args.max_rate, args.step_seconds
+                )
+            finally:
+                generator.close()
+            runs.append({"instances": instances, **run})
+        base = runs[0]["max_sustained_msgs_per_s"]
+        for run in runs:
+            sustained = run["max_sustained_msgs_per_s"]
+            run["efficiency"] = (
+                round(sustained / (base * run["instances"]), 2)
+                if base and sustained
+                else None
+            )
+            print(
+                f"{run['instances']} bridge(s): {sustained} msgs/s sustained, "
+                f"efficiency {run['efficiency']}"
+            )
+        result = {"mode": "scale", "runs": runs}
+    else:
+        result = generator_for(args.instances).soak(
+            args.rate, args.duration, args.report_every
+        )
+    result["devices"] = args.devices
+    result["instances"] = args.instances
+    result["partition"] = args.partition
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
\ No newline at end of file
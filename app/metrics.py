@@ -0,0 +1,257 @@
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from reflex.middleware import Middleware
+
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Which API handler or state event the current task is serving; DB queries
+# are attributed to it.
+current_handler: ContextVar[str] = ContextVar("current_handler", default="background")
+
+
+class _Shards:
+    """
+    One dict per thread, so recording never takes a lock. Only the exporter
+    walks all shards, and copying a dict is atomic under the GIL.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._all: list[dict] = []
+        self._lock = threading.Lock()
+
+    def mine(self) -> dict:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._all.append(values)
+            return values
+
+    def snapshots(self) -> list[dict]:
+        with self._lock:
+            shards = list(self._all)
+        return [dict(shard) for shard in shards]
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._shards = _Shards()
+
+    def inc(self, *label_values: str, amount: float = 1):
+        values = self._shards.mine()
+        values[label_values] = values.get(label_values, 0) + amount
+
+    def collect(self) -> dict[tuple, float]:
+        totals: dict[tuple, float] = {}
+        for shard in self._shards.snapshots():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_labels(self.labels, key)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._shards = _Shards()
+
+    def observe(self, value: float, *label_values: str):
+        values = self._shards.mine()
+        slots = values.get(label_values)
+        if slots is None:
+            # One slot per bucket plus +Inf, then the running sum.
+            slots = values[label_values] = [0] * (len(self.buckets) + 2)
+        slots[bisect_left(self.buckets, value)] += 1
+        slots[-1] += value
+
+    def collect(self) -> dict[tuple, list]:
+        totals: dict[tuple, list] = {}
+        for shard in self._shards.snapshots():
+            for key, slots in shard.items():
+                total = totals.setdefault(key, [0] * len(slots))
+                for i, v in enumerate(list(slots)):
+                    total[i] += v
+        return totals
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        bounds = [_number(b) for b in self.buckets] + ["+Inf"]
+        for key, slots in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(bounds, slots):
+                cumulative += count
+                labels = _labels(self.labels + ("le",), key + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_number(slots[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """A value read at export time, e.g. a queue length."""
+
+    def __init__(
+        self, name: str, help: str, read: Optional[Callable[[], float]] = None
+    ):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        if self.read is not None:
+            lines.append(f"{self.name} {_number(self.read())}")
+        return lines
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+READINGS_INGESTED = Counter(
+    "agrotech_readings_ingested_total",
+    "Sensor readings stored, by sensor type.",
+    ("sensor_type",),
+)
+ALERTS_CREATED = Counter(
+    "agrotech_alerts_created_total",
+    "Alert episodes opened, by source and severity.",
+    ("source", "severity"),
+)
+API_DURATION = Histogram(
+    "agrotech_api_request_duration_seconds",
+    "REST handler latency, including ingest.",
+    ("handler",),
+)
+DB_QUERY_DURATION = Histogram(
+    "agrotech_db_query_duration_seconds",
+    "SQL statement time by the API handler or state event that ran it; _count is the query count.",
+    ("handler",),
+)
+EVENT_DURATION = Histogram(
+    "agrotech_event_duration_seconds",
+    "Reflex event handler time, including sending its delta.",
+    ("state", "handler"),
+)
+REGISTRY = [
+    READINGS_INGESTED,
+    ALERTS_CREATED,
+    API_DURATION,
+    DB_QUERY_DURATION,
+    EVENT_DURATION,
+]
+
+
+def render(registry: Optional[list] = None) -> str:
+    lines = []
+    for metric in REGISTRY if registry is None else registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def timed_handler(fn):
+    """Record latency for an API handler and attribute its queries to it."""
+    name = fn.__name__
+
+    @wraps(fn)
+    async def wrapper(*args, **kwargs):
+        token = current_handler.set(f"api.{name}")
+        start = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            API_DURATION.observe(time.perf_counter() - start, name)
+            current_handler.reset(token)
+
+    return wrapper
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_metrics_start", None)
+    if start is not None:
+        DB_QUERY_DURATION.observe(time.perf_counter() - start, current_handler.get())
+
+
+def instrument_engines():
+    """Time every SQL statement on every engine. Safe to call more than once."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class EventMetricsMiddleware(Middleware):
+    """
+    Times Reflex event handlers. Each event runs in its own task, and this
+    hook runs at the start of it, so the task's completion marks the end.
+    """
+
+    async def preprocess(self, app, state, event):
+        task = asyncio.current_task()
+        if task is None:
+            return None
+        path, _, handler = event.name.rpartition(".")
+        state_name = path.rpartition(".")[2].rpartition("____")[2]
+        current_handler.set(f"{state_name}.{handler}")
+        start = time.perf_counter()
+        task.add_done_callback(
+            lambda _: EVENT_DURATION.observe(
+                time.perf_counter() - start, state_name, handler
+            )
+        )
+        return None
\ No newline at end of file
@@ -1,12 +1,13 @@
 import reflex as rx
 from typing import Optional
 from datetime import datetime
+from sqlalchemy import Index, text
 from sqlmodel import Field, SQLModel
 
 
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    username: str
+    username: str = Field(unique=True, index=True)
     email: str
     password_hash: str
     role: str = "farmer"
@@ -18,20 +19,24 @@ class Parcel(SQLModel, table=True):
     name: str
     location: str
     area: float
-    owner_id: int = Field(foreign_key="user.id")
+    owner_id: int = Field(foreign_key="user.id", index=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    deleted_at: Optional[datetime] = None
 
 
 class Sensor(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
     sensor_type: str
-    parcel_id: int = Field(foreign_key="parcel.id")
-    unique_id: str
+    parcel_id: int = Field(foreign_key="parcel.id", index=True)
+    unique_id: str = Field(index=True)
     status: str = "active"
     threshold_min: Optional[float] = None
     threshold_max: Optional[float] = None
+    hysteresis: Optional[float] = None
+    last_seen: Optional[datetime] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    deleted_at: Optional[datetime] = None
 
 
 class SensorData(SQLModel, table=True):
@@ -40,13 +45,59 @@ class SensorData(SQLModel, table=True):
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     value: float
     unit: str
+    alert_pending: bool = False
+
+    __table_args__ = (
+        Index("ix_sensordata_sensor_id_timestamp", "sensor_id", "timestamp"),
+        Index(
+            "ix_sensordata_alert_pending",
+            "id",
+            sqlite_where=text("alert_pending = 1"),
+        ),
+    )
 
 
 class Alert(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    sensor_id: int = Field(foreign_key="sensor.id")
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    sensor_id: int = Field(foreign_key="sensor.id", index=True)
+    timestamp: datetime = Field(default_factory=datetime.utcnow, index=True)
     severity: str
     message: str
     is_active: bool = True
-    acknowledged_at: Optional[datetime] = None
\ No newline at end of file
+    acknowledged_at: Optional[datetime] = None
+    source: Optional[str] = None
+    reading_count: int = 1
+    peak_value: Optional[float] = None
+    last_seen: Optional[datetime] = None
+    closed_at: Optional[datetime] = None
+
+
+class AlertRule(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str
+    rule_type: str
+    sensor_id: Optional[int] = Field(default=None, foreign_key="sensor.id")
+    parcel_id: Optional[int] = Field(default=None, foreign_key="parcel.id")
+    sensor_type: Optional[str] = None
+    params: str = "{}"
+    severity: str = "warning"
+    enabled: bool = True
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class DeviceMapping(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    device_id: str
+    key: str
+    sensor_unique_id: str
+    factor: float = 1.0
+    unit: str
+    sensor_type: str
+    updated_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column_kwargs={"onupdate": datetime.utcnow},
+    )
+
+    __table_args__ = (
+        Index("ix_devicemapping_device_id_key", "device_id", "key", unique=True),
+    )
\ No newline at end of file
@@ -1,10 +1,21 @@
 import paho.mqtt.client as mqtt
 import requests
+import hashlib
 import logging
+import os
+import queue
+import socket
+import threading
 import time
 import re
+import zlib
 from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from typing import Optional
+from requests.adapters import HTTPAdapter
+from app.devices import DeviceMappingCache
+from app.metrics import Counter, Gauge, Histogram, LATENCY_BUCKETS, render
+from app.tracing import TRACE_HEADER, TRACE_START_HEADER, new_trace_id, tracer
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -12,41 +23,225 @@ logging.basicConfig(
 logger = logging.getLogger("MAIoTA_MQTT")
 MQTT_BROKER = "broker.emqx.io"
 MQTT_PORT = 1883
-MQTT_TOPIC = "Awi7LJfyyn6LPjg/15046220"
+MQTT_TOPIC_ROOT = "Awi7LJfyyn6LPjg"
+# Comma-separated subscriptions; the last topic level names the device.
+MQTT_TOPICS = [
+    t.strip()
+    for t in os.getenv("MQTT_TOPICS", f"{MQTT_TOPIC_ROOT}/+").split(",")
+    if t.strip()
+]
 API_BASE_URL = "http://localhost:8000/api"
-SENSOR_MAPPING = {
-    "D1": {"id": "SENS-002", "factor": 0.01, "unit": "C", "type": "temperature"},
-    "D2": {"id": "SENS-004", "factor": 0.01, "unit": "%", "type": "humidity"},
-    "D3": {"id": "SENS-001", "factor": 0.01, "unit": "%", "type": "soil_moisture"},
-    "D4": {"id": "SENS-003", "factor": 0.1, "unit": "lx", "type": "light"},
-    "D5": {"id": "SENS-005", "factor": 0.1, "unit": "ppm", "type": "co2"},
-    "D6": {"id": "SENS-006", "factor": 0.1, "unit": "ppb", "type": "voc"},
-    "D7": {"id": "SENS-007", "factor": 0.1, "unit": "ppb", "type": "nox"},
-}
+# Broker client ids must be unique, or two bridges keep disconnecting each
+# other; the default is derived from the host and process.
+MQTT_CLIENT_ID = os.getenv("MQTT_CLIENT_ID")
+CLIENT_ID_PREFIX = "Reflex_Agrotech"
+# Running K bridges. With MQTT_SHARE_GROUP they join an MQTT v5 shared
+# subscription ($share/<group>/<topic>) and the broker hands each message
+# to one member; per-device order then depends on the broker's dispatch
+# strategy (e.g. EMQX hash_topic). With MQTT_INSTANCES=K and MQTT_INSTANCE=i
+# each bridge receives everything and keeps only the devices that hash to
+# partition i: nothing to coordinate, no duplicates, and a device always
+# goes through the same bridge, in order.
+MQTT_SHARE_GROUP = os.getenv("MQTT_SHARE_GROUP")
+MQTT_INSTANCES = int(os.getenv("MQTT_INSTANCES", "1"))
+MQTT_INSTANCE = int(os.getenv("MQTT_INSTANCE", "0"))
+# Sender threads. Each device always lands on the same shard, so its
+# readings are sent in arrival order while devices proceed in parallel.
+SHARDS = int(os.getenv("MQTT_SHARDS", "8"))
+METRICS_HOST = os.getenv("MQTT_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("MQTT_METRICS_PORT", str(9101 + MQTT_INSTANCE)))
+# Per shard.
+SEND_QUEUE_SIZE = 10000
+SUMMARY_INTERVAL = 60
+
+MESSAGES_RECEIVED = Counter(
+    "mqtt_messages_received_total", "MQTT messages received from the broker."
+)
+PARSE_FAILURES = Counter(
+    "mqtt_parse_failures_total",
+    "Messages or values that could not be parsed, by reason.",
+    ("reason",),
+)
+PARSE_SECONDS = Histogram(
+    "mqtt_parse_seconds",
+    "Time to decode and parse one message.",
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.01),
+)
+READINGS = Counter(
+    "mqtt_readings_total", "Readings queued for the API, by payload key.", ("key",)
+)
+PARTITION_SKIPPED = Counter(
+    "mqtt_partition_skipped_total",
+    "Messages left to the bridge instance that owns the device's partition.",
+)
+UNKNOWN_DEVICES = Counter(
+    "mqtt_unknown_device_messages_total",
+    "Messages from devices with no rows in DeviceMapping.",
+)
+API_SECONDS = Histogram(
+    "mqtt_api_send_seconds",
+    "Latency of one POST to the ingest API.",
+    buckets=LATENCY_BUCKETS,
+)
+API_RESPONSES = Counter(
+    "mqtt_api_responses_total",
+    "Ingest API responses by HTTP status, or 'error' when the request failed.",
+    ("status",),
+)
+RECONNECTS = Counter(
+    "mqtt_reconnects_total",
+    "Reconnect attempts after a disconnect, by result.",
+    ("result",),
+)
+QUEUE_DROPPED = Counter(
+    "mqtt_queue_dropped_total", "Readings dropped because the send queue was full."
+)
+QUEUE_DEPTH = Gauge(
+    "mqtt_queue_depth", "Readings waiting to be sent to the API, over all shards."
+)
+BRIDGE_METRICS = [
+    MESSAGES_RECEIVED,
+    PARTITION_SKIPPED,
+    PARSE_FAILURES,
+    PARSE_SECONDS,
+    READINGS,
+    UNKNOWN_DEVICES,
+    API_SECONDS,
+    API_RESPONSES,
+    RECONNECTS,
+    QUEUE_DROPPED,
+    QUEUE_DEPTH,
+]
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render(BRIDGE_METRICS).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(host: str = METRICS_HOST, port: int = METRICS_PORT):
+    """Serve the bridge metrics on a local port from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(
+        target=server.serve_forever, name="mqtt-metrics", daemon=True
+    ).start()
+    logger.info(f"Bridge metrics on http://{host}:{port}/metrics")
+    return server
+
+
+def default_client_id() -> str:
+    return f"{CLIENT_ID_PREFIX}_{socket.gethostname()}_{os.getpid()}"
+
+
+def partition_of(device_id: str, instances: int) -> int:
+    """
+    The bridge instance that owns a device. Not crc32, which picks the
+    sender shard: reusing it would leave most shards idle when the shard
+    count and instance count share a factor.
+    """
+    digest = hashlib.blake2b(device_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % instances
 
 
 class MAIoTAMQTTClient:
-    def __init__(self):
-        self.client = mqtt.Client(client_id="Reflex_Agrotech_Client")
+    def __init__(
+        self,
+        client_id: Optional[str] = None,
+        share_group: Optional[str] = MQTT_SHARE_GROUP,
+        instance: int = MQTT_INSTANCE,
+        instances: int = MQTT_INSTANCES,
+    ):
+        if instances > 1 and share_group:
+            raise ValueError("Use a shared subscription or partitions, not both.")
+        if not 0 <= instance < instances:
+            raise ValueError(f"Instance {instance} is outside 0..{instances - 1}.")
+        self.client_id = client_id or MQTT_CLIENT_ID or default_client_id()
+        self.share_group = share_group
+        self.instance = instance
+        self.instances = instances
+        self.client = mqtt.Client(
+            mqtt.CallbackAPIVersion.VERSION2,
+            client_id=self.client_id,
+            protocol=mqtt.MQTTv5,
+        )
         self.client.on_connect = self.on_connect
         self.client.on_message = self.on_message
         self.client.on_disconnect = self.on_disconnect
+        # on_message only parses and enqueues; sender threads do the HTTP
+        # calls, so a slow API shows up as queue depth instead of stalling
+        # the network loop.
+        self.shards: list[queue.Queue] = [
+            queue.Queue(maxsize=SEND_QUEUE_SIZE) for _ in range(max(1, SHARDS))
+        ]
+        self.mappings = DeviceMappingCache()
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=len(self.shards))
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+        self._warned_missing: set[str] = set()
+        self._warned_devices: set[str] = set()
+        self._summary = self._totals()
+        self._summary_at = time.monotonic()
+        self._summary_lock = threading.Lock()
+        self._failure_logged = False
+        self._senders: list[threading.Thread] = []
+        QUEUE_DEPTH.read = self.queue_depth
+
+    def queue_depth(self) -> int:
+        return sum(q.qsize() for q in self.shards)
+
+    def shard_for(self, device_id: str) -> queue.Queue:
+        return self.shards[zlib.crc32(device_id.encode("utf-8")) % len(self.shards)]
 
-    def on_connect(self, client, userdata, flags, rc):
-        if rc == 0:
-            logger.info(f"Connected to MQTT Broker: {MQTT_BROKER}")
-            client.subscribe(MQTT_TOPIC)
-            logger.info(f"Subscribed to topic: {MQTT_TOPIC}")
+    @staticmethod
+    def device_of(topic: str) -> str:
+        return topic.rsplit("/", 1)[-1]
+
+    def subscriptions(self) -> list[str]:
+        if self.share_group:
+            return [f"$share/{self.share_group}/{topic}" for topic in MQTT_TOPICS]
+        return list(MQTT_TOPICS)
+
+    def owns(self, device_id: str) -> bool:
+        return (
+            self.instances <= 1
+            or partition_of(device_id, self.instances) == self.instance
+        )
+
+    def on_connect(self, client, userdata, flags, reason_code, properties=None):
+        if not reason_code.is_failure:
+            logger.info(f"Connected to MQTT Broker: {MQTT_BROKER} as {self.client_id}")
+            topics = self.subscriptions()
+            client.subscribe([(topic, 0) for topic in topics])
+            partition = (
+                f" (partition {self.instance} of {self.instances})"
+                if self.instances > 1
+                else ""
+            )
+            logger.info(f"Subscribed to topics: {', '.join(topics)}{partition}")
         else:
-            logger.error(f"Failed to connect, return code {rc}")
+            logger.error(f"Failed to connect, reason: {reason_code}")
 
-    def on_disconnect(self, client, userdata, rc):
+    def on_disconnect(self, client, userdata, flags, reason_code, properties=None):
         logger.warning("Disconnected from MQTT Broker")
-        if rc != 0:
+        if reason_code.is_failure:
             logger.warning("Unexpected disconnection. Attempting reconnect...")
             try:
                 client.reconnect()
+                RECONNECTS.inc("ok")
             except Exception as e:
+                RECONNECTS.inc("failed")
                 logger.exception(f"Reconnection failed: {e}")
 
     def parse_payload(self, payload_str: str) -> dict[str, float]:
@@ -55,7 +250,8 @@ class MAIoTAMQTTClient:
         Returns a dict of {key: raw_value}
         """
         if not payload_str.startswith("CIoTA-"):
-            logger.warning(f"Invalid payload format (missing prefix): {payload_str}")
+            PARSE_FAILURES.inc("prefix")
+            logger.debug(f"Invalid payload format (missing prefix): {payload_str}")
             return {}
         clean_payload = payload_str.replace("CIoTA-", "")
         data = {}
@@ -66,58 +262,229 @@ class MAIoTAMQTTClient:
                 try:
                     data[key] = float(value)
                 except ValueError:
-                    logger.exception(f"Could not parse value for {key}: {value}")
+                    PARSE_FAILURES.inc("value")
+                    logger.debug(f"Could not parse value for {key}: {value}")
         return data
 
-    def process_data(self, data: dict[str, float]):
+    def process_data(
+        self,
+        device_id: str,
+        data: dict[str, float],
+        trace_id: Optional[str] = None,
+        received=None,
+    ):
         """
-        Process parsed data, apply factors, and send to API.
+        Map the device's keys to sensors, apply factors, and queue the
+        readings on the device's shard.
         """
+        mappings = self.mappings.get(device_id)
+        if mappings is None:
+            UNKNOWN_DEVICES.inc()
+            if device_id not in self._warned_devices:
+                self._warned_devices.add(device_id)
+                logger.warning(
+                    f"Device {device_id} has no key mappings. Skipping (logged once)."
+                )
+            return
+        received = received if received is not None else time.time()
         timestamp = datetime.utcnow().isoformat()
+        shard = self.shard_for(device_id)
         for key, raw_value in data.items():
-            if key in SENSOR_MAPPING:
-                mapping = SENSOR_MAPPING[key]
-                processed_value = raw_value * mapping["factor"]
+            mapping = mappings.get(key)
+            if mapping is not None:
+                processed_value = raw_value * mapping.factor
                 processed_value = round(processed_value, 2)
                 payload = {
                     "value": processed_value,
-                    "unit": mapping["unit"],
+                    "unit": mapping.unit,
                     "timestamp": timestamp,
-                    "type": mapping["type"],
+                    "type": mapping.type,
                 }
-                self.send_to_api(mapping["id"], payload)
+                try:
+                    shard.put_nowait(
+                        (
+                            mapping.sensor_id,
+                            payload,
+                            trace_id,
+                            received,
+                            time.perf_counter(),
+                        )
+                    )
+                except queue.Full:
+                    QUEUE_DROPPED.inc()
+                    continue
+                READINGS.inc(key)
+            else:
+                READINGS.inc("unmapped")
 
-    def send_to_api(self, sensor_unique_id: str, payload: dict):
+    def send_to_api(
+        self,
+        sensor_unique_id: str,
+        payload: dict,
+        trace_id: Optional[str] = None,
+        received: Optional[float] = None,
+    ):
         url = f"{API_BASE_URL}/sensors/{sensor_unique_id}/data"
+        headers = None
+        if trace_id:
+            # The API times its own phases under the same id, and the
+            # receive time lets it close the end-to-end span at commit.
+            headers = {TRACE_HEADER: trace_id}
+            if received is not None:
+                headers[TRACE_START_HEADER] = f"{received:.6f}"
+        sent_at = time.time()
+        start = time.perf_counter()
+        status = "error"
         try:
-            response = requests.post(url, json=payload, timeout=5)
-            if response.status_code == 200:
-                logger.info(
-                    f"Data sent for {sensor_unique_id}: {payload['value']} {payload['unit']}"
-                )
-            elif response.status_code == 404:
+            response = self.http.post(url, json=payload, headers=headers, timeout=5)
+            status = str(response.status_code)
+        except requests.exceptions.RequestException as e:
+            API_RESPONSES.inc("error")
+            self._failed(f"API Request failed for {sensor_unique_id}: {e}")
+            return
+        finally:
+            elapsed = time.perf_counter() - start
+            API_SECONDS.observe(elapsed)
+            tracer.record(
+                trace_id,
+                "mqtt.send",
+                sent_at,
+                elapsed,
+                sensor=sensor_unique_id,
+                status=status,
+            )
+        API_RESPONSES.inc(status)
+        if response.status_code == 200:
+            logger.debug(
+                f"Data sent for {sensor_unique_id}: {payload['value']} {payload['unit']}"
+            )
+        elif response.status_code == 404:
+            if sensor_unique_id not in self._warned_missing:
+                self._warned_missing.add(sensor_unique_id)
                 logger.warning(
-                    f"Sensor {sensor_unique_id} not found in backend. Skipping."
-                )
-            else:
-                logger.error(
-                    f"Failed to send data for {sensor_unique_id}. Status: {response.status_code}, Response: {response.text}"
+                    f"Sensor {sensor_unique_id} not found in backend. Skipping (logged once)."
                 )
-        except requests.exceptions.RequestException as e:
-            logger.exception(f"API Request failed for {sensor_unique_id}: {e}")
+        else:
+            self._failed(
+                f"Failed to send data for {sensor_unique_id}. Status: {response.status_code}, Response: {response.text[:200]}"
+            )
+
+    def _failed(self, message: str):
+        # Only the first failure per summary interval is logged in full; the
+        # summary line carries the count.
+        if not self._failure_logged:
+            self._failure_logged = True
+            logger.error(message)
+
+    @staticmethod
+    def _totals() -> dict[str, float]:
+        responses = API_RESPONSES.collect()
+        sent = responses.get(("200",), 0)
+        return {
+            "messages": sum(MESSAGES_RECEIVED.collect().values()),
+            "readings": sum(
+                v for k, v in READINGS.collect().items() if k != ("unmapped",)
+            ),
+            "sent": sent,
+            "failed": sum(responses.values()) - sent,
+        }
+
+    def _log_summary(self):
+        """One INFO line per interval instead of one per message."""
+        now = time.monotonic()
+        if now - self._summary_at < SUMMARY_INTERVAL:
+            return
+        with self._summary_lock:
+            if now - self._summary_at < SUMMARY_INTERVAL:
+                return
+            totals = self._totals()
+            delta = {k: int(v - self._summary[k]) for k, v in totals.items()}
+            logger.info(
+                f"Last {now - self._summary_at:.0f}s: {delta['messages']} messages, {delta['readings']} readings, "
+                f"{delta['sent']} sent, {delta['failed']} failed, queue {self.queue_depth()}"
+            )
+            self._summary = totals
+            self._summary_at = now
+            self._failure_logged = False
+
+    def send_loop(self, shard: int = 0):
+        """Drain one shard's queue into the API; runs on its own thread."""
+        pending = self.shards[shard]
+        while True:
+            try:
+                item = pending.get(timeout=SUMMARY_INTERVAL)
+            except queue.Empty:
+                self._log_summary()
+                continue
+            if item is None:
+                break
+            sensor_unique_id, payload, trace_id, received, enqueued = item
+            waited = time.perf_counter() - enqueued
+            tracer.record(
+                trace_id,
+                "mqtt.queue",
+                time.time() - waited,
+                waited,
+                sensor=sensor_unique_id,
+            )
+            try:
+                self.send_to_api(sensor_unique_id, payload, trace_id, received)
+            except Exception as e:
+                logger.exception(f"Unexpected error sending {sensor_unique_id}: {e}")
+            self._log_summary()
 
     def on_message(self, client, userdata, msg):
+        device_id = self.device_of(msg.topic)
+        if not self.owns(device_id):
+            PARTITION_SKIPPED.inc()
+            return
+        MESSAGES_RECEIVED.inc()
+        received = time.time()
+        start = time.perf_counter()
+        # One trace per message; every reading it carries shares the id.
+        trace_id = new_trace_id()
         try:
             payload_str = msg.payload.decode("utf-8")
-            logger.info(f"Received payload: {payload_str}")
+            logger.debug(f"Received payload [{trace_id}]: {payload_str}")
             parsed_data = self.parse_payload(payload_str)
+            elapsed = time.perf_counter() - start
+            PARSE_SECONDS.observe(elapsed)
+            tracer.record(
+                trace_id, "mqtt.parse", received, elapsed, readings=len(parsed_data)
+            )
             if parsed_data:
-                self.process_data(parsed_data)
+                self.process_data(device_id, parsed_data, trace_id, received)
+        except UnicodeDecodeError:
+            PARSE_FAILURES.inc("decode")
         except Exception as e:
             logger.exception(f"Error processing message: {e}")
 
+    def start_senders(self):
+        self._senders = [
+            threading.Thread(
+                target=self.send_loop,
+                args=(shard,),
+                name=f"mqtt-sender-{shard}",
+                daemon=True,
+            )
+            for shard in range(len(self.shards))
+        ]
+        for sender in self._senders:
+            sender.start()
+
+    def stop_senders(self):
+        """Send what is already queued, then end the sender threads."""
+        for shard in self.shards:
+            shard.put(None)
+        for sender in self._senders:
+            sender.join()
+        self._senders = []
+
     def run(self):
         logger.info("Starting MAIoTA MQTT Client...")
+        serve_metrics()
+        self.mappings.start()
+        self.start_senders()
         try:
             self.client.connect(MQTT_BROKER, MQTT_PORT, 60)
             self.client.loop_forever()
@@ -6,6 +6,15 @@ from app.states.alert_state import AlertState
 
 def alert_row(alert: dict) -> rx.Component:
     return rx.el.tr(
+        rx.el.td(
+            rx.el.input(
+                type="checkbox",
+                checked=AlertState.selected_ids.contains(alert["id"]),
+                on_change=lambda _: AlertState.toggle_selected(alert["id"]),
+                class_name="w-4 h-4 text-green-600 border-gray-300 rounded focus:ring-green-500",
+            ),
+            class_name="pl-6 py-4 w-4",
+        ),
         rx.el.td(
             rx.el.div(
                 rx.cond(
@@ -27,6 +36,20 @@ def alert_row(alert: dict) -> rx.Component:
         ),
         rx.el.td(
             rx.el.span(alert["message"], class_name="text-sm text-gray-700"),
+            rx.cond(
+                alert["reading_count"].to(int) > 1,
+                rx.el.p(
+                    f"{alert['reading_count']} readings, peak {alert['peak_value']}, last seen {alert['last_seen']}",
+                    class_name="text-xs text-gray-400 mt-1",
+                ),
+            ),
+            rx.cond(
+                alert["closed_at"],
+                rx.el.p(
+                    f"Back in range at {alert['closed_at']}",
+                    class_name="text-xs text-green-600 mt-1",
+                ),
+            ),
             class_name="px-6 py-4",
         ),
         rx.el.td(
@@ -57,11 +80,26 @@ def alert_row(alert: dict) -> rx.Component:
         rx.el.td(
             rx.cond(
                 alert["is_active"],
-                rx.el.button(
-                    rx.icon("check", class_name="w-4 h-4 mr-1"),
-                    "Acknowledge",
-                    on_click=AlertState.acknowledge_alert(alert["id"]),
-                    class_name="inline-flex items-center px-3 py-1.5 border border-transparent text-xs font-medium rounded-md text-green-700 bg-green-100 hover:bg-green-200 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-green-500",
+                rx.el.div(
+                    rx.el.button(
+                        rx.icon("check", class_name="w-4 h-4 mr-1"),
+                        "Acknowledge",
+                        on_click=AlertState.acknowledge_alert(alert["id"]),
+                        class_name="inline-flex items-center px-3 py-1.5 border border-transparent text-xs font-medium rounded-md text-green-700 bg-green-100 hover:bg-green-200 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-green-500",
+                    ),
+                    rx.el.button(
+                        rx.icon("check-check", class_name="w-4 h-4"),
+                        title="Acknowledge all alerts from this sensor",
+                        on_click=AlertState.acknowledge_sensor(alert["sensor_id"]),
+                        class_name="p-1.5 text-gray-400 hover:text-green-600 hover:bg-green-50 rounded-md transition-colors",
+                    ),
+                    rx.el.button(
+                        rx.icon("map", class_name="w-4 h-4"),
+                        title="Acknowledge all alerts in this parcel",
+                        on_click=AlertState.acknowledge_parcel(alert["parcel_id"]),
+                        class_name="p-1.5 text-gray-400 hover:text-green-600 hover:bg-green-50 rounded-md transition-colors",
+                    ),
+                    class_name="flex justify-end items-center gap-1",
                 ),
                 rx.el.span("-", class_name="text-gray-400"),
             ),
@@ -71,6 +109,36 @@ def alert_row(alert: dict) -> rx.Component:
     )
 
 
+def pagination_bar() -> rx.Component:
+    return rx.el.div(
+        rx.el.p(
+            f"Showing {AlertState.page_start}-{AlertState.page_end} of {AlertState.total_alerts}",
+            class_name="text-sm text-gray-500",
+        ),
+        rx.el.div(
+            rx.el.button(
+                rx.icon("chevron-left", class_name="w-4 h-4 mr-1"),
+                "Previous",
+                on_click=AlertState.prev_page,
+                disabled=AlertState.page <= 1,
+                class_name="flex items-center px-3 py-1.5 bg-white border border-gray-300 text-sm text-gray-700 rounded-lg hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed",
+            ),
+            rx.el.span(
+                f"Page {AlertState.page}", class_name="text-sm text-gray-600 px-3"
+            ),
+            rx.el.button(
+                "Next",
+                rx.icon("chevron-right", class_name="w-4 h-4 ml-1"),
+                on_click=AlertState.next_page,
+                disabled=~AlertState.has_next_page,
+                class_name="flex items-center px-3 py-1.5 bg-white border border-gray-300 text-sm text-gray-700 rounded-lg hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed",
+            ),
+            class_name="flex items-center",
+        ),
+        class_name="flex justify-between items-center mt-4",
+    )
+
+
 def alerts_page() -> rx.Component:
     return rx.el.div(
         sidebar(),
@@ -110,12 +178,52 @@ def alerts_page() -> rx.Component:
                             on_change=AlertState.set_severity_filter,
                             class_name="px-4 py-2 border border-gray-200 rounded-lg focus:outline-none focus:ring-2 focus:ring-green-500 bg-white",
                         ),
+                        rx.el.div(
+                            rx.cond(
+                                AlertState.selected_ids.length() > 0,
+                                rx.el.div(
+                                    rx.el.button(
+                                        rx.icon("check", class_name="w-4 h-4 mr-1"),
+                                        f"Acknowledge {AlertState.selected_ids.length()}",
+                                        on_click=AlertState.acknowledge_selected,
+                                        class_name="flex items-center px-3 py-2 text-sm font-medium rounded-lg text-green-700 bg-green-100 hover:bg-green-200",
+                                    ),
+                                    rx.el.button(
+                                        rx.icon("circle-x", class_name="w-4 h-4 mr-1"),
+                                        f"Close {AlertState.selected_ids.length()}",
+                                        on_click=AlertState.close_selected,
+                                        class_name="flex items-center px-3 py-2 text-sm font-medium rounded-lg text-gray-700 bg-gray-100 hover:bg-gray-200",
+                                    ),
+                                    class_name="flex gap-2",
+                                ),
+                            ),
+                            rx.el.button(
+                                rx.icon("check-check", class_name="w-4 h-4 mr-1"),
+                                "Acknowledge All Matching",
+                                on_click=AlertState.acknowledge_filtered,
+                                class_name="flex items-center px-3 py-2 bg-white border border-gray-300 text-sm text-gray-700 rounded-lg hover:bg-gray-50",
+                            ),
+                            class_name="flex gap-2 ml-auto",
+                        ),
                         class_name="flex gap-4 mb-6",
                     ),
                     rx.el.div(
                         rx.el.table(
                             rx.el.thead(
                                 rx.el.tr(
+                                    rx.el.th(
+                                        rx.el.input(
+                                            type="checkbox",
+                                            checked=(AlertState.alerts.length() > 0)
+                                            & (
+                                                AlertState.selected_ids.length()
+                                                == AlertState.alerts.length()
+                                            ),
+                                            on_change=AlertState.toggle_select_page,
+                                            class_name="w-4 h-4 text-green-600 border-gray-300 rounded focus:ring-green-500",
+                                        ),
+                                        class_name="pl-6 py-3 w-4",
+                                    ),
                                     rx.el.th(
                                         "Sensor",
                                         class_name="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider",
@@ -125,7 +233,20 @@ def alerts_page() -> rx.Component:
                                         class_name="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider",
                                     ),
                                     rx.el.th(
-                                        "Time",
+                                        rx.el.button(
+                                            "Time",
+                                            rx.cond(
+                                                AlertState.sort_desc,
+                                                rx.icon(
+                                                    "arrow-down", class_name="w-3 h-3"
+                                                ),
+                                                rx.icon(
+                                                    "arrow-up", class_name="w-3 h-3"
+                                                ),
+                                            ),
+                                            on_click=AlertState.toggle_sort,
+                                            class_name="inline-flex items-center gap-1 uppercase tracking-wider hover:text-gray-700",
+                                        ),
                                         class_name="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider",
                                     ),
                                     rx.el.th(
@@ -146,7 +267,7 @@ def alerts_page() -> rx.Component:
                                     rx.el.tr(
                                         rx.el.td(
                                             "No alerts found matching criteria",
-                                            col_span=5,
+                                            col_span=6,
                                             class_name="px-6 py-8 text-center text-gray-500 italic",
                                         )
                                     ),
@@ -157,6 +278,7 @@ def alerts_page() -> rx.Component:
                         ),
                         class_name="bg-white rounded-xl border border-gray-200 overflow-hidden shadow-sm",
                     ),
+                    pagination_bar(),
                     class_name="p-6 md:p-8 max-w-7xl mx-auto",
                 ),
                 class_name="flex-1 bg-gray-50 overflow-y-auto",
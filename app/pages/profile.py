@@ -2,6 +2,7 @@ import reflex as rx
 from app.components.sidebar import sidebar
 from app.components.navbar import navbar
 from app.states.auth_state import AuthState
+from app.states.profile_state import ProfileState
 
 
 def profile_info_row(label: str, value: str) -> rx.Component:
@@ -36,13 +37,11 @@ def profile_page() -> rx.Component:
                                     class_name="h-24 w-24 rounded-full bg-gray-100 flex items-center justify-center mb-4 mx-auto",
                                 ),
                                 rx.el.h3(
-                                    rx.cond(
-                                        AuthState.user, AuthState.user.username, ""
-                                    ),
+                                    AuthState.display_name,
                                     class_name="text-xl font-bold text-center text-gray-900",
                                 ),
                                 rx.el.p(
-                                    rx.cond(AuthState.user, AuthState.user.role, ""),
+                                    AuthState.role,
                                     class_name="text-sm text-center text-gray-500 uppercase tracking-wide mt-1",
                                 ),
                                 class_name="p-6 border-b border-gray-100 bg-gray-50/50",
@@ -50,25 +49,19 @@ def profile_page() -> rx.Component:
                             rx.el.dl(
                                 profile_info_row(
                                     "Full Name",
-                                    rx.cond(
-                                        AuthState.user, AuthState.user.username, ""
-                                    ),
+                                    AuthState.display_name,
                                 ),
                                 profile_info_row(
                                     "Email Address",
-                                    rx.cond(AuthState.user, AuthState.user.email, ""),
+                                    ProfileState.email,
                                 ),
                                 profile_info_row(
                                     "Role",
-                                    rx.cond(AuthState.user, AuthState.user.role, ""),
+                                    AuthState.role,
                                 ),
                                 profile_info_row(
                                     "Account Created",
-                                    rx.cond(
-                                        AuthState.user,
-                                        AuthState.user.created_at.to_string(),
-                                        "",
-                                    ),
+                                    ProfileState.created_at,
                                 ),
                                 class_name="px-6 py-2",
                             ),
@@ -2,7 +2,6 @@ import reflex as rx
 from app.components.sidebar import sidebar
 from app.components.navbar import navbar
 from app.states.sensor_state import SensorState
-from app.models import Sensor
 
 
 def form_field(label: str, content: rx.Component) -> rx.Component:
@@ -74,8 +73,8 @@ def sensor_dialog(
                             "Parcel",
                             rx.el.select(
                                 rx.foreach(
-                                    SensorState.parcels,
-                                    lambda p: rx.el.option(p.name, value=p.id),
+                                    SensorState.parcel_options,
+                                    lambda p: rx.el.option(p["name"], value=p["id"]),
                                 ),
                                 value=SensorState.parcel_id.to_string(),
                                 on_change=SensorState.set_parcel_id,
@@ -88,6 +87,7 @@ def sensor_dialog(
                         "Status",
                         rx.el.select(
                             rx.el.option("Active", value="active"),
+                            rx.el.option("Offline", value="offline"),
                             rx.el.option("Inactive", value="inactive"),
                             rx.el.option("Maintenance", value="maintenance"),
                             value=SensorState.status,
@@ -120,6 +120,17 @@ def sensor_dialog(
                         ),
                         class_name="grid grid-cols-2 gap-4",
                     ),
+                    form_field(
+                        "Hysteresis Margin",
+                        rx.el.input(
+                            type="number",
+                            step="0.1",
+                            placeholder="Default: 2% of threshold band",
+                            default_value=SensorState.hysteresis,
+                            on_change=SensorState.set_hysteresis,
+                            class_name="w-full px-3 py-2 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-green-500",
+                        ),
+                    ),
                     class_name="flex flex-col",
                 ),
                 rx.el.div(
@@ -182,12 +193,84 @@ def delete_confirmation_dialog() -> rx.Component:
     )
 
 
-def sensor_row(sensor: Sensor) -> rx.Component:
+def import_dialog() -> rx.Component:
+    return rx.radix.primitives.dialog.root(
+        rx.radix.primitives.dialog.portal(
+            rx.radix.primitives.dialog.overlay(
+                class_name="fixed inset-0 bg-black/50 backdrop-blur-sm z-40"
+            ),
+            rx.radix.primitives.dialog.content(
+                rx.radix.primitives.dialog.title(
+                    "Import Sensors", class_name="text-xl font-bold text-gray-900 mb-2"
+                ),
+                rx.radix.primitives.dialog.description(
+                    "Upload a CSV or JSON file with columns parcel, location, area, name, unique_id, sensor_type, status, threshold_min, threshold_max, hysteresis. New parcels need a location. Nothing is imported if any row is invalid.",
+                    class_name="text-sm text-gray-500 mb-4",
+                ),
+                rx.upload(
+                    rx.el.div(
+                        rx.icon("file-up", class_name="w-8 h-8 text-gray-400 mb-2"),
+                        rx.el.p(
+                            "Drop a file here or click to choose",
+                            class_name="text-sm text-gray-600",
+                        ),
+                        rx.foreach(
+                            rx.selected_files("sensor_import"),
+                            lambda f: rx.el.p(f, class_name="text-xs text-gray-500"),
+                        ),
+                        class_name="flex flex-col items-center",
+                    ),
+                    id="sensor_import",
+                    accept={"text/csv": [".csv"], "application/json": [".json"]},
+                    max_files=1,
+                    class_name="border-2 border-dashed border-gray-300 rounded-lg p-6 cursor-pointer hover:border-green-500",
+                ),
+                rx.cond(
+                    SensorState.import_summary != "",
+                    rx.el.p(
+                        SensorState.import_summary,
+                        class_name="mt-4 text-sm font-medium text-gray-800",
+                    ),
+                ),
+                rx.el.div(
+                    rx.foreach(
+                        SensorState.import_errors,
+                        lambda e: rx.el.p(e, class_name="text-xs text-red-600"),
+                    ),
+                    class_name="mt-2 max-h-48 overflow-y-auto",
+                ),
+                rx.el.div(
+                    rx.radix.primitives.dialog.close(
+                        rx.el.button(
+                            "Close",
+                            class_name="px-4 py-2 text-gray-600 bg-gray-100 rounded-lg hover:bg-gray-200 font-medium transition-colors",
+                        )
+                    ),
+                    rx.el.button(
+                        "Import",
+                        on_click=SensorState.handle_import(
+                            rx.upload_files(upload_id="sensor_import")
+                        ),
+                        class_name="px-4 py-2 bg-green-600 text-white rounded-lg hover:bg-green-700 font-medium transition-colors shadow-sm",
+                    ),
+                    class_name="flex justify-end gap-3 mt-6",
+                ),
+                class_name="fixed top-1/2 left-1/2 -translate-x-1/2 -translate-y-1/2 bg-white rounded-xl shadow-2xl p-6 w-full max-w-lg z-50",
+            ),
+        ),
+        open=SensorState.is_import_open,
+        on_open_change=lambda open: rx.cond(
+            open, rx.noop(), SensorState.close_import_dialog()
+        ),
+    )
+
+
+def sensor_row(sensor: dict) -> rx.Component:
     return rx.el.tr(
         rx.el.td(
             rx.el.div(
                 rx.match(
-                    sensor.sensor_type,
+                    sensor["sensor_type"],
                     (
                         "temperature",
                         rx.icon("thermometer", class_name="w-5 h-5 text-orange-500"),
@@ -207,8 +290,11 @@ def sensor_row(sensor: Sensor) -> rx.Component:
                     rx.icon("activity", class_name="w-5 h-5 text-gray-400"),
                 ),
                 rx.el.div(
-                    rx.el.p(sensor.name, class_name="font-medium text-gray-900"),
-                    rx.el.p(sensor.unique_id, class_name="text-xs text-gray-500"),
+                    rx.el.p(sensor["name"], class_name="font-medium text-gray-900"),
+                    rx.el.p(
+                        f"{sensor['unique_id']} · {sensor['parcel_name']}",
+                        class_name="text-xs text-gray-500",
+                    ),
                     class_name="ml-3",
                 ),
                 class_name="flex items-center",
@@ -217,33 +303,43 @@ def sensor_row(sensor: Sensor) -> rx.Component:
         ),
         rx.el.td(
             rx.el.span(
-                sensor.sensor_type,
+                sensor["sensor_type"],
                 class_name="inline-flex items-center px-2.5 py-0.5 rounded-full text-xs font-medium bg-gray-100 text-gray-800 capitalize",
             ),
             class_name="px-6 py-4 whitespace-nowrap",
         ),
         rx.el.td(
             rx.cond(
-                sensor.status == "active",
+                sensor["status"] == "active",
                 rx.el.span(
                     "Active",
                     class_name="inline-flex items-center px-2.5 py-0.5 rounded-full text-xs font-medium bg-green-100 text-green-800",
                 ),
                 rx.cond(
-                    sensor.status == "inactive",
+                    sensor["status"] == "offline",
                     rx.el.span(
-                        "Inactive",
-                        class_name="inline-flex items-center px-2.5 py-0.5 rounded-full text-xs font-medium bg-gray-100 text-gray-800",
+                        "Offline",
+                        class_name="inline-flex items-center px-2.5 py-0.5 rounded-full text-xs font-medium bg-red-100 text-red-800",
                     ),
-                    rx.el.span(
-                        "Maintenance",
-                        class_name="inline-flex items-center px-2.5 py-0.5 rounded-full text-xs font-medium bg-yellow-100 text-yellow-800",
+                    rx.cond(
+                        sensor["status"] == "inactive",
+                        rx.el.span(
+                            "Inactive",
+                            class_name="inline-flex items-center px-2.5 py-0.5 rounded-full text-xs font-medium bg-gray-100 text-gray-800",
+                        ),
+                        rx.el.span(
+                            "Maintenance",
+                            class_name="inline-flex items-center px-2.5 py-0.5 rounded-full text-xs font-medium bg-yellow-100 text-yellow-800",
+                        ),
                     ),
                 ),
             ),
             class_name="px-6 py-4 whitespace-nowrap",
         ),
-        rx.el.td("--", class_name="px-6 py-4 whitespace-nowrap text-sm text-gray-500"),
+        rx.el.td(
+            rx.cond(sensor["last_seen"], sensor["last_seen"], "--"),
+            class_name="px-6 py-4 whitespace-nowrap text-sm text-gray-500",
+        ),
         rx.el.td(
             rx.el.div(
                 rx.el.button(
@@ -253,7 +349,7 @@ def sensor_row(sensor: Sensor) -> rx.Component:
                 ),
                 rx.el.button(
                     rx.icon("trash-2", class_name="w-4 h-4"),
-                    on_click=SensorState.open_delete_dialog(sensor.id),
+                    on_click=SensorState.open_delete_dialog(sensor["id"]),
                     class_name="p-1.5 text-gray-400 hover:text-red-600 hover:bg-red-50 rounded-md transition-colors",
                 ),
                 class_name="flex justify-end",
@@ -264,6 +360,62 @@ def sensor_row(sensor: Sensor) -> rx.Component:
     )
 
 
+def sort_header(label: str, column: str) -> rx.Component:
+    return rx.el.th(
+        rx.el.button(
+            label,
+            rx.cond(
+                SensorState.sort_by == column,
+                rx.cond(
+                    SensorState.sort_desc,
+                    rx.icon("arrow-down", class_name="w-3 h-3"),
+                    rx.icon("arrow-up", class_name="w-3 h-3"),
+                ),
+            ),
+            on_click=SensorState.sort_on(column),
+            class_name="inline-flex items-center gap-1 uppercase tracking-wider hover:text-gray-700",
+        ),
+        class_name="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider",
+    )
+
+
+def pagination_bar() -> rx.Component:
+    return rx.el.div(
+        rx.cond(
+            SensorState.search_truncated,
+            rx.el.p(
+                f"Showing {SensorState.page_start}-{SensorState.page_end} of the best {SensorState.total_sensors} matches; refine the search to see others",
+                class_name="text-sm text-gray-500",
+            ),
+            rx.el.p(
+                f"Showing {SensorState.page_start}-{SensorState.page_end} of {SensorState.total_sensors}",
+                class_name="text-sm text-gray-500",
+            ),
+        ),
+        rx.el.div(
+            rx.el.button(
+                rx.icon("chevron-left", class_name="w-4 h-4 mr-1"),
+                "Previous",
+                on_click=SensorState.prev_page,
+                disabled=SensorState.page <= 1,
+                class_name="flex items-center px-3 py-1.5 bg-white border border-gray-300 text-sm text-gray-700 rounded-lg hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed",
+            ),
+            rx.el.span(
+                f"Page {SensorState.page}", class_name="text-sm text-gray-600 px-3"
+            ),
+            rx.el.button(
+                "Next",
+                rx.icon("chevron-right", class_name="w-4 h-4 ml-1"),
+                on_click=SensorState.next_page,
+                disabled=~SensorState.has_next_page,
+                class_name="flex items-center px-3 py-1.5 bg-white border border-gray-300 text-sm text-gray-700 rounded-lg hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed",
+            ),
+            class_name="flex items-center",
+        ),
+        class_name="flex justify-between items-center mt-4",
+    )
+
+
 def sensors_page() -> rx.Component:
     return rx.el.div(
         sidebar(),
@@ -283,11 +435,20 @@ def sensors_page() -> rx.Component:
                             ),
                             class_name="flex-1",
                         ),
-                        rx.el.button(
-                            rx.icon("plus", class_name="w-5 h-5 mr-2"),
-                            "Add Sensor",
-                            on_click=SensorState.open_add_dialog,
-                            class_name="flex items-center px-4 py-2 bg-green-600 text-white rounded-lg hover:bg-green-700 font-medium transition-colors shadow-sm",
+                        rx.el.div(
+                            rx.el.button(
+                                rx.icon("upload", class_name="w-5 h-5 mr-2"),
+                                "Import",
+                                on_click=SensorState.open_import_dialog,
+                                class_name="flex items-center px-4 py-2 bg-white border border-gray-300 text-gray-700 rounded-lg hover:bg-gray-50 font-medium transition-colors shadow-sm",
+                            ),
+                            rx.el.button(
+                                rx.icon("plus", class_name="w-5 h-5 mr-2"),
+                                "Add Sensor",
+                                on_click=SensorState.open_add_dialog,
+                                class_name="flex items-center px-4 py-2 bg-green-600 text-white rounded-lg hover:bg-green-700 font-medium transition-colors shadow-sm",
+                            ),
+                            class_name="flex gap-3",
                         ),
                         class_name="flex justify-between items-start mb-8",
                     ),
@@ -319,6 +480,7 @@ def sensors_page() -> rx.Component:
                         rx.el.select(
                             rx.el.option("All Status", value="all"),
                             rx.el.option("Active", value="active"),
+                            rx.el.option("Offline", value="offline"),
                             rx.el.option("Inactive", value="inactive"),
                             on_change=SensorState.set_filter_status,
                             class_name="px-4 py-2 border border-gray-200 rounded-lg focus:outline-none focus:ring-2 focus:ring-green-500 bg-white",
@@ -329,18 +491,9 @@ def sensors_page() -> rx.Component:
                         rx.el.table(
                             rx.el.thead(
                                 rx.el.tr(
-                                    rx.el.th(
-                                        "Sensor",
-                                        class_name="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider",
-                                    ),
-                                    rx.el.th(
-                                        "Type",
-                                        class_name="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider",
-                                    ),
-                                    rx.el.th(
-                                        "Status",
-                                        class_name="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider",
-                                    ),
+                                    sort_header("Sensor", "name"),
+                                    sort_header("Type", "sensor_type"),
+                                    sort_header("Status", "status"),
                                     rx.el.th(
                                         "Last Reading",
                                         class_name="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider",
@@ -360,6 +513,7 @@ def sensors_page() -> rx.Component:
                         ),
                         class_name="bg-white rounded-xl border border-gray-200 overflow-hidden shadow-sm",
                     ),
+                    pagination_bar(),
                     sensor_dialog(
                         SensorState.is_add_open,
                         "Add New Sensor",
@@ -377,6 +531,7 @@ def sensors_page() -> rx.Component:
                         SensorState.update_sensor,
                     ),
                     delete_confirmation_dialog(),
+                    import_dialog(),
                     class_name="p-6 md:p-8 max-w-7xl mx-auto",
                 ),
                 class_name="flex-1 bg-gray-50 overflow-y-auto",
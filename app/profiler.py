@@ -0,0 +1,479 @@
+import asyncio
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from reflex.app import EventNamespace
+from reflex.middleware import Middleware
+from reflex.model import get_engine
+from reflex.utils import format
+from app.metrics import current_handler
+
+# Opt-in: nothing is attached unless SQL_PROFILE is set.
+PROFILE_ENABLED = os.getenv("SQL_PROFILE", "").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_MS", "100"))
+SLOW_QUERY_LOG = os.getenv("SQL_SLOW_LOG")
+# A fingerprint run this many times within one request or event is flagged.
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE", "5"))
+SLOW_KEPT = 200
+REPORT_FINGERPRINTS = 50
+# Event profiling is opt-in too: it serializes every delta a second time.
+EVENT_PROFILE_ENABLED = os.getenv("EVENT_PROFILE", "").lower() in ("1", "true", "yes")
+LARGE_DELTA_BYTES = int(os.getenv("EVENT_LARGE_DELTA_KB", "256")) * 1024
+LARGE_DELTAS_KEPT = 100
+REPORT_VARS = 30
+
+slow_logger = logging.getLogger("agrotech.slow_sql")
+
+_IN_LIST = re.compile(
+    r"\(\s*(?:\?|:\w+|%\(\w+\)s)(?:\s*,\s*(?:\?|:\w+|%\(\w+\)s))+\s*\)"
+)
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """Statement with literals and IN lists collapsed, for grouping."""
+    sql = _LITERAL.sub("?", statement)
+    sql = _IN_LIST.sub("(?, ...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def _caller() -> str:
+    """Innermost frame in the app package outside this module."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("app.") and module != __name__:
+            return f"{module}.{frame.f_code.co_qualname}:{frame.f_lineno}"
+        frame = frame.f_back
+    return "?"
+
+
+@dataclass
+class _Scope:
+    name: str
+    statements: int = 0
+    seconds: float = 0.0
+    # fingerprint -> [count, seconds, caller of the first run]
+    fingerprints: dict[str, list] = field(default_factory=dict)
+
+
+_scope: ContextVar[Optional[_Scope]] = ContextVar("sql_profile_scope", default=None)
+
+
+class SQLProfiler:
+    """
+    Records every statement on an engine, grouped by the API request or
+    Reflex event that ran it (one asyncio task each). When the task ends its
+    totals are folded into per-handler stats, and any fingerprint repeated
+    N_PLUS_ONE_THRESHOLD times is recorded as a likely N+1 with its caller.
+    Statements over SLOW_QUERY_MS go to the slow-query log.
+    """
+
+    def __init__(
+        self,
+        slow_ms: float = SLOW_QUERY_MS,
+        n_plus_one: int = N_PLUS_ONE_THRESHOLD,
+    ):
+        self.slow_ms = slow_ms
+        self.n_plus_one = n_plus_one
+        self.started_at = datetime.utcnow()
+        self._lock = threading.Lock()
+        self._handlers: dict[str, dict] = {}
+        self._fingerprints: dict[str, dict] = {}
+        self._suspects: dict[tuple[str, str], dict] = {}
+        self._slow: deque = deque(maxlen=SLOW_KEPT)
+        self._installed: set[int] = set()
+
+    def install(self, engine):
+        if id(engine) in self._installed:
+            return
+        self._installed.add(id(engine))
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+        if SLOW_QUERY_LOG and not slow_logger.handlers:
+            handler = logging.FileHandler(SLOW_QUERY_LOG)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            slow_logger.addHandler(handler)
+        logging.info(
+            f"SQL profiler attached (slow > {self.slow_ms:g} ms, N+1 at {self.n_plus_one} repeats)."
+        )
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        context._profile_start = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_profile_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        fp = fingerprint(statement)
+        handler = current_handler.get()
+        scope = self._current_scope(handler)
+        caller = None
+        if scope is not None:
+            scope.statements += 1
+            scope.seconds += elapsed
+            entry = scope.fingerprints.get(fp)
+            if entry is None:
+                caller = _caller()
+                scope.fingerprints[fp] = [1, elapsed, caller]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+        else:
+            self._fold(handler, 1, elapsed, {fp: [1, elapsed, None]}, scoped=False)
+        if elapsed * 1000 >= self.slow_ms:
+            caller = caller or _caller()
+            record = {
+                "at": datetime.utcnow().isoformat(timespec="seconds"),
+                "ms": round(elapsed * 1000, 2),
+                "handler": handler,
+                "caller": caller,
+                "sql": fp,
+            }
+            self._slow.append(record)
+            slow_logger.warning(
+                f"{record['ms']} ms in {handler} ({caller}): {fp[:500]}"
+            )
+
+    def _current_scope(self, handler: str) -> Optional[_Scope]:
+        scope = _scope.get()
+        if scope is not None:
+            return scope
+        if handler == "background":
+            return None
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        if task is None:
+            return None
+        scope = _Scope(handler)
+        _scope.set(scope)
+        task.add_done_callback(lambda _: self._finish(scope))
+        return scope
+
+    def _finish(self, scope: _Scope):
+        self._fold(
+            scope.name, scope.statements, scope.seconds, scope.fingerprints, True
+        )
+
+    def _fold(
+        self,
+        name: str,
+        statements: int,
+        seconds: float,
+        fingerprints: dict[str, list],
+        scoped: bool,
+    ):
+        now = datetime.utcnow().isoformat(timespec="seconds")
+        with self._lock:
+            stats = self._handlers.setdefault(
+                name,
+                {"calls": 0, "statements": 0, "seconds": 0.0, "max_statements": 0},
+            )
+            if scoped:
+                stats["calls"] += 1
+                stats["max_statements"] = max(stats["max_statements"], statements)
+            stats["statements"] += statements
+            stats["seconds"] += seconds
+            for fp, (count, fp_seconds, caller) in fingerprints.items():
+                agg = self._fingerprints.setdefault(
+                    fp, {"count": 0, "seconds": 0.0, "handlers": set()}
+                )
+                agg["count"] += count
+                agg["seconds"] += fp_seconds
+                agg["handlers"].add(name)
+                if scoped and count >= self.n_plus_one:
+                    suspect = self._suspects.setdefault(
+                        (name, fp),
+                        {"occurrences": 0, "max_repeats": 0, "caller": caller},
+                    )
+                    suspect["occurrences"] += 1
+                    suspect["max_repeats"] = max(suspect["max_repeats"], count)
+                    suspect["caller"] = caller
+                    suspect["last_seen"] = now
+
+    def report(self) -> dict:
+        with self._lock:
+            handlers = {
+                name: {
+                    **stats,
+                    "seconds": round(stats["seconds"], 4),
+                    "avg_statements": round(stats["statements"] / stats["calls"], 1)
+                    if stats["calls"]
+                    else None,
+                }
+                for name, stats in sorted(
+                    self._handlers.items(), key=lambda kv: -kv[1]["seconds"]
+                )
+            }
+            fingerprints = [
+                {
+                    "sql": fp,
+                    "count": agg["count"],
+                    "seconds": round(agg["seconds"], 4),
+                    "handlers": sorted(agg["handlers"]),
+                }
+                for fp, agg in sorted(
+                    self._fingerprints.items(), key=lambda kv: -kv[1]["seconds"]
+                )[:REPORT_FINGERPRINTS]
+            ]
+            suspects = [
+                {"handler": name, "sql": fp, **suspect}
+                for (name, fp), suspect in sorted(
+                    self._suspects.items(), key=lambda kv: -kv[1]["max_repeats"]
+                )
+            ]
+            slow = list(self._slow)
+        return {
+            "since": self.started_at.isoformat(timespec="seconds"),
+            "slow_ms": self.slow_ms,
+            "n_plus_one_threshold": self.n_plus_one,
+            "handlers": handlers,
+            "n_plus_one": suspects,
+            "top_fingerprints": fingerprints,
+            "slow_queries": slow,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._handlers.clear()
+            self._fingerprints.clear()
+            self._suspects.clear()
+            self._slow.clear()
+            self.started_at = datetime.utcnow()
+
+
+profiler = SQLProfiler()
+
+
+def install_profiler(engine=None):
+    """Attach the profiler to the rx.session() engine when SQL_PROFILE is set."""
+    if PROFILE_ENABLED:
+        profiler.install(engine if engine is not None else get_engine())
+
+
+@dataclass
+class _EventScope:
+    state: str
+    handler: str
+    started: float
+    db_statements: int = 0
+    db_seconds: float = 0.0
+    deltas: int = 0
+    delta_bytes: int = 0
+    serialize_seconds: float = 0.0
+    # "state.var" -> serialized bytes sent by this event
+    vars: dict[str, int] = field(default_factory=dict)
+
+
+_event_scope: ContextVar[Optional[_EventScope]] = ContextVar(
+    "event_profile_scope", default=None
+)
+
+
+def _short_state(name: str) -> str:
+    return name.rpartition(".")[2].rpartition("____")[2]
+
+
+class EventProfiler:
+    """
+    Per Reflex event handler: wall time, SQL time and the serialized size of
+    the deltas it sends over the websocket, with the state vars that make
+    up the bulk of them. Every event runs in its own task; the middleware
+    opens a scope at the start of it and folds the scope in when the task
+    finishes.
+    """
+
+    def __init__(self, large_delta_bytes: int = LARGE_DELTA_BYTES):
+        self.large_delta_bytes = large_delta_bytes
+        self.started_at = datetime.utcnow()
+        self._lock = threading.Lock()
+        self._handlers: dict[str, dict] = {}
+        self._vars: dict[str, dict] = {}
+        self._large: deque = deque(maxlen=LARGE_DELTAS_KEPT)
+        self._installed = False
+
+    def install(self, app):
+        if self._installed:
+            return
+        self._installed = True
+        app.add_middleware(EventProfilerMiddleware(self))
+        event.listen(Engine, "before_cursor_execute", _event_before_cursor)
+        event.listen(Engine, "after_cursor_execute", _event_after_cursor)
+        # Reflex has no post-event hook that sees the delta, but every delta
+        # and chained event goes out through EventNamespace.emit_update.
+        original = EventNamespace.emit_update
+
+        async def emit_update(namespace, update, token):
+            scope = _event_scope.get()
+            if scope is not None and update.delta:
+                self._measure(scope, update.delta)
+            await original(namespace, update, token)
+
+        EventNamespace.emit_update = emit_update
+        logging.info(
+            f"Event profiler attached (large delta > {self.large_delta_bytes // 1024} KB)."
+        )
+
+    def start(self, state: str, handler: str):
+        task = asyncio.current_task()
+        if task is None:
+            return
+        scope = _EventScope(state, handler, time.perf_counter())
+        _event_scope.set(scope)
+        task.add_done_callback(lambda _: self._finish(scope))
+
+    def _measure(self, scope: _EventScope, delta: dict):
+        start = time.perf_counter()
+        total = 0
+        sizes = {}
+        for state_name, changes in delta.items():
+            short = _short_state(state_name)
+            for var, value in changes.items():
+                size = len(format.json_dumps(value).encode("utf-8"))
+                sizes[f"{short}.{var}"] = size
+                total += size
+        scope.serialize_seconds += time.perf_counter() - start
+        scope.deltas += 1
+        scope.delta_bytes += total
+        for key, size in sizes.items():
+            scope.vars[key] = scope.vars.get(key, 0) + size
+        if total >= self.large_delta_bytes:
+            top = sorted(sizes.items(), key=lambda kv: -kv[1])[:5]
+            self._large.append(
+                {
+                    "at": datetime.utcnow().isoformat(timespec="seconds"),
+                    "handler": f"{scope.state}.{scope.handler}",
+                    "bytes": total,
+                    "top_vars": dict(top),
+                }
+            )
+
+    def _finish(self, scope: _EventScope):
+        wall = time.perf_counter() - scope.started
+        name = f"{scope.state}.{scope.handler}"
+        with self._lock:
+            stats = self._handlers.setdefault(
+                name,
+                {
+                    "calls": 0,
+                    "wall_seconds": 0.0,
+                    "max_wall_seconds": 0.0,
+                    "db_seconds": 0.0,
+                    "db_statements": 0,
+                    "deltas": 0,
+                    "delta_bytes": 0,
+                    "max_delta_bytes": 0,
+                    "serialize_seconds": 0.0,
+                },
+            )
+            stats["calls"] += 1
+            stats["wall_seconds"] += wall
+            stats["max_wall_seconds"] = max(stats["max_wall_seconds"], wall)
+            stats["db_seconds"] += scope.db_seconds
+            stats["db_statements"] += scope.db_statements
+            stats["deltas"] += scope.deltas
+            stats["delta_bytes"] += scope.delta_bytes
+            stats["max_delta_bytes"] = max(stats["max_delta_bytes"], scope.delta_bytes)
+            stats["serialize_seconds"] += scope.serialize_seconds
+            for key, size in scope.vars.items():
+                agg = self._vars.setdefault(
+                    key, {"bytes": 0, "max_bytes": 0, "handlers": set()}
+                )
+                agg["bytes"] += size
+                agg["max_bytes"] = max(agg["max_bytes"], size)
+                agg["handlers"].add(name)
+
+    def report(self) -> dict:
+        with self._lock:
+            handlers = {}
+            for name, stats in sorted(
+                self._handlers.items(), key=lambda kv: -kv[1]["wall_seconds"]
+            ):
+                calls = stats["calls"]
+                handlers[name] = {
+                    "calls": calls,
+                    "avg_wall_ms": round(1000 * stats["wall_seconds"] / calls, 2),
+                    "max_wall_ms": round(1000 * stats["max_wall_seconds"], 2),
+                    "avg_db_ms": round(1000 * stats["db_seconds"] / calls, 2),
+                    "avg_db_statements": round(stats["db_statements"] / calls, 1),
+                    "avg_delta_kb": round(stats["delta_bytes"] / calls / 1024, 1),
+                    "max_delta_kb": round(stats["max_delta_bytes"] / 1024, 1),
+                    "total_delta_mb": round(stats["delta_bytes"] / 1024 / 1024, 2),
+                    "avg_serialize_ms": round(
+                        1000 * stats["serialize_seconds"] / calls, 2
+                    ),
+                }
+            heaviest_vars = [
+                {
+                    "var": key,
+                    "total_kb": round(agg["bytes"] / 1024, 1),
+                    "max_kb": round(agg["max_bytes"] / 1024, 1),
+                    "handlers": sorted(agg["handlers"]),
+                }
+                for key, agg in sorted(
+                    self._vars.items(), key=lambda kv: -kv[1]["bytes"]
+                )[:REPORT_VARS]
+            ]
+            large = list(self._large)
+        return {
+            "since": self.started_at.isoformat(timespec="seconds"),
+            "large_delta_kb": self.large_delta_bytes // 1024,
+            "handlers": handlers,
+            "heaviest_vars": heaviest_vars,
+            "large_deltas": large,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._handlers.clear()
+            self._vars.clear()
+            self._large.clear()
+            self.started_at = datetime.utcnow()
+
+
+def _event_before_cursor(conn, cursor, statement, parameters, context, executemany):
+    if _event_scope.get() is not None:
+        context._event_profile_start = time.perf_counter()
+
+
+def _event_after_cursor(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_event_profile_start", None)
+    scope = _event_scope.get()
+    if start is not None and scope is not None:
+        scope.db_statements += 1
+        scope.db_seconds += time.perf_counter() - start
+
+
+class EventProfilerMiddleware(Middleware):
+    def __init__(self, profiler: EventProfiler):
+        self.profiler = profiler
+
+    async def preprocess(self, app, state, event):
+        path, _, handler = event.name.rpartition(".")
+        self.profiler.start(_short_state(path), handler)
+        return None
+
+
+event_profiler = EventProfiler()
+
+
+def install_event_profiler(app):
+    """Profile Reflex event handlers when EVENT_PROFILE is set."""
+    if EVENT_PROFILE_ENABLED:
+        event_profiler.install(app)
\ No newline at end of file
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+from typing import Optional
+import reflex as rx
+from sqlmodel import select, delete, update, func
+from datetime import datetime
+from app.models import Alert, AlertRule, Parcel, Sensor, SensorData
+from app.alerting.episodes import tracker as episode_tracker
+from app.alerting.rules import engine as rule_engine
+
+PURGE_BATCH = 1000
+BATCH_PAUSE = 0.05
+IDLE_INTERVAL = 60
+
+
+class Purger:
+    """
+    Removes soft-deleted sensors and parcels in the background.
+
+    Deleting from the UI only sets deleted_at, which hides the row
+    everywhere. This loop then deletes the dependent readings and alerts in
+    small batches, each in its own short transaction with a pause between
+    them, so SQLite is never locked for long. Work is found from deleted_at
+    alone, so an interrupted purge resumes after a restart.
+    """
+
+    def __init__(self):
+        self._wake: Optional[asyncio.Event] = None
+        self.progress = {
+            "running": False,
+            "pending_sensors": 0,
+            "pending_parcels": 0,
+            "current_sensor_id": None,
+            "current_remaining": 0,
+            "readings_deleted": 0,
+            "alerts_deleted": 0,
+            "sensors_purged": 0,
+            "parcels_purged": 0,
+            "last_error": None,
+        }
+
+    def wake(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    async def run(self):
+        self._wake = asyncio.Event()
+        logging.info("Purger started.")
+        while True:
+            self._wake.clear()
+            try:
+                found = await self.purge_pending()
+            except Exception as e:
+                logging.exception(f"Purge failed, will retry: {e}")
+                self.progress["last_error"] = str(e)
+                found = False
+            finally:
+                self.progress["running"] = False
+                self.progress["current_sensor_id"] = None
+            if found:
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), IDLE_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def purge_pending(self) -> bool:
+        with rx.session() as session:
+            sensor_ids = session.exec(
+                select(Sensor.id).where(Sensor.deleted_at != None).order_by(Sensor.id)
+            ).all()
+            parcel_ids = session.exec(
+                select(Parcel.id).where(Parcel.deleted_at != None).order_by(Parcel.id)
+            ).all()
+        if not sensor_ids and not parcel_ids:
+            return False
+        self.progress["running"] = True
+        self.progress["pending_sensors"] = len(sensor_ids)
+        self.progress["pending_parcels"] = len(parcel_ids)
+        try:
+            for sensor_id in sensor_ids:
+                await self._purge_sensor(sensor_id)
+                self.progress["pending_sensors"] -= 1
+            for parcel_id in parcel_ids:
+                self._purge_parcel(parcel_id)
+                self.progress["pending_parcels"] -= 1
+                await asyncio.sleep(BATCH_PAUSE)
+        finally:
+            # Purged rows were already hidden by deleted_at, so one recompile
+            # per pass is enough.
+            rule_engine.invalidate()
+        return True
+
+    async def _purge_sensor(self, sensor_id: int):
+        progress = self.progress
+        progress["current_sensor_id"] = sensor_id
+        with rx.session() as session:
+            progress["current_remaining"] = session.exec(
+                select(func.count(SensorData.id)).where(
+                    SensorData.sensor_id == sensor_id
+                )
+            ).one()
+        for model, counter in (
+            (SensorData, "readings_deleted"),
+            (Alert, "alerts_deleted"),
+        ):
+            while True:
+                with rx.session() as session:
+                    ids = session.exec(
+                        select(model.id)
+                        .where(model.sensor_id == sensor_id)
+                        .limit(PURGE_BATCH)
+                    ).all()
+                    if not ids:
+                        break
+                    session.exec(delete(model).where(model.id.in_(ids)))
+                    session.commit()
+                if model is Alert:
+                    episode_tracker.forget(set(ids))
+                else:
+                    progress["current_remaining"] = max(
+                        0, progress["current_remaining"] - len(ids)
+                    )
+                progress[counter] += len(ids)
+                await asyncio.sleep(BATCH_PAUSE)
+        with rx.session() as session:
+            session.exec(delete(AlertRule).where(AlertRule.sensor_id == sensor_id))
+            session.exec(
+                delete(Sensor).where(Sensor.id == sensor_id, Sensor.deleted_at != None)
+            )
+            session.commit()
+        progress["sensors_purged"] += 1
+
+    def _purge_parcel(self, parcel_id: int):
+        with rx.session() as session:
+            remaining = session.exec(
+                select(func.count(Sensor.id)).where(Sensor.parcel_id == parcel_id)
+            ).one()
+            if remaining:
+                # Sensors that slipped in after the parcel was deleted; mark
+                # them so the next pass purges them, then the parcel.
+                session.exec(
+                    update(Sensor)
+                    .where(Sensor.parcel_id == parcel_id, Sensor.deleted_at == None)
+                    .values(deleted_at=datetime.utcnow())
+                )
+                session.commit()
+                self.wake()
+                return
+            session.exec(delete(AlertRule).where(AlertRule.parcel_id == parcel_id))
+            session.exec(
+                delete(Parcel).where(Parcel.id == parcel_id, Parcel.deleted_at != None)
+            )
+            session.commit()
+        self.progress["parcels_purged"] += 1
+
+
+purger = Purger()
\ No newline at end of file
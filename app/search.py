@@ -0,0 +1,282 @@
+import logging
+from typing import Optional
+from sqlalchemy import text
+
+# One FTS5 trigram table per searchable entity, keyed by the entity id so the
+# sync triggers only ever touch a single rowid.
+SEARCH_TABLES = {"sensor": "sensor_search", "parcel": "parcel_search"}
+SEARCH_COLUMNS = {
+    "sensor_search": ("owner", "name", "unique_id", "sensor_type"),
+    "parcel_search": ("owner", "name", "location"),
+}
+
+# Indexed values are stored as FIELD_START + value + FIELD_END (char(2) and
+# char(3) in SQL), which turns "starts with" and "equals" into substring
+# matches the trigram index answers directly. The owner is indexed as
+# OWNER_MARK + id + OWNER_MARK (char(1)), so searches are scoped by the index
+# instead of filtered row by row.
+OWNER_MARK = "\x01"
+FIELD_START = "\x02"
+FIELD_END = "\x03"
+
+SEARCH_DDL = {
+    "sensor_search": """
+    CREATE VIRTUAL TABLE sensor_search USING fts5(
+        owner, name, unique_id, sensor_type, tokenize = 'trigram'
+    )
+    """,
+    "parcel_search": """
+    CREATE VIRTUAL TABLE parcel_search USING fts5(
+        owner, name, location, tokenize = 'trigram'
+    )
+    """,
+}
+
+# Triggers are dropped and recreated on every start so edits here take effect.
+# Soft-deleted rows (deleted_at set) are kept out of the index. Update
+# triggers only fire for the columns the index depends on, so writes such as
+# the liveness last_seen flush leave the index alone.
+SEARCH_TRIGGERS = [
+    """
+    CREATE TRIGGER sensor_search_ai AFTER INSERT ON sensor BEGIN
+        INSERT INTO sensor_search (rowid, owner, name, unique_id, sensor_type)
+        SELECT new.id, char(1) || parcel.owner_id || char(1),
+            char(2) || new.name || char(3), char(2) || new.unique_id || char(3),
+            char(2) || new.sensor_type || char(3)
+        FROM parcel WHERE parcel.id = new.parcel_id AND new.deleted_at IS NULL;
+    END
+    """,
+    """
+    CREATE TRIGGER sensor_search_au
+    AFTER UPDATE OF name, unique_id, sensor_type, parcel_id, deleted_at ON sensor
+    BEGIN
+        DELETE FROM sensor_search WHERE rowid = old.id;
+        INSERT INTO sensor_search (rowid, owner, name, unique_id, sensor_type)
+        SELECT new.id, char(1) || parcel.owner_id || char(1),
+            char(2) || new.name || char(3), char(2) || new.unique_id || char(3),
+            char(2) || new.sensor_type || char(3)
+        FROM parcel WHERE parcel.id = new.parcel_id AND new.deleted_at IS NULL;
+    END
+    """,
+    """
+    CREATE TRIGGER sensor_search_ad AFTER DELETE ON sensor BEGIN
+        DELETE FROM sensor_search WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER parcel_search_ai AFTER INSERT ON parcel
+    WHEN new.deleted_at IS NULL BEGIN
+        INSERT INTO parcel_search (rowid, owner, name, location)
+        VALUES (
+            new.id, char(1) || new.owner_id || char(1),
+            char(2) || new.name || char(3), char(2) || new.location || char(3)
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER parcel_search_au
+    AFTER UPDATE OF name, location, owner_id, deleted_at ON parcel BEGIN
+        DELETE FROM parcel_search WHERE rowid = old.id;
+        INSERT INTO parcel_search (rowid, owner, name, location)
+        SELECT new.id, char(1) || new.owner_id || char(1),
+            char(2) || new.name || char(3), char(2) || new.location || char(3)
+        WHERE new.deleted_at IS NULL;
+    END
+    """,
+    """
+    CREATE TRIGGER parcel_search_owner AFTER UPDATE OF owner_id ON parcel
+    WHEN old.owner_id IS NOT new.owner_id BEGIN
+        UPDATE sensor_search SET owner = char(1) || new.owner_id || char(1)
+        WHERE rowid IN (SELECT id FROM sensor WHERE parcel_id = new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER parcel_search_ad AFTER DELETE ON parcel BEGIN
+        DELETE FROM parcel_search WHERE rowid = old.id;
+    END
+    """,
+]
+
+REBUILD_SQL = [
+    "DELETE FROM sensor_search",
+    """
+    INSERT INTO sensor_search (rowid, owner, name, unique_id, sensor_type)
+    SELECT sensor.id, char(1) || parcel.owner_id || char(1),
+        char(2) || sensor.name || char(3), char(2) || sensor.unique_id || char(3),
+        char(2) || sensor.sensor_type || char(3)
+    FROM sensor JOIN parcel ON parcel.id = sensor.parcel_id
+    WHERE sensor.deleted_at IS NULL
+    """,
+    "DELETE FROM parcel_search",
+    """
+    INSERT INTO parcel_search (rowid, owner, name, location)
+    SELECT id, char(1) || owner_id || char(1), char(2) || name || char(3),
+        char(2) || location || char(3)
+    FROM parcel WHERE deleted_at IS NULL
+    """,
+]
+
+# Broad queries ("tem") match most of the table. Exact, prefix and substring
+# matches are fetched in that order, at most RANK_WINDOW substrings, and later
+# kinds are skipped once earlier ones fill the limit, since they rank below.
+# bm25 is avoided because it scans every matching doclist for statistics.
+RANK_WINDOW = 200
+MIN_TRIGRAM_QUERY = 3
+MIN_FUZZY_QUERY = 6
+
+
+def ensure_search_index(engine):
+    """Create the FTS5 tables and their sync triggers, rebuilding stale layouts."""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        rebuild = False
+        for table, ddl in SEARCH_DDL.items():
+            existing = tuple(
+                row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))
+            )
+            if existing != SEARCH_COLUMNS[table]:
+                # Missing, or laid out by an older version of this module.
+                conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+                conn.execute(text(ddl))
+                rebuild = True
+        for ddl in SEARCH_TRIGGERS:
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {ddl.split()[2]}"))
+            conn.execute(text(ddl))
+        if rebuild:
+            for sql in REBUILD_SQL:
+                conn.execute(text(sql))
+            logging.info("Built sensor/parcel search index.")
+
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _trigrams(value: str) -> set[str]:
+    return {value[i : i + 3] for i in range(len(value) - 2)}
+
+
+def _unwrap(value: Optional[str]) -> Optional[str]:
+    return value.strip(FIELD_START + FIELD_END) if value else value
+
+
+def _fuzzy_match(query: str) -> Optional[str]:
+    """
+    Match expression tolerating one edit (substitution, insertion, deletion
+    or transposition): for each position, require every trigram that does not
+    touch that position or the next one.
+    """
+    trigrams = [query[i : i + 3] for i in range(len(query) - 2)]
+    groups = set()
+    for pos in range(len(query)):
+        kept = frozenset(
+            t for i, t in enumerate(trigrams) if i + 2 < pos or i > pos + 1
+        )
+        if kept:
+            groups.add(kept)
+    # A group that contains another one adds nothing to the OR.
+    groups = [g for g in groups if not any(o < g for o in groups)]
+    if not groups:
+        return None
+    return " OR ".join(
+        "(" + " AND ".join(_quote(t) for t in sorted(g)) + ")"
+        for g in sorted(groups, key=sorted)
+    )
+
+
+def _score(query: str, values: list[Optional[str]], fuzzy: bool) -> tuple:
+    """Sort key: whole-field prefix, then word prefix, then shortest field."""
+    values = [v.lower() for v in values if v]
+    if fuzzy:
+        wanted = _trigrams(query)
+        return (-max(len(wanted & _trigrams(v)) for v in values),)
+    best = (2, 0)
+    for v in values:
+        pos = v.find(query)
+        if pos == 0:
+            kind = 0
+        elif pos > 0 and not v[pos - 1].isalnum():
+            kind = 1
+        else:
+            kind = 2
+        best = min(best, (kind, len(v)) if pos >= 0 else best)
+    return best
+
+
+def search_ids(
+    session, query: str, kind: str, owner_id: Optional[int] = None, limit: int = 50
+) -> list[int]:
+    """
+    Ranked sensor or parcel ids matching `query`.
+
+    Exact matches come first, then whole-field prefixes, then other
+    substrings. When nothing matches and the query has six or more
+    characters, matches one typo away are returned instead, ranked by
+    trigram overlap. A one-character query only matches prefixes.
+    """
+    query = query.strip().lower()
+    if not query:
+        return []
+    table = SEARCH_TABLES[kind]
+    columns = SEARCH_COLUMNS[table][1:]
+    owner = None if owner_id is None else OWNER_MARK + str(owner_id) + OWNER_MARK
+    scope = ("" if owner is None else f"owner : {_quote(owner)} AND ") + (
+        "{" + " ".join(columns) + "}"
+    )
+    selected = f"SELECT rowid, {', '.join(columns)} FROM {table}"
+    candidates = text(f"{selected} WHERE {table} MATCH :match LIMIT :window")
+
+    def fetch(match: str, window: int = RANK_WINDOW) -> list[tuple]:
+        return [
+            (row[0], *(_unwrap(v) for v in row[1:]))
+            for row in session.execute(
+                candidates, {"match": f"{scope} : ({match})", "window": window}
+            )
+        ]
+
+    # Exact and whole-field prefix matches all rank alike, so `limit` of them
+    # is enough; substrings are ranked within a wider window.
+    stages = [(_quote(FIELD_START + query + FIELD_END), limit)]
+    if len(query) + 1 >= MIN_TRIGRAM_QUERY:
+        stages.append((_quote(FIELD_START + query), limit))
+    if len(query) >= MIN_TRIGRAM_QUERY:
+        stages.append((_quote(query), RANK_WINDOW))
+    rows: dict[int, tuple] = {}
+    for match, window in stages:
+        if len(rows) >= limit:
+            break
+        for row in fetch(match, window):
+            rows.setdefault(row[0], row)
+    if len(query) + 1 < MIN_TRIGRAM_QUERY and len(rows) < limit:
+        # Too short for a trigram even with FIELD_START: scan for prefixes.
+        prefix = " OR ".join(f"{c} LIKE :prefix" for c in columns)
+        owned = "" if owner is None else " AND owner = :owner"
+        for row in session.execute(
+            text(f"{selected} WHERE ({prefix}){owned} LIMIT :window"),
+            {
+                "prefix": FIELD_START + query + "%",
+                "owner": owner,
+                "window": RANK_WINDOW,
+            },
+        ):
+            values = [_unwrap(v) for v in row[1:]]
+            # LIKE also treats % and _ in the query as wildcards.
+            if any(v and v.lower().startswith(query) for v in values):
+                rows.setdefault(row[0], (row[0], *values))
+    fuzzy = False
+    if not rows and len(query) >= MIN_FUZZY_QUERY:
+        match = _fuzzy_match(query)
+        if match:
+            wanted = _trigrams(query)
+            rows = {
+                row[0]: row
+                for row in fetch(match)
+                if 2 * max(len(wanted & _trigrams((v or "").lower())) for v in row[1:])
+                >= len(wanted)
+            }
+            fuzzy = True
+    ranked = sorted(
+        rows.values(), key=lambda row: (_score(query, row[1:], fuzzy), row[0])
+    )
+    return [row[0] for row in ranked[:limit]]
\ No newline at end of file
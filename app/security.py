@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+
+# bcrypt releases the GIL while hashing, so a thread pool keeps the event
+# loop free without the cost of shipping work to another process. The pool
+# size is the cap on concurrent hashes; further requests queue behind it.
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", min(4, os.cpu_count() or 1)))
+SLOW_QUEUE_WARNING = 2.0
+WARNING_INTERVAL = 30
+
+
+class HashPool:
+    """
+    Runs bcrypt hashing and verification off the event loop in a bounded
+    thread pool, and keeps counters on queueing and hash time.
+    """
+
+    def __init__(self, workers: int = HASH_WORKERS):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="bcrypt"
+        )
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.queue_seconds = 0.0
+        self.max_queue_seconds = 0.0
+        self.hash_seconds = 0.0
+        self._warned_at = 0.0
+
+    def _timed(self, submitted: float, fn, *args):
+        started = time.perf_counter()
+        waited = started - submitted
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.queue_seconds += waited
+                self.max_queue_seconds = max(self.max_queue_seconds, waited)
+                self.hash_seconds += elapsed
+            if (
+                waited > SLOW_QUEUE_WARNING
+                and started - self._warned_at > WARNING_INTERVAL
+            ):
+                self._warned_at = started
+                logging.warning(
+                    f"bcrypt request waited {waited:.1f}s for a worker ({self.queued} still queued)"
+                )
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            self.queued += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, self._timed, time.perf_counter(), fn, *args
+        )
+
+    async def hash_password(self, password: str) -> str:
+        hashed = await self._run(
+            bcrypt.hashpw, password.encode("utf-8"), bcrypt.gensalt()
+        )
+        return hashed.decode("utf-8")
+
+    async def verify_password(self, password: str, password_hash: str) -> bool:
+        return await self._run(
+            bcrypt.checkpw, password.encode("utf-8"), password_hash.encode("utf-8")
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self.completed
+            return {
+                "workers": self.workers,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": completed,
+                "avg_queue_ms": round(1000 * self.queue_seconds / completed, 1)
+                if completed
+                else 0.0,
+                "max_queue_ms": round(1000 * self.max_queue_seconds, 1),
+                "avg_hash_ms": round(1000 * self.hash_seconds / completed, 1)
+                if completed
+                else 0.0,
+            }
+
+
+hash_pool = HashPool()
\ No newline at end of file
@@ -0,0 +1,198 @@
+import argparse
+import logging
+import time
+import bcrypt
+from sqlmodel import Session, select
+from reflex.model import get_engine
+from app.models import User, Parcel, Sensor, SensorData, Alert
+from app.alerting.rules import rename_duration_params
+from app.devices import seed_device_mappings
+from app.db import SCHEMA_VERSION, ensure_schema, schema_version, set_schema_version
+
+
+def seed(session):
+    """Create the demo users, parcels and sensors if they are missing."""
+    technician = session.exec(select(User).where(User.username == "tech_admin")).first()
+    if not technician:
+        tech_pw = bcrypt.hashpw("admin123".encode("utf-8"), bcrypt.gensalt()).decode(
+            "utf-8"
+        )
+        technician = User(
+            username="tech_admin",
+            email="admin@agrotech.com",
+            password_hash=tech_pw,
+            role="technician",
+        )
+        session.add(technician)
+        session.flush()
+        logging.info("Created tech_admin user.")
+    farmer = session.exec(select(User).where(User.username == "john_doe")).first()
+    if not farmer:
+        farmer_pw = bcrypt.hashpw("farmer123".encode("utf-8"), bcrypt.gensalt()).decode(
+            "utf-8"
+        )
+        farmer = User(
+            username="john_doe",
+            email="john@farm.com",
+            password_hash=farmer_pw,
+            role="farmer",
+        )
+        session.add(farmer)
+        session.flush()
+        logging.info("Created john_doe user.")
+    if not farmer.id:
+        session.refresh(farmer)
+    parcel1 = session.exec(
+        select(Parcel).where(Parcel.name == "North Field", Parcel.owner_id == farmer.id)
+    ).first()
+    if not parcel1:
+        parcel1 = Parcel(
+            name="North Field",
+            location="Sector A",
+            area=15.5,
+            owner_id=farmer.id,
+        )
+        session.add(parcel1)
+        session.flush()
+    parcel2 = session.exec(
+        select(Parcel).where(
+            Parcel.name == "Green Valley", Parcel.owner_id == farmer.id
+        )
+    ).first()
+    if not parcel2:
+        parcel2 = Parcel(
+            name="Green Valley",
+            location="Sector B",
+            area=22.0,
+            owner_id=farmer.id,
+        )
+        session.add(parcel2)
+        session.flush()
+    if not parcel1.id:
+        session.refresh(parcel1)
+    if not parcel2.id:
+        session.refresh(parcel2)
+    sensors_config = [
+        {
+            "uid": "SENS-001",
+            "name": "Soil Sensor A1",
+            "type": "soil_moisture",
+            "pid": parcel1.id,
+            "unit": "%",
+            "val": 45.2,
+        },
+        {
+            "uid": "SENS-002",
+            "name": "Temp Sensor A1",
+            "type": "temperature",
+            "pid": parcel1.id,
+            "unit": "C",
+            "val": 23.5,
+        },
+        {
+            "uid": "SENS-003",
+            "name": "Light Sensor B1",
+            "type": "light",
+            "pid": parcel2.id,
+            "unit": "lx",
+            "val": 500.0,
+        },
+        {
+            "uid": "SENS-004",
+            "name": "Humidity Sensor A1",
+            "type": "humidity",
+            "pid": parcel1.id,
+            "unit": "%",
+            "val": 55.0,
+        },
+        {
+            "uid": "SENS-005",
+            "name": "CO2 Sensor A1",
+            "type": "co2",
+            "pid": parcel1.id,
+            "unit": "ppm",
+            "val": 410.0,
+        },
+        {
+            "uid": "SENS-006",
+            "name": "VOC Sensor B1",
+            "type": "voc",
+            "pid": parcel2.id,
+            "unit": "ppb",
+            "val": 120.0,
+        },
+        {
+            "uid": "SENS-007",
+            "name": "NOx Sensor B1",
+            "type": "nox",
+            "pid": parcel2.id,
+            "unit": "ppb",
+            "val": 45.0,
+        },
+    ]
+    for conf in sensors_config:
+        sensor = session.exec(
+            select(Sensor).where(Sensor.unique_id == conf["uid"])
+        ).first()
+        if not sensor:
+            sensor = Sensor(
+                name=conf["name"],
+                sensor_type=conf["type"],
+                parcel_id=conf["pid"],
+                unique_id=conf["uid"],
+            )
+            session.add(sensor)
+            session.flush()
+            data = SensorData(sensor_id=sensor.id, value=conf["val"], unit=conf["unit"])
+            session.add(data)
+            if conf["uid"] == "SENS-001":
+                alert = Alert(
+                    sensor_id=sensor.id,
+                    severity="warning",
+                    message="Soil moisture low",
+                    is_active=True,
+                )
+                session.add(alert)
+        elif sensor.sensor_type != conf["type"]:
+            sensor.sensor_type = conf["type"]
+            session.add(sensor)
+    seed_device_mappings(session)
+    rename_duration_params(session)
+    session.commit()
+
+
+def prepare_database(force: bool = False) -> bool:
+    """
+    Create or migrate the schema and seed demo data, once per schema version.
+    Returns False without touching the database when it is already current.
+    """
+    engine = get_engine()
+    version = schema_version(engine)
+    if not force and version >= SCHEMA_VERSION:
+        return False
+    started = time.perf_counter()
+    ensure_schema(engine)
+    with Session(engine) as session:
+        try:
+            seed(session)
+        except Exception as e:
+            # Leave the version unset so the next start tries again.
+            logging.exception(f"Error seeding database: {e}")
+            session.rollback()
+            return True
+    set_schema_version(engine)
+    logging.info(
+        f"Database prepared (schema {version} -> {SCHEMA_VERSION}) in {time.perf_counter() - started:.2f}s."
+    )
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the schema and seed data")
+    parser.add_argument(
+        "--force", action="store_true", help="run even if the schema is current"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if not prepare_database(force=args.force):
+        print(f"Database already at schema version {SCHEMA_VERSION}.")
\ No newline at end of file
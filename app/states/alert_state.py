@@ -1,60 +1,141 @@
 import reflex as rx
-from sqlmodel import select, desc
+from typing import Optional
+from sqlalchemy import tuple_
+from sqlmodel import select, update, desc, asc, func
 from app.models import Alert, Sensor, Parcel
 from app.states.auth_state import AuthState
+from app.alerting.episodes import tracker as episode_tracker
 from datetime import datetime
 
+PAGE_SIZE = 50
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
 
 class AlertState(rx.State):
     alerts: list[dict] = []
     active_filter: bool = True
     severity_filter: str = "all"
+    sort_desc: bool = True
+    total_alerts: int = 0
+    page: int = 1
+    has_next_page: bool = False
+    selected_ids: list[int] = []
+    _page_cursors: list[Optional[tuple[datetime, int]]] = [None]
+    _next_cursor: Optional[tuple[datetime, int]] = None
+
+    @rx.var
+    def page_start(self) -> int:
+        if not self.alerts:
+            return 0
+        return (self.page - 1) * PAGE_SIZE + 1
+
+    @rx.var
+    def page_end(self) -> int:
+        return (self.page - 1) * PAGE_SIZE + len(self.alerts)
+
+    def _filter_conditions(self) -> list:
+        conditions = []
+        if self.active_filter:
+            conditions.append(Alert.is_active == True)
+        if self.severity_filter != "all":
+            conditions.append(Alert.severity == self.severity_filter)
+        return conditions
+
+    def _filtered(self, query, user_id: int):
+        return (
+            query.join(Sensor, Alert.sensor_id == Sensor.id)
+            .join(Parcel, Sensor.parcel_id == Parcel.id)
+            .where(
+                Parcel.owner_id == user_id,
+                Sensor.deleted_at == None,
+                *self._filter_conditions(),
+            )
+        )
+
+    async def _user_id(self) -> Optional[int]:
+        return (await self.get_state(AuthState)).user_id
 
     @rx.event
     async def load_alerts(self):
-        user = await self.get_state(AuthState)
-        if not user.user:
+        """Reset to the first page and refresh the total count."""
+        user_id = await self._user_id()
+        if user_id is None:
             return
-        user_data = user.user
-        user_id = user_data["id"] if isinstance(user_data, dict) else user_data.id
+        self.page = 1
+        self._page_cursors = [None]
+        self.selected_ids = []
         with rx.session() as session:
-            user_parcels = session.exec(
-                select(Parcel.id).where(Parcel.owner_id == user_id)
-            ).all()
-            if not user_parcels:
-                self.alerts = []
-                return
-            user_sensors = session.exec(
-                select(Sensor.id).where(Sensor.parcel_id.in_(user_parcels))
-            ).all()
-            if not user_sensors:
-                self.alerts = []
-                return
-            query = (
-                select(Alert, Sensor)
-                .join(Sensor)
-                .where(Alert.sensor_id.in_(user_sensors))
-            )
-            if self.active_filter:
-                query = query.where(Alert.is_active == True)
-            if self.severity_filter != "all":
-                query = query.where(Alert.severity == self.severity_filter)
-            query = query.order_by(desc(Alert.timestamp))
-            results = session.exec(query).all()
-            self.alerts = [
-                {
-                    "id": a.id,
-                    "sensor_name": s.name,
-                    "message": a.message,
-                    "severity": a.severity,
-                    "timestamp": a.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-                    "is_active": a.is_active,
-                    "acknowledged_at": a.acknowledged_at.strftime("%Y-%m-%d %H:%M:%S")
-                    if a.acknowledged_at
-                    else None,
-                }
-                for a, s in results
-            ]
+            self.total_alerts = session.exec(
+                self._filtered(select(func.count(Alert.id)), user_id)
+            ).one()
+            self._load_page(session, user_id)
+
+    def _load_page(self, session, user_id: int):
+        cursor = self._page_cursors[self.page - 1]
+        query = self._filtered(
+            select(
+                Alert.id,
+                Alert.sensor_id,
+                Sensor.parcel_id,
+                Sensor.name.label("sensor_name"),
+                Alert.message,
+                Alert.severity,
+                func.strftime(TIMESTAMP_FORMAT, Alert.timestamp).label("timestamp"),
+                Alert.is_active,
+                func.strftime(TIMESTAMP_FORMAT, Alert.acknowledged_at).label(
+                    "acknowledged_at"
+                ),
+                Alert.reading_count,
+                Alert.peak_value,
+                func.strftime(TIMESTAMP_FORMAT, Alert.last_seen).label("last_seen"),
+                func.strftime(TIMESTAMP_FORMAT, Alert.closed_at).label("closed_at"),
+                Alert.timestamp.label("sort_key"),
+            ),
+            user_id,
+        )
+        key = tuple_(Alert.timestamp, Alert.id)
+        if cursor is not None:
+            query = query.where(key < cursor if self.sort_desc else key > cursor)
+        order = desc if self.sort_desc else asc
+        query = query.order_by(order(Alert.timestamp), order(Alert.id)).limit(
+            PAGE_SIZE + 1
+        )
+        rows = session.exec(query).all()
+        self.has_next_page = len(rows) > PAGE_SIZE
+        rows = rows[:PAGE_SIZE]
+        self._next_cursor = (rows[-1].sort_key, rows[-1].id) if rows else None
+        self.alerts = [
+            {k: v for k, v in row._mapping.items() if k != "sort_key"} for row in rows
+        ]
+
+    @rx.event
+    async def reload_page(self):
+        """Re-query the current page without recounting."""
+        user_id = await self._user_id()
+        if user_id is None:
+            return
+        with rx.session() as session:
+            self._load_page(session, user_id)
+
+    @rx.event
+    def next_page(self):
+        if not self.has_next_page:
+            return
+        self._page_cursors = self._page_cursors[: self.page] + [self._next_cursor]
+        self.page += 1
+        return AlertState.reload_page
+
+    @rx.event
+    def prev_page(self):
+        if self.page <= 1:
+            return
+        self.page -= 1
+        return AlertState.reload_page
+
+    @rx.event
+    def toggle_sort(self):
+        self.sort_desc = not self.sort_desc
+        return AlertState.load_alerts
 
     @rx.event
     def set_active_filter(self, value: bool):
@@ -67,12 +148,105 @@ class AlertState(rx.State):
         return AlertState.load_alerts
 
     @rx.event
-    def acknowledge_alert(self, alert_id: int):
+    def toggle_selected(self, alert_id: int):
+        if alert_id in self.selected_ids:
+            self.selected_ids = [i for i in self.selected_ids if i != alert_id]
+        else:
+            self.selected_ids = self.selected_ids + [alert_id]
+
+    @rx.event
+    def toggle_select_page(self, value: bool):
+        self.selected_ids = [a["id"] for a in self.alerts] if value else []
+
+    async def _bulk_update(self, conditions: list, close: bool = False):
+        """
+        Acknowledge (or close) every owned alert matching `conditions` with a
+        single UPDATE, then patch only the affected rows of the loaded page.
+        """
+        user_id = await self._user_id()
+        if user_id is None:
+            return
+        now = datetime.utcnow()
+        # Keep the first acknowledgement time when closing an acknowledged alert.
+        values = {
+            "is_active": False,
+            "acknowledged_at": func.coalesce(Alert.acknowledged_at, now),
+        }
+        if close:
+            values["closed_at"] = now
+            conditions = conditions + [Alert.closed_at == None]
+        else:
+            conditions = conditions + [Alert.is_active == True]
+        owned = (
+            select(Sensor.id)
+            .join(Parcel, Sensor.parcel_id == Parcel.id)
+            .where(Parcel.owner_id == user_id, Sensor.deleted_at == None)
+        )
         with rx.session() as session:
-            alert = session.get(Alert, alert_id)
-            if alert:
-                alert.is_active = False
-                alert.acknowledged_at = datetime.utcnow()
-                session.add(alert)
-                session.commit()
-        return AlertState.load_alerts
\ No newline at end of file
+            affected = session.execute(
+                update(Alert)
+                .where(Alert.sensor_id.in_(owned), *conditions)
+                .values(**values)
+                .returning(Alert.id, Alert.severity)
+            ).all()
+            session.commit()
+        affected_ids = {alert_id for alert_id, _ in affected}
+        if close:
+            episode_tracker.forget(affected_ids)
+        if self.active_filter:
+            self.total_alerts -= sum(
+                1
+                for _, severity in affected
+                if self.severity_filter in ("all", severity)
+            )
+            self.alerts = [a for a in self.alerts if a["id"] not in affected_ids]
+        else:
+            stamp = now.strftime(TIMESTAMP_FORMAT)
+            self.alerts = [
+                {
+                    **a,
+                    "is_active": False,
+                    "acknowledged_at": a["acknowledged_at"] or stamp,
+                    "closed_at": (a["closed_at"] or stamp) if close else a["closed_at"],
+                }
+                if a["id"] in affected_ids
+                else a
+                for a in self.alerts
+            ]
+        self.selected_ids = [i for i in self.selected_ids if i not in affected_ids]
+        return rx.toast(f"{len(affected_ids)} alerts updated")
+
+    @rx.event
+    async def acknowledge_alert(self, alert_id: int):
+        return await self._bulk_update([Alert.id == alert_id])
+
+    @rx.event
+    async def acknowledge_selected(self):
+        if self.selected_ids:
+            return await self._bulk_update([Alert.id.in_(self.selected_ids)])
+
+    @rx.event
+    async def close_selected(self):
+        if self.selected_ids:
+            return await self._bulk_update(
+                [Alert.id.in_(self.selected_ids)], close=True
+            )
+
+    @rx.event
+    async def acknowledge_sensor(self, sensor_id: int):
+        return await self._bulk_update([Alert.sensor_id == sensor_id])
+
+    @rx.event
+    async def acknowledge_parcel(self, parcel_id: int):
+        return await self._bulk_update(
+            [
+                Alert.sensor_id.in_(
+                    select(Sensor.id).where(Sensor.parcel_id == parcel_id)
+                )
+            ]
+        )
+
+    @rx.event
+    async def acknowledge_filtered(self):
+        """Acknowledge everything matching the current filters, on every page."""
+        return await self._bulk_update(self._filter_conditions())
\ No newline at end of file
@@ -1,14 +1,16 @@
 import reflex as rx
-import bcrypt
-import logging
 from typing import Optional
-from app.models import User, Parcel, Sensor, SensorData, Alert
-from sqlmodel import select, SQLModel
+from app.models import User
+from sqlmodel import select
+from sqlalchemy.exc import IntegrityError
+from app.security import hash_pool
 from datetime import datetime
 
 
 class AuthState(rx.State):
-    user: Optional[User] = None
+    user_id: Optional[int] = None
+    role: str = ""
+    display_name: str = ""
     username_input: str = ""
     password_input: str = ""
     email_input: str = ""
@@ -17,7 +19,15 @@ class AuthState(rx.State):
 
     @rx.var
     def is_authenticated(self) -> bool:
-        return self.user is not None
+        return self.user_id is not None
+
+    def _sign_in(self, user: User):
+        """Keep only the identity in state, never the full row."""
+        self.user_id = user.id
+        self.role = user.role
+        self.display_name = user.username
+        self.password_input = ""
+        self.error_message = ""
 
     @rx.event
     async def check_auth_index(self):
@@ -42,31 +52,34 @@ class AuthState(rx.State):
     @rx.event
     def logout(self):
         """Logout the current user."""
-        self.user = None
+        self.user_id = None
+        self.role = ""
+        self.display_name = ""
         return rx.redirect("/")
 
     @rx.event
-    def login(self):
+    async def login(self):
         """Authenticate the user."""
         with rx.session() as session:
             user = session.exec(
                 select(User).where(User.username == self.username_input)
             ).first()
-            if user and bcrypt.checkpw(
-                self.password_input.encode("utf-8"), user.password_hash.encode("utf-8")
-            ):
-                self.user = user
-                self.error_message = ""
-                return rx.redirect("/")
-            else:
-                self.error_message = "Invalid username or password"
+        if user and await hash_pool.verify_password(
+            self.password_input, user.password_hash
+        ):
+            self._sign_in(user)
+            return rx.redirect("/")
+        else:
+            self.error_message = "Invalid username or password"
 
     @rx.event
-    def register(self):
+    async def register(self):
         """Register a new user."""
         if not self.username_input or not self.password_input or (not self.email_input):
             self.error_message = "All fields are required"
             return
+        # Hash before opening the session so no connection is held meanwhile.
+        hashed_pw = await hash_pool.hash_password(self.password_input)
         with rx.session() as session:
             existing_user = session.exec(
                 select(User).where(User.username == self.username_input)
@@ -74,9 +87,6 @@ class AuthState(rx.State):
             if existing_user:
                 self.error_message = "Username already exists"
                 return
-            hashed_pw = bcrypt.hashpw(
-                self.password_input.encode("utf-8"), bcrypt.gensalt()
-            ).decode("utf-8")
             new_user = User(
                 username=self.username_input,
                 email=self.email_input,
@@ -84,11 +94,16 @@ class AuthState(rx.State):
                 role=self.role_input,
             )
             session.add(new_user)
-            session.commit()
+            try:
+                session.commit()
+            except IntegrityError:
+                # Lost a race with a concurrent registration of the same name.
+                session.rollback()
+                self.error_message = "Username already exists"
+                return
             session.refresh(new_user)
-            self.user = new_user
-            self.error_message = ""
-            return rx.redirect("/")
+        self._sign_in(new_user)
+        return rx.redirect("/")
 
     @rx.event
     def set_username(self, value: str):
@@ -104,174 +119,4 @@ class AuthState(rx.State):
 
     @rx.event
     def set_role(self, value: str):
-        self.role_input = value
-
-    @rx.event
-    def seed_database(self):
-        """Seed the database with initial data."""
-        with rx.session() as session:
-            try:
-                engine = session.get_bind()
-                SQLModel.metadata.create_all(engine)
-                logging.info("Database tables verified/created.")
-            except Exception as e:
-                logging.exception(f"Failed to verify/create tables: {e}")
-        with rx.session() as session:
-            try:
-                technician = session.exec(
-                    select(User).where(User.username == "tech_admin")
-                ).first()
-                if not technician:
-                    tech_pw = bcrypt.hashpw(
-                        "admin123".encode("utf-8"), bcrypt.gensalt()
-                    ).decode("utf-8")
-                    technician = User(
-                        username="tech_admin",
-                        email="admin@agrotech.com",
-                        password_hash=tech_pw,
-                        role="technician",
-                    )
-                    session.add(technician)
-                    session.flush()
-                    logging.info("Created tech_admin user.")
-                farmer = session.exec(
-                    select(User).where(User.username == "john_doe")
-                ).first()
-                if not farmer:
-                    farmer_pw = bcrypt.hashpw(
-                        "farmer123".encode("utf-8"), bcrypt.gensalt()
-                    ).decode("utf-8")
-                    farmer = User(
-                        username="john_doe",
-                        email="john@farm.com",
-                        password_hash=farmer_pw,
-                        role="farmer",
-                    )
-                    session.add(farmer)
-                    session.flush()
-                    logging.info("Created john_doe user.")
-                if not farmer.id:
-                    session.refresh(farmer)
-                parcel1 = session.exec(
-                    select(Parcel).where(
-                        Parcel.name == "North Field", Parcel.owner_id == farmer.id
-                    )
-                ).first()
-                if not parcel1:
-                    parcel1 = Parcel(
-                        name="North Field",
-                        location="Sector A",
-                        area=15.5,
-                        owner_id=farmer.id,
-                    )
-                    session.add(parcel1)
-                    session.flush()
-                parcel2 = session.exec(
-                    select(Parcel).where(
-                        Parcel.name == "Green Valley", Parcel.owner_id == farmer.id
-                    )
-                ).first()
-                if not parcel2:
-                    parcel2 = Parcel(
-                        name="Green Valley",
-                        location="Sector B",
-                        area=22.0,
-                        owner_id=farmer.id,
-                    )
-                    session.add(parcel2)
-                    session.flush()
-                if not parcel1.id:
-                    session.refresh(parcel1)
-                if not parcel2.id:
-                    session.refresh(parcel2)
-                sensors_config = [
-                    {
-                        "uid": "SENS-001",
-                        "name": "Soil Sensor A1",
-                        "type": "soil_moisture",
-                        "pid": parcel1.id,
-                        "unit": "%",
-                        "val": 45.2,
-                    },
-                    {
-                        "uid": "SENS-002",
-                        "name": "Temp Sensor A1",
-                        "type": "temperature",
-                        "pid": parcel1.id,
-                        "unit": "C",
-                        "val": 23.5,
-                    },
-                    {
-                        "uid": "SENS-003",
-                        "name": "Light Sensor B1",
-                        "type": "light",
-                        "pid": parcel2.id,
-                        "unit": "lx",
-                        "val": 500.0,
-                    },
-                    {
-                        "uid": "SENS-004",
-                        "name": "Humidity Sensor A1",
-                        "type": "humidity",
-                        "pid": parcel1.id,
-                        "unit": "%",
-                        "val": 55.0,
-                    },
-                    {
-                        "uid": "SENS-005",
-                        "name": "CO2 Sensor A1",
-                        "type": "co2",
-                        "pid": parcel1.id,
-                        "unit": "ppm",
-                        "val": 410.0,
-                    },
-                    {
-                        "uid": "SENS-006",
-                        "name": "VOC Sensor B1",
-                        "type": "voc",
-                        "pid": parcel2.id,
-                        "unit": "ppb",
-                        "val": 120.0,
-                    },
-                    {
-                        "uid": "SENS-007",
-                        "name": "NOx Sensor B1",
-                        "type": "nox",
-                        "pid": parcel2.id,
-                        "unit": "ppb",
-                        "val": 45.0,
-                    },
-                ]
-                for conf in sensors_config:
-                    sensor = session.exec(
-                        select(Sensor).where(Sensor.unique_id == conf["uid"])
-                    ).first()
-                    if not sensor:
-                        sensor = Sensor(
-                            name=conf["name"],
-                            sensor_type=conf["type"],
-                            parcel_id=conf["pid"],
-                            unique_id=conf["uid"],
-                        )
-                        session.add(sensor)
-                        session.flush()
-                        data = SensorData(
-                            sensor_id=sensor.id, value=conf["val"], unit=conf["unit"]
-                        )
-                        session.add(data)
-                        if conf["uid"] == "SENS-001":
-                            alert = Alert(
-                                sensor_id=sensor.id,
-                                severity="warning",
-                                message="Soil moisture low",
-                                is_active=True,
-                            )
-                            session.add(alert)
-                    elif sensor.sensor_type != conf["type"]:
-                        sensor.sensor_type = conf["type"]
-                        session.add(sensor)
-                session.commit()
-                logging.info("Database seeding completed successfully.")
-            except Exception as e:
-                logging.exception(f"Error seeding database: {e}")
-                session.rollback()
\ No newline at end of file
+        self.role_input = value
\ No newline at end of file
@@ -2,8 +2,10 @@ import reflex as rx
 import asyncio
 from sqlmodel import select, func, desc
 from datetime import datetime
-from app.models import Sensor, Parcel, Alert, SensorData
+from app.models import Sensor, Alert, SensorData
 from app.states.auth_state import AuthState
+from app.liveness import liveness
+from app.cache import user_context
 
 
 class DashboardState(rx.State):
@@ -38,13 +40,19 @@ class DashboardState(rx.State):
             return
         async with self:
             self._is_running = True
-        yield DashboardState.load_data
-        while True:
-            await asyncio.sleep(15)
-            async with self:
-                if not self._is_running:
-                    break
+        try:
             yield DashboardState.load_data
+            while True:
+                await asyncio.sleep(15)
+                async with self:
+                    if not self._is_running:
+                        break
+                yield DashboardState.load_data
+        finally:
+            # Leaving the page cancels the task; clear the flag so the next
+            # visit to the dashboard starts the loop again.
+            async with self:
+                self._is_running = False
 
     @rx.event
     def stop_auto_refresh(self):
@@ -52,15 +60,11 @@ class DashboardState(rx.State):
 
     @rx.event
     async def load_data(self):
-        auth_state = await self.get_state(AuthState)
-        user = auth_state.user
-        if not user:
+        user_id = (await self.get_state(AuthState)).user_id
+        if user_id is None:
             return
-        user_id = user["id"] if isinstance(user, dict) else user.id
         with rx.session() as session:
-            user_parcels = session.exec(
-                select(Parcel.id).where(Parcel.owner_id == user_id)
-            ).all()
+            user_parcels = user_context(session, user_id).parcel_ids
             if not user_parcels:
                 self.total_sensors = 0
                 self.active_sensors = 0
@@ -70,11 +74,18 @@ class DashboardState(rx.State):
                 return
             self.total_parcels = len(user_parcels)
             sensors = session.exec(
-                select(Sensor).where(Sensor.parcel_id.in_(user_parcels))
+                select(Sensor).where(
+                    Sensor.parcel_id.in_(user_parcels), Sensor.deleted_at == None
+                )
             ).all()
             sensor_ids = [s.id for s in sensors]
             self.total_sensors = len(sensors)
-            self.active_sensors = sum((1 for s in sensors if s.status == "active"))
+            active = liveness.active_count(user_id)
+            self.active_sensors = (
+                active
+                if active is not None
+                else sum((1 for s in sensors if s.status == "active"))
+            )
             self.active_alerts = session.exec(
                 select(func.count(Alert.id))
                 .where(Alert.sensor_id.in_(sensor_ids))
@@ -1,7 +1,8 @@
 import reflex as rx
 from sqlmodel import select, desc
-from app.models import SensorData, Sensor, Parcel
+from app.models import SensorData, Sensor
 from app.states.auth_state import AuthState
+from app.cache import user_context
 from datetime import datetime, timedelta
 import csv
 import io
@@ -14,15 +15,11 @@ class HistoryState(rx.State):
 
     @rx.event
     async def load_history(self):
-        user = await self.get_state(AuthState)
-        if not user.user:
+        user_id = (await self.get_state(AuthState)).user_id
+        if user_id is None:
             return
-        user_data = user.user
-        user_id = user_data["id"] if isinstance(user_data, dict) else user_data.id
         with rx.session() as session:
-            user_parcels = session.exec(
-                select(Parcel.id).where(Parcel.owner_id == user_id)
-            ).all()
+            user_parcels = user_context(session, user_id).parcel_ids
             if not user_parcels:
                 self.chart_data = []
                 return
@@ -30,6 +27,7 @@ class HistoryState(rx.State):
                 select(Sensor)
                 .where(Sensor.parcel_id.in_(user_parcels))
                 .where(Sensor.sensor_type == self.sensor_type)
+                .where(Sensor.deleted_at == None)
             ).all()
             if not sensors:
                 self.chart_data = []
@@ -68,21 +66,18 @@ class HistoryState(rx.State):
 
     @rx.event
     async def export_csv(self):
-        user = await self.get_state(AuthState)
-        if not user.user:
+        user_id = (await self.get_state(AuthState)).user_id
+        if user_id is None:
             return
-        user_data = user.user
-        user_id = user_data["id"] if isinstance(user_data, dict) else user_data.id
         with rx.session() as session:
-            user_parcels = session.exec(
-                select(Parcel.id).where(Parcel.owner_id == user_id)
-            ).all()
+            user_parcels = user_context(session, user_id).parcel_ids
             if not user_parcels:
                 return
             sensors = session.exec(
                 select(Sensor)
                 .where(Sensor.parcel_id.in_(user_parcels))
                 .where(Sensor.sensor_type == self.sensor_type)
+                .where(Sensor.deleted_at == None)
             ).all()
             sensor_ids = [s.id for s in sensors]
             sensor_map = {s.id: s.name for s in sensors}
@@ -1,9 +1,18 @@
 import reflex as rx
+import asyncio
 import logging
 from typing import Optional
-from sqlmodel import select, func, delete
+from datetime import datetime
+from sqlmodel import select, func, update
 from app.models import Parcel, Sensor
 from app.states.auth_state import AuthState
+from app.cache import parcel_cache, invalidate_user, user_context
+from app.search import search_ids
+from app.alerting.rules import engine as rule_engine
+from app.liveness import liveness
+from app.purge import purger
+
+SEARCH_DEBOUNCE = 0.3
 
 
 class ParcelState(rx.State):
@@ -18,34 +27,52 @@ class ParcelState(rx.State):
     location: str = ""
     area: float = 0.0
     error_message: str = ""
+    _search_token: int = 0
 
     @rx.event
     async def load_parcels(self):
         """Load parcels for the current user."""
-        user = await self.get_state(AuthState)
-        if not user.user:
+        user_id = (await self.get_state(AuthState)).user_id
+        if user_id is None:
             return
-        user_data = user.user
-        user_id = user_data["id"] if isinstance(user_data, dict) else user_data.id
-        with rx.session() as session:
-            query = select(Parcel).where(Parcel.owner_id == user_id)
-            if self.search_value:
-                query = query.where(
-                    Parcel.name.contains(self.search_value)
-                    | Parcel.location.contains(self.search_value)
-                )
-            self.parcels = session.exec(query).all()
-            counts = session.exec(
-                select(Sensor.parcel_id, func.count(Sensor.id)).group_by(
-                    Sensor.parcel_id
+        rows = parcel_cache.get(user_id)
+        if rows is None:
+            with rx.session() as session:
+                rows = session.exec(
+                    select(Parcel, func.count(Sensor.id))
+                    .outerjoin(
+                        Sensor,
+                        (Sensor.parcel_id == Parcel.id) & (Sensor.deleted_at == None),
+                    )
+                    .where(Parcel.owner_id == user_id, Parcel.deleted_at == None)
+                    .group_by(Parcel.id)
+                    .order_by(Parcel.id)
+                ).all()
+            rows = [(parcel, count) for parcel, count in rows]
+            parcel_cache.set(user_id, rows)
+        if self.search_value.strip():
+            with rx.session() as session:
+                ranked = search_ids(
+                    session, self.search_value, "parcel", user_id, len(rows) or 1
                 )
-            ).all()
-            self.sensor_counts = {p_id: count for p_id, count in counts}
-
-    @rx.event
-    def set_search(self, value: str):
-        self.search_value = value
-        return ParcelState.load_parcels
+            by_id = {parcel.id: parcel for parcel, _ in rows}
+            self.parcels = [by_id[pid] for pid in ranked if pid in by_id]
+        else:
+            self.parcels = [parcel for parcel, _ in rows]
+        self.sensor_counts = {parcel.id: count for parcel, count in rows}
+
+    @rx.event(background=True)
+    async def set_search(self, value: str):
+        """Debounce typing: only the last keystroke in a burst reloads."""
+        async with self:
+            self.search_value = value
+            self._search_token += 1
+            token = self._search_token
+        await asyncio.sleep(SEARCH_DEBOUNCE)
+        async with self:
+            stale = token != self._search_token
+        if not stale:
+            yield ParcelState.load_parcels
 
     @rx.event
     def open_add_dialog(self):
@@ -101,11 +128,9 @@ class ParcelState(rx.State):
         if not self.name or not self.location:
             self.error_message = "Name and Location are required"
             return
-        user = await self.get_state(AuthState)
-        if not user.user:
+        user_id = (await self.get_state(AuthState)).user_id
+        if user_id is None:
             return
-        user_data = user.user
-        user_id = user_data["id"] if isinstance(user_data, dict) else user_data.id
         with rx.session() as session:
             new_parcel = Parcel(
                 name=self.name, location=self.location, area=self.area, owner_id=user_id
@@ -113,35 +138,56 @@ class ParcelState(rx.State):
             session.add(new_parcel)
             session.commit()
             session.refresh(new_parcel)
+        invalidate_user(user_id)
         self.is_add_open = False
         return ParcelState.load_parcels
 
     @rx.event
-    def update_parcel(self):
+    async def update_parcel(self):
         if not self.name or not self.location:
             self.error_message = "Name and Location are required"
             return
+        user_id = (await self.get_state(AuthState)).user_id
+        if user_id is None:
+            return
         with rx.session() as session:
             parcel = session.get(Parcel, self.current_parcel_id)
-            if parcel:
+            if parcel and parcel.id in user_context(session, user_id).parcels:
                 parcel.name = self.name
                 parcel.location = self.location
                 parcel.area = self.area
                 session.add(parcel)
+                owner_id = parcel.owner_id
                 session.commit()
+                invalidate_user(owner_id)
         self.is_edit_open = False
         return ParcelState.load_parcels
 
     @rx.event
-    def delete_parcel(self):
+    async def delete_parcel(self):
+        user_id = (await self.get_state(AuthState)).user_id
+        if user_id is None:
+            return
         with rx.session() as session:
             parcel = session.get(Parcel, self.current_parcel_id)
-            if parcel:
-                statement = delete(Sensor).where(
-                    Sensor.parcel_id == self.current_parcel_id
+            if parcel and parcel.id in user_context(session, user_id).parcels:
+                now = datetime.utcnow()
+                statement = (
+                    update(Sensor)
+                    .where(
+                        Sensor.parcel_id == self.current_parcel_id,
+                        Sensor.deleted_at == None,
+                    )
+                    .values(deleted_at=now)
                 )
                 session.exec(statement)
-                session.delete(parcel)
+                parcel.deleted_at = now
+                session.add(parcel)
+                owner_id = parcel.owner_id
                 session.commit()
+                invalidate_user(owner_id)
+                rule_engine.invalidate()
+                liveness.invalidate()
+                purger.wake()
         self.is_delete_open = False
         return ParcelState.load_parcels
\ No newline at end of file
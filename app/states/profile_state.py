@@ -0,0 +1,20 @@
+import reflex as rx
+from app.models import User
+from app.states.auth_state import AuthState
+
+
+class ProfileState(rx.State):
+    email: str = ""
+    created_at: str = ""
+
+    @rx.event
+    async def load_profile(self):
+        """Fetch the fields the profile page shows beyond the session identity."""
+        auth = await self.get_state(AuthState)
+        if auth.user_id is None:
+            return
+        with rx.session() as session:
+            user = session.get(User, auth.user_id)
+            if user:
+                self.email = user.email
+                self.created_at = user.created_at.strftime("%Y-%m-%d %H:%M")
\ No newline at end of file
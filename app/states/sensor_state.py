@@ -1,20 +1,48 @@
 import reflex as rx
 import logging
 from typing import Optional
-from sqlmodel import select
-from app.models import Sensor, Parcel, User
+from datetime import datetime
+from sqlalchemy import tuple_
+from sqlmodel import select, func, desc, asc
+from app.models import Sensor, Parcel
 from app.states.auth_state import AuthState
+from app.alerting.rules import engine as rule_engine
+from app.cache import invalidate_user, user_context
+from app.liveness import liveness
+from app.purge import purger
+from app.search import search_ids
+from app.importer import import_inventory, parse_rows
+
+SEARCH_LIMIT = 200
+PAGE_SIZE = 50
+IMPORT_ERRORS_SHOWN = 50
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M"
+SORT_COLUMNS = {
+    "name": Sensor.name,
+    "sensor_type": Sensor.sensor_type,
+    "status": Sensor.status,
+    "created_at": Sensor.created_at,
+}
 
 
 class SensorState(rx.State):
-    sensors: list[Sensor] = []
-    parcels: list[Parcel] = []
+    sensors: list[dict] = []
+    parcel_options: list[dict] = []
     search_value: str = ""
     filter_type: str = "all"
     filter_status: str = "all"
+    sort_by: str = "name"
+    sort_desc: bool = False
+    total_sensors: int = 0
+    search_truncated: bool = False
+    page: int = 1
+    has_next_page: bool = False
     is_add_open: bool = False
     is_edit_open: bool = False
     is_delete_open: bool = False
+    is_import_open: bool = False
+    import_summary: str = ""
+    import_errors: list[str] = []
     current_sensor_id: int = 0
     name: str = ""
     sensor_type: str = "temperature"
@@ -23,34 +51,150 @@ class SensorState(rx.State):
     parcel_id: int = 0
     threshold_min: str = ""
     threshold_max: str = ""
+    hysteresis: str = ""
     error_message: str = ""
+    _page_cursors: list[Optional[tuple]] = [None]
+    _next_cursor: Optional[tuple] = None
+    _ranked_ids: Optional[list[int]] = None
+
+    @rx.var
+    def page_start(self) -> int:
+        if not self.sensors:
+            return 0
+        return (self.page - 1) * PAGE_SIZE + 1
+
+    @rx.var
+    def page_end(self) -> int:
+        return (self.page - 1) * PAGE_SIZE + len(self.sensors)
+
+    async def _user_id(self) -> Optional[int]:
+        return (await self.get_state(AuthState)).user_id
+
+    def _filtered(self, query, user_id: int):
+        query = query.join(Parcel, Sensor.parcel_id == Parcel.id).where(
+            Parcel.owner_id == user_id, Sensor.deleted_at == None
+        )
+        if self.filter_type != "all":
+            query = query.where(Sensor.sensor_type == self.filter_type)
+        if self.filter_status != "all":
+            query = query.where(Sensor.status == self.filter_status)
+        return query
 
     @rx.event
     async def load_data(self):
-        """Load sensors and parcels for the current user."""
-        user = await self.get_state(AuthState)
-        if not user.user:
+        """Reset to the first page and refresh the total count."""
+        user_id = await self._user_id()
+        if user_id is None:
             return
-        user_data = user.user
-        user_id = user_data["id"] if isinstance(user_data, dict) else user_data.id
+        self.page = 1
+        self._page_cursors = [None]
         with rx.session() as session:
-            p_query = select(Parcel).where(Parcel.owner_id == user_id)
-            self.parcels = session.exec(p_query).all()
-            if not self.parcels:
-                self.sensors = []
-                return
-            parcel_ids = [p.id for p in self.parcels]
-            query = select(Sensor).where(Sensor.parcel_id.in_(parcel_ids))
-            if self.search_value:
-                query = query.where(
-                    Sensor.name.contains(self.search_value)
-                    | Sensor.unique_id.contains(self.search_value)
+            self.parcel_options = [
+                {"id": pid, "name": name}
+                for pid, name in user_context(session, user_id).parcels.items()
+            ]
+            if self.search_value.strip():
+                # Search results are already capped, so keep their ranked ids
+                # and page through them in relevance order.
+                ranked = search_ids(
+                    session, self.search_value, "sensor", user_id, SEARCH_LIMIT
                 )
-            if self.filter_type != "all":
-                query = query.where(Sensor.sensor_type == self.filter_type)
-            if self.filter_status != "all":
-                query = query.where(Sensor.status == self.filter_status)
-            self.sensors = session.exec(query).all()
+                matching = set(
+                    session.exec(
+                        self._filtered(select(Sensor.id), user_id).where(
+                            Sensor.id.in_(ranked)
+                        )
+                    ).all()
+                )
+                self._ranked_ids = [i for i in ranked if i in matching]
+                self.total_sensors = len(self._ranked_ids)
+                self.search_truncated = len(ranked) >= SEARCH_LIMIT
+            else:
+                self._ranked_ids = None
+                self.search_truncated = False
+                self.total_sensors = session.exec(
+                    self._filtered(select(func.count(Sensor.id)), user_id)
+                ).one()
+            self._load_page(session, user_id)
+
+    def _load_page(self, session, user_id: int):
+        query = self._filtered(
+            select(
+                Sensor.id,
+                Sensor.name,
+                Sensor.unique_id,
+                Sensor.sensor_type,
+                Sensor.status,
+                Sensor.parcel_id,
+                Parcel.name.label("parcel_name"),
+                Sensor.threshold_min,
+                Sensor.threshold_max,
+                Sensor.hysteresis,
+                func.strftime(TIMESTAMP_FORMAT, Sensor.last_seen).label("last_seen"),
+            ),
+            user_id,
+        )
+        if self._ranked_ids is not None:
+            offset = (self.page - 1) * PAGE_SIZE
+            page_ids = self._ranked_ids[offset : offset + PAGE_SIZE]
+            self.has_next_page = offset + PAGE_SIZE < len(self._ranked_ids)
+            rows = {
+                row.id: dict(row._mapping)
+                for row in session.exec(query.where(Sensor.id.in_(page_ids))).all()
+            }
+            self.sensors = [rows[i] for i in page_ids if i in rows]
+            return
+        column = SORT_COLUMNS[self.sort_by]
+        cursor = self._page_cursors[self.page - 1]
+        key = tuple_(column, Sensor.id)
+        if cursor is not None:
+            query = query.where(key < cursor if self.sort_desc else key > cursor)
+        order = desc if self.sort_desc else asc
+        query = query.add_columns(column.label("sort_key"))
+        query = query.order_by(order(column), order(Sensor.id)).limit(PAGE_SIZE + 1)
+        rows = session.exec(query).all()
+        self.has_next_page = len(rows) > PAGE_SIZE
+        rows = rows[:PAGE_SIZE]
+        self._next_cursor = (rows[-1].sort_key, rows[-1].id) if rows else None
+        self.sensors = [
+            {k: v for k, v in row._mapping.items() if k != "sort_key"} for row in rows
+        ]
+
+    @rx.event
+    async def reload_page(self):
+        """Re-query the current page without recounting."""
+        user_id = await self._user_id()
+        if user_id is None:
+            return
+        with rx.session() as session:
+            self._load_page(session, user_id)
+
+    @rx.event
+    def next_page(self):
+        if not self.has_next_page:
+            return
+        self._page_cursors = self._page_cursors[: self.page] + [self._next_cursor]
+        self.page += 1
+        return SensorState.reload_page
+
+    @rx.event
+    def prev_page(self):
+        if self.page <= 1:
+            return
+        self.page -= 1
+        return SensorState.reload_page
+
+    @rx.event
+    def sort_on(self, column: str):
+        """Sort by `column`, flipping direction when it is already active."""
+        if column not in SORT_COLUMNS:
+            return
+        if self.sort_by == column:
+            self.sort_desc = not self.sort_desc
+        else:
+            self.sort_by = column
+            self.sort_desc = False
+        return SensorState.load_data
 
     @rx.event
     def set_search(self, value: str):
@@ -75,8 +219,9 @@ class SensorState(rx.State):
         self.status = "active"
         self.threshold_min = ""
         self.threshold_max = ""
-        if self.parcels:
-            self.parcel_id = self.parcels[0].id
+        self.hysteresis = ""
+        if self.parcel_options:
+            self.parcel_id = self.parcel_options[0]["id"]
         self.error_message = ""
         self.is_add_open = True
 
@@ -85,18 +230,21 @@ class SensorState(rx.State):
         self.is_add_open = False
 
     @rx.event
-    def open_edit_dialog(self, sensor: Sensor):
-        self.current_sensor_id = sensor.id
-        self.name = sensor.name
-        self.sensor_type = sensor.sensor_type
-        self.unique_id = sensor.unique_id
-        self.status = sensor.status
-        self.parcel_id = sensor.parcel_id
+    def open_edit_dialog(self, sensor: dict):
+        self.current_sensor_id = sensor["id"]
+        self.name = sensor["name"]
+        self.sensor_type = sensor["sensor_type"]
+        self.unique_id = sensor["unique_id"]
+        self.status = sensor["status"]
+        self.parcel_id = sensor["parcel_id"]
         self.threshold_min = (
-            str(sensor.threshold_min) if sensor.threshold_min is not None else ""
+            str(sensor["threshold_min"]) if sensor["threshold_min"] is not None else ""
         )
         self.threshold_max = (
-            str(sensor.threshold_max) if sensor.threshold_max is not None else ""
+            str(sensor["threshold_max"]) if sensor["threshold_max"] is not None else ""
+        )
+        self.hysteresis = (
+            str(sensor["hysteresis"]) if sensor["hysteresis"] is not None else ""
         )
         self.error_message = ""
         self.is_edit_open = True
@@ -105,6 +253,49 @@ class SensorState(rx.State):
     def close_edit_dialog(self):
         self.is_edit_open = False
 
+    @rx.event
+    def open_import_dialog(self):
+        self.import_summary = ""
+        self.import_errors = []
+        self.is_import_open = True
+
+    @rx.event
+    def close_import_dialog(self):
+        self.is_import_open = False
+
+    @rx.event
+    async def handle_import(self, files: list[rx.UploadFile]):
+        """Import parcels and sensors from an uploaded CSV or JSON file."""
+        user_id = await self._user_id()
+        if user_id is None or not files:
+            return
+        upload = files[0]
+        try:
+            rows, first_row = parse_rows(await upload.read(), upload.name or "")
+        except (ValueError, UnicodeDecodeError) as e:
+            self.import_summary = ""
+            self.import_errors = [f"Could not parse file: {e}"]
+            return
+        with rx.session() as session:
+            report = import_inventory(session, rows, user_id, first_row=first_row)
+        self.import_errors = report.errors[:IMPORT_ERRORS_SHOWN]
+        if len(report.errors) > IMPORT_ERRORS_SHOWN:
+            self.import_errors.append(
+                f"... and {len(report.errors) - IMPORT_ERRORS_SHOWN} more errors"
+            )
+        if not report.committed:
+            self.import_summary = (
+                f"Nothing imported: {report.invalid_rows} invalid rows"
+                if report.invalid_rows
+                else "Nothing imported"
+            )
+            return
+        self.import_summary = f"Imported {report.sensors_created} sensors and {report.parcels_created} parcels"
+        rule_engine.invalidate()
+        liveness.invalidate()
+        invalidate_user(user_id)
+        return SensorState.load_data
+
     @rx.event
     def open_delete_dialog(self, sensor_id: int):
         self.current_sensor_id = sensor_id
@@ -146,13 +337,24 @@ class SensorState(rx.State):
         self.threshold_max = value
 
     @rx.event
-    def add_sensor(self):
+    def set_hysteresis(self, value: str):
+        self.hysteresis = value
+
+    @rx.event
+    async def add_sensor(self):
         if not self.name or not self.unique_id or (not self.parcel_id):
             self.error_message = "Name, Unique ID and Parcel are required"
             return
         t_min = float(self.threshold_min) if self.threshold_min else None
         t_max = float(self.threshold_max) if self.threshold_max else None
+        hysteresis = float(self.hysteresis) if self.hysteresis else None
+        user_id = await self._user_id()
+        if user_id is None:
+            return
         with rx.session() as session:
+            if self.parcel_id not in user_context(session, user_id).parcels:
+                self.error_message = "Unknown parcel"
+                return
             new_sensor = Sensor(
                 name=self.name,
                 sensor_type=self.sensor_type,
@@ -161,22 +363,34 @@ class SensorState(rx.State):
                 parcel_id=self.parcel_id,
                 threshold_min=t_min,
                 threshold_max=t_max,
+                hysteresis=hysteresis,
             )
             session.add(new_sensor)
             session.commit()
+        rule_engine.invalidate()
+        liveness.invalidate()
+        invalidate_user(user_id)
         self.is_add_open = False
         return SensorState.load_data
 
     @rx.event
-    def update_sensor(self):
+    async def update_sensor(self):
         if not self.name or not self.unique_id:
             self.error_message = "Name and Unique ID are required"
             return
         t_min = float(self.threshold_min) if self.threshold_min else None
         t_max = float(self.threshold_max) if self.threshold_max else None
+        hysteresis = float(self.hysteresis) if self.hysteresis else None
+        user_id = await self._user_id()
+        if user_id is None:
+            return
         with rx.session() as session:
+            context = user_context(session, user_id)
+            if self.parcel_id not in context.parcels:
+                self.error_message = "Unknown parcel"
+                return
             sensor = session.get(Sensor, self.current_sensor_id)
-            if sensor:
+            if sensor and sensor.id in context.sensor_ids:
                 sensor.name = self.name
                 sensor.sensor_type = self.sensor_type
                 sensor.unique_id = self.unique_id
@@ -184,17 +398,29 @@ class SensorState(rx.State):
                 sensor.parcel_id = self.parcel_id
                 sensor.threshold_min = t_min
                 sensor.threshold_max = t_max
+                sensor.hysteresis = hysteresis
                 session.add(sensor)
                 session.commit()
+        rule_engine.invalidate()
+        liveness.invalidate()
+        invalidate_user(user_id)
         self.is_edit_open = False
-        return SensorState.load_data
+        return SensorState.reload_page
 
     @rx.event
-    def delete_sensor(self):
+    async def delete_sensor(self):
+        user_id = await self._user_id()
+        if user_id is None:
+            return
         with rx.session() as session:
             sensor = session.get(Sensor, self.current_sensor_id)
-            if sensor:
-                session.delete(sensor)
+            if sensor and sensor.id in user_context(session, user_id).sensor_ids:
+                sensor.deleted_at = datetime.utcnow()
+                session.add(sensor)
                 session.commit()
+        rule_engine.invalidate()
+        liveness.invalidate()
+        invalidate_user(user_id)
+        purger.wake()
         self.is_delete_open = False
         return SensorState.load_data
\ No newline at end of file
@@ -0,0 +1,168 @@
+import argparse
+import atexit
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# Spans are exported only when TRACE_FILE names a JSON-lines file. Each
+# process (web app, MQTT bridge) should get its own file; the report below
+# reads several at once.
+TRACE_FILE = os.getenv("TRACE_FILE")
+TRACE_HEADER = "X-Trace-Id"
+TRACE_START_HEADER = "X-Trace-Start"
+EXPORT_QUEUE_SIZE = 100000
+EXPORT_BATCH = 500
+
+
+def new_trace_id() -> str:
+    """128-bit hex id, the same shape as a W3C/OTLP trace id."""
+    return secrets.token_hex(16)
+
+
+class Tracer:
+    """
+    Records finished spans and appends them to a JSON-lines file from a
+    background thread, so the request path only pays for a queue put. One
+    line per span: trace_id, name, start (epoch seconds), duration_ms and
+    attributes.
+    """
+
+    def __init__(self, path: Optional[str] = TRACE_FILE):
+        self.path = path
+        self.enabled = bool(path)
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=EXPORT_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def record(
+        self, trace_id: Optional[str], name: str, start: float, duration: float, **attrs
+    ):
+        """Record a span that started at `start` (epoch) and lasted `duration` s."""
+        if not self.enabled or not trace_id:
+            return
+        self._ensure_thread()
+        span = {
+            "trace_id": trace_id,
+            "name": name,
+            "start": round(start, 6),
+            "duration_ms": round(duration * 1000, 3),
+        }
+        if attrs:
+            span["attrs"] = attrs
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    @contextmanager
+    def span(self, trace_id: Optional[str], name: str, **attrs):
+        if not self.enabled or not trace_id:
+            yield
+            return
+        start = time.time()
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(trace_id, name, start, time.perf_counter() - began, **attrs)
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._export, name="trace-export", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _drain(self, first: Optional[dict] = None) -> list[dict]:
+        spans = [first] if first is not None else []
+        while len(spans) < EXPORT_BATCH:
+            try:
+                spans.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return spans
+
+    def _write(self, spans: list[dict]):
+        if not spans:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(s, separators=(",", ":")) + "\n" for s in spans))
+
+    def _export(self):
+        while True:
+            spans = self._drain(self._queue.get())
+            try:
+                self._write(spans)
+            except OSError as e:
+                logging.warning(f"Could not write {len(spans)} spans: {e}")
+
+    def flush(self):
+        """Write whatever is still queued; called at exit."""
+        while not self._queue.empty():
+            try:
+                self._write(self._drain())
+            except OSError:
+                return
+
+
+tracer = Tracer()
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def stage_percentiles(paths: list[str]) -> dict[str, dict]:
+    """Per span name: count and p50/p90/p99/max duration in ms."""
+    durations: dict[str, list[float]] = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                span = json.loads(line)
+                durations.setdefault(span["name"], []).append(span["duration_ms"])
+    report = {}
+    for name, values in durations.items():
+        values.sort()
+        report[name] = {
+            "count": len(values),
+            "p50": _percentile(values, 0.50),
+            "p90": _percentile(values, 0.90),
+            "p99": _percentile(values, 0.99),
+            "max": values[-1],
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Latency percentiles per stage from span files"
+    )
+    parser.add_argument("files", nargs="+", help="JSON-lines span files")
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+    report = stage_percentiles(args.files)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(
+            f"{'stage':<24}{'count':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+        )
+        for name, s in sorted(report.items(), key=lambda kv: kv[0]):
+            print(
+                f"{name:<24}{s['count']:>8}{s['p50']:>10.2f}{s['p90']:>10.2f}{s['p99']:>10.2f}{s['max']:>10.2f}"
+            )
\ No newline at end of file
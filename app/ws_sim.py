@@ -0,0 +1,587 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from collections import deque
+from typing import Callable, Optional
+from urllib.parse import urlencode, urlsplit
+from wsproto import ConnectionType, WSConnection
+from wsproto.events import (
+    AcceptConnection,
+    CloseConnection,
+    Message,
+    Ping,
+    RejectConnection,
+    Request,
+    TextMessage,
+)
+
+BACKEND_URL = os.getenv("SIM_BACKEND_URL", "http://localhost:8000")
+DEFAULT_USERNAME = "john_doe"
+DEFAULT_PASSWORD = "farmer123"
+PAGES = ("/", "/history", "/alerts")
+# DashboardState.start_auto_refresh sleeps this long between load_data calls.
+REFRESH_INTERVAL = 15
+EVENT_TIMEOUT = 30
+# Mean seconds a simulated user stays on a page while holding.
+THINK_TIME = 10
+# Engine.IO v4 / Socket.IO v5 packets on Reflex's event namespace.
+NAMESPACE = "/_event"
+EIO_OPEN = "0"
+EIO_PING = "2"
+EIO_PONG = "3"
+SIO_CONNECT = "40"
+SIO_DISCONNECT = "41"
+SIO_EVENT = "42"
+SIO_CONNECT_ERROR = "44"
+HYDRATED = "is_hydrated_rx_state_"
+
+
+class EventNames:
+    """Full event and state names, resolved from the app's state classes."""
+
+    def __init__(self):
+        from reflex.state import OnLoadInternalState, State
+        from reflex.utils.format import format_event_handler
+        from app.states.auth_state import AuthState
+        from app.states.dashboard_state import DashboardState
+
+        self.hydrate = format_event_handler(State.event_handlers["hydrate_and_load"])
+        self.on_load = format_event_handler(
+            OnLoadInternalState.event_handlers["on_load_internal"]
+        )
+        self.set_username = format_event_handler(
+            AuthState.event_handlers["set_username"]
+        )
+        self.set_password = format_event_handler(
+            AuthState.event_handlers["set_password"]
+        )
+        self.login = format_event_handler(AuthState.event_handlers["login"])
+        self.auth = AuthState.get_full_name()
+        self.dashboard = DashboardState.get_full_name()
+
+
+class WebSocket:
+    """Minimal text-frame websocket client on wsproto and asyncio streams."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.ws = WSConnection(ConnectionType.CLIENT)
+        self._messages: deque[str] = deque()
+        self._parts: list[str] = []
+        self.closed = False
+
+    @classmethod
+    async def connect(cls, url: str, subprotocols: list[str]) -> "WebSocket":
+        parts = urlsplit(url)
+        secure = parts.scheme == "wss"
+        reader, writer = await asyncio.open_connection(
+            parts.hostname, parts.port or (443 if secure else 80), ssl=secure or None
+        )
+        sock = cls(reader, writer)
+        target = parts.path + (f"?{parts.query}" if parts.query else "")
+        await sock._send(
+            Request(host=parts.netloc, target=target, subprotocols=subprotocols)
+        )
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                raise ConnectionError("connection closed during the handshake")
+            sock.ws.receive_data(data)
+            for event in sock.ws.events():
+                if isinstance(event, AcceptConnection):
+                    return sock
+                if isinstance(event, RejectConnection):
+                    raise ConnectionError(f"handshake rejected: {event.status_code}")
+
+    async def _send(self, event):
+        self.writer.write(self.ws.send(event))
+        await self.writer.drain()
+
+    async def send(self, text: str):
+        await self._send(Message(data=text))
+
+    async def recv(self) -> Optional[str]:
+        """The next text message, or None once the connection is closed."""
+        while not self._messages:
+            if self.closed:
+                return None
+            for event in self.ws.events():
+                if isinstance(event, TextMessage):
+                    self._parts.append(event.data)
+                    if event.message_finished:
+                        self._messages.append("".join(self._parts))
+                        self._parts.clear()
+                elif isinstance(event, Ping):
+                    await self._send(event.response())
+                elif isinstance(event, CloseConnection):
+                    self.closed = True
+                    try:
+                        await self._send(event.response())
+                    except (ConnectionError, RuntimeError):
+                        pass
+            if self._messages or self.closed:
+                continue
+            data = await self.reader.read(65536)
+            self.ws.receive_data(data or None)
+            if not data:
+                self.closed = True
+        return self._messages.popleft()
+
+    async def close(self):
+        if not self.closed:
+            self.closed = True
+            try:
+                await self._send(CloseConnection(code=1000))
+            except (ConnectionError, RuntimeError):
+                pass
+        self.writer.close()
+
+
+class Stats:
+    """Samples collected from all sessions, cleared at each ramp level."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.refresh_intervals: list[float] = []
+        self.timeouts = 0
+        self.errors = 0
+        self.updates = 0
+        self.update_bytes = 0
+
+    def latency(self, label: str, seconds: float):
+        self.latencies.setdefault(label, []).append(seconds)
+
+
+class Session:
+    """
+    One browser tab: hydrates, logs in, visits the pages and stays on them,
+    replying to Engine.IO pings and following redirects like the frontend.
+    """
+
+    def __init__(
+        self, index: int, names: EventNames, stats: Stats, username: str, password: str
+    ):
+        self.index = index
+        self.names = names
+        self.stats = stats
+        self.username = username
+        self.password = password
+        self.token = str(uuid.uuid4())
+        self.path = "/"
+        self.sock: Optional[WebSocket] = None
+        self.connected = False
+        self.last_refresh: Optional[float] = None
+        self.redirect: Optional[str] = None
+        self._waiters: list[tuple[Callable[[dict], bool], asyncio.Future]] = []
+        self._reader: Optional[asyncio.Task] = None
+
+    def _event(self, name: str, payload: Optional[dict] = None) -> dict:
+        return {
+            "name": name,
+            "payload": payload or {},
+            "router_data": {"pathname": self.path, "asPath": self.path},
+        }
+
+    def _hydrated(self, update: dict) -> bool:
+        return any(
+            delta.get(HYDRATED) is True for delta in update.get("delta", {}).values()
+        )
+
+    def _touches(self, state: str) -> Callable[[dict], bool]:
+        return lambda update: state in update.get("delta", {})
+
+    def _redirected(self, update: dict) -> bool:
+        return any(e.get("name") == "_redirect" for e in update.get("events", []))
+
+    async def connect(self, backend: str, version: str):
+        """Open the socket with the hydrate event in the CONNECT packet."""
+        parts = urlsplit(backend)
+        scheme = "wss" if parts.scheme == "https" else "ws"
+        query = urlencode({"EIO": 4, "transport": "websocket", "token": self.token})
+        started = time.perf_counter()
+        self.sock = await WebSocket.connect(
+            f"{scheme}://{parts.netloc}{NAMESPACE}/?{query}", [version]
+        )
+        opened = await self.sock.recv()
+        if not opened or not opened.startswith(EIO_OPEN):
+            raise ConnectionError(f"unexpected Engine.IO open packet: {opened!r}")
+        waiter = self._wait(self._hydrated)
+        auth = {"event": self._event(self.names.hydrate)}
+        await self.sock.send(f"{SIO_CONNECT}{NAMESPACE},{json.dumps(auth)}")
+        self._reader = asyncio.create_task(self._read())
+        await asyncio.wait_for(waiter, EVENT_TIMEOUT)
+        self.connected = True
+        self.stats.latency("connect", time.perf_counter() - started)
+
+    def _wait(self, predicate: Callable[[dict], bool]) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((predicate, future))
+        return future
+
+    async def _read(self):
+        try:
+            while (packet := await self.sock.recv()) is not None:
+                if packet == EIO_PING:
+                    await self.sock.send(EIO_PONG)
+                elif packet.startswith(f"{SIO_EVENT}{NAMESPACE},"):
+                    self.stats.update_bytes += len(packet)
+                    name, update = json.loads(packet[len(NAMESPACE) + 3 :])[:2]
+                    if name == "event":
+                        await self._handle(update)
+                elif packet.startswith(f"{SIO_CONNECT_ERROR}{NAMESPACE}"):
+                    raise ConnectionError(f"connect refused: {packet}")
+                elif packet.startswith(f"{SIO_DISCONNECT}{NAMESPACE}"):
+                    break
+        except (ConnectionError, OSError) as e:
+            logging.debug(f"Session {self.index} lost its socket: {e}")
+        finally:
+            self.connected = False
+            for _, future in self._waiters:
+                if not future.done():
+                    future.set_exception(ConnectionError("socket closed"))
+            self._waiters.clear()
+
+    async def _handle(self, update: dict):
+        now = time.perf_counter()
+        self.stats.updates += 1
+        # Only the auto-refresh loop changes DashboardState once the first
+        # load is done, and it keeps running on every page.
+        if self.names.dashboard in update.get("delta", {}):
+            if self.last_refresh is not None:
+                self.stats.refresh_intervals.append(now - self.last_refresh)
+            self.last_refresh = now
+        pending = []
+        for predicate, future in self._waiters:
+            if not future.done() and predicate(update):
+                future.set_result(now)
+            elif not future.done():
+                pending.append((predicate, future))
+        self._waiters = pending
+        for event in update.get("events", []):
+            if event.get("name") == "_redirect":
+                self.redirect = event.get("payload", {}).get("path")
+
+    async def call(
+        self,
+        label: str,
+        name: str,
+        until: Callable[[dict], bool],
+        payload: Optional[dict] = None,
+    ) -> bool:
+        """Send one event and record the time until an update satisfies `until`."""
+        waiter = self._wait(until)
+        started = time.perf_counter()
+        try:
+            await self.sock.send(
+                f"{SIO_EVENT}{NAMESPACE},"
+                + json.dumps(["event", self._event(name, payload)])
+            )
+            await asyncio.wait_for(waiter, EVENT_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            return False
+        except (ConnectionError, OSError):
+            self.stats.errors += 1
+            return False
+        self.stats.latency(label, time.perf_counter() - started)
+        self.stats.latency("all", time.perf_counter() - started)
+        return True
+
+    async def navigate(self, path: str, label: Optional[str] = None) -> bool:
+        self.path = path
+        return await self.call(
+            label or f"page {path}", self.names.on_load, self._hydrated
+        )
+
+    async def login(self) -> bool:
+        auth = self._touches(self.names.auth)
+        await self.call(
+            "set_username", self.names.set_username, auth, {"value": self.username}
+        )
+        await self.call(
+            "set_password", self.names.set_password, auth, {"value": self.password}
+        )
+        return await self.call("login", self.names.login, self._redirected)
+
+    async def run(self, backend: str, version: str, think: float, stop: asyncio.Event):
+        try:
+            await self.connect(backend, version)
+            if not await self.login():
+                raise ConnectionError(f"login failed for {self.username}")
+            # The frontend follows the redirect, which sends on_load_internal.
+            await self.navigate(self.redirect or "/", "redirect")
+            for path in PAGES[1:] + ("/",):
+                await self.navigate(path)
+            rng = random.Random(self.index)
+            while not stop.is_set() and self.connected:
+                if think <= 0:
+                    await stop.wait()
+                    break
+                try:
+                    await asyncio.wait_for(stop.wait(), rng.expovariate(1 / think))
+                except asyncio.TimeoutError:
+                    await self.navigate(rng.choice(PAGES))
+        except (ConnectionError, OSError, asyncio.TimeoutError) as e:
+            self.stats.errors += 1
+            logging.warning(f"Session {self.index}: {e or type(e).__name__}")
+        finally:
+            if self.sock is not None:
+                await self.sock.close()
+            if self._reader is not None:
+                self._reader.cancel()
+
+
+class ProcessSampler:
+    """CPU time and RSS of a backend process and its children, from /proc."""
+
+    def __init__(self, pid: Optional[int]):
+        self.pid = pid
+        self.ticks = os.sysconf("SC_CLK_TCK")
+        self.page = os.sysconf("SC_PAGE_SIZE")
+
+    def _tree(self) -> list[int]:
+        parents: dict[int, list[int]] = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            parents.setdefault(ppid, []).append(int(entry))
+        pids, todo = [], [self.pid]
+        while todo:
+            pid = todo.pop()
+            pids.append(pid)
+            todo.extend(parents.get(pid, []))
+        return pids
+
+    def sample(self) -> Optional[dict]:
+        if self.pid is None:
+            return None
+        cpu = rss = 0
+        for pid in self._tree():
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+                with open(f"/proc/{pid}/statm") as f:
+                    rss += int(f.read().split()[1]) * self.page
+            except (OSError, IndexError, ValueError):
+                continue
+            cpu += int(fields[11]) + int(fields[12])
+        return {"at": time.monotonic(), "cpu_s": cpu / self.ticks, "rss": rss}
+
+
+def db_queries(backend: str) -> Optional[float]:
+    """Total SQL statements the backend has run, from its /metrics endpoint."""
+    import requests
+
+    try:
+        response = requests.get(f"{backend}/metrics", timeout=5)
+    except requests.RequestException:
+        return None
+    if not response.ok:
+        return None
+    return sum(
+        float(line.rsplit(" ", 1)[1])
+        for line in response.text.splitlines()
+        if line.startswith("agrotech_db_query_duration_seconds_count")
+    )
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _summary(values: list[float]) -> dict:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(1000 * _percentile(ordered, 0.50), 1),
+        "p95_ms": round(1000 * _percentile(ordered, 0.95), 1),
+        "p99_ms": round(1000 * _percentile(ordered, 0.99), 1),
+        "max_ms": round(1000 * ordered[-1], 1) if ordered else 0.0,
+    }
+
+
+class Simulator:
+    def __init__(
+        self,
+        backend: str,
+        accounts: list[tuple[str, str]],
+        pid: Optional[int] = None,
+        think: float = THINK_TIME,
+        ramp_rate: float = 10,
+    ):
+        from reflex import constants
+
+        self.backend = backend.rstrip("/")
+        self.version = constants.Reflex.VERSION
+        self.accounts = accounts
+        self.think = think
+        self.ramp_rate = ramp_rate
+        self.names = EventNames()
+        self.stats = Stats()
+        self.sampler = ProcessSampler(pid)
+        self.stop = asyncio.Event()
+        self.sessions: list[Session] = []
+        self.tasks: list[asyncio.Task] = []
+
+    async def _add(self, count: int):
+        for _ in range(count):
+            index = len(self.sessions)
+            username, password = self.accounts[index % len(self.accounts)]
+            session = Session(index, self.names, self.stats, username, password)
+            self.sessions.append(session)
+            self.tasks.append(
+                asyncio.create_task(
+                    session.run(self.backend, self.version, self.think, self.stop)
+                )
+            )
+            await asyncio.sleep(1 / self.ramp_rate)
+
+    async def level(self, users: int, settle: float, hold: float) -> dict:
+        """Grow to `users` sessions, let them settle, then measure for `hold` s."""
+        await self._add(users - len(self.sessions))
+        await asyncio.sleep(settle)
+        ramp = dict(self.stats.latencies)
+        self.stats = Stats()
+        for session in self.sessions:
+            session.stats = self.stats
+        before = self.sampler.sample()
+        queries_before = await asyncio.to_thread(db_queries, self.backend)
+        started = time.monotonic()
+        await asyncio.sleep(hold)
+        elapsed = time.monotonic() - started
+        after = self.sampler.sample()
+        queries_after = await asyncio.to_thread(db_queries, self.backend)
+        stats = self.stats
+        # Sessions whose dashboard has not refreshed for two intervals.
+        now = time.perf_counter()
+        stale_after = 2 * REFRESH_INTERVAL
+        result = {
+            "users": users,
+            "connected": sum(s.connected for s in self.sessions),
+            "seconds": round(elapsed, 1),
+            "timeouts": stats.timeouts,
+            "errors": stats.errors,
+            "updates_per_s": round(stats.updates / elapsed, 1),
+            "update_kb_per_s": round(stats.update_bytes / 1024 / elapsed, 1),
+            "latency": {
+                label: _summary(values) for label, values in stats.latencies.items()
+            },
+            "ramp_latency": {label: _summary(values) for label, values in ramp.items()},
+            "refresh_interval": _summary(stats.refresh_intervals),
+            "stalled": sum(
+                s.connected
+                and (s.last_refresh is None or now - s.last_refresh > stale_after)
+                for s in self.sessions
+            ),
+        }
+        if before and after:
+            result["cpu_percent"] = round(
+                100 * (after["cpu_s"] - before["cpu_s"]) / (after["at"] - before["at"]),
+                1,
+            )
+            result["rss_mb"] = round(after["rss"] / 2**20, 1)
+        if queries_before is not None and queries_after is not None:
+            result["db_queries_per_s"] = round(
+                (queries_after - queries_before) / elapsed, 1
+            )
+        all_ = result["latency"].get("all", _summary([]))
+        logging.info(
+            f"{users} users ({result['connected']} connected): event p50 {all_['p50_ms']} ms, "
+            f"p95 {all_['p95_ms']} ms, refresh p95 {result['refresh_interval']['p95_ms'] / 1000:.1f} s "
+            f"({result['stalled']} stalled), "
+            f"CPU {result.get('cpu_percent', '-')}%, RSS {result.get('rss_mb', '-')} MB, "
+            f"{result.get('db_queries_per_s', '-')} queries/s"
+        )
+        return result
+
+    async def ramp(self, levels: list[int], settle: float, hold: float) -> dict:
+        results = []
+        try:
+            for users in levels:
+                results.append(await self.level(users, settle, hold))
+        finally:
+            self.stop.set()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+        return {
+            "backend": self.backend,
+            "think_s": self.think,
+            "refresh_interval_s": REFRESH_INTERVAL,
+            "levels": results,
+        }
+
+
+def _accounts(args) -> list[tuple[str, str]]:
+    """One shared login, or one per generated user (see app.generate_data)."""
+    if args.accounts:
+        return [
+            (f"{args.prefix}_user{i:04d}", args.password)
+            for i in range(1, args.accounts + 1)
+        ]
+    return [(args.username, args.password)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Hold N headless dashboard sessions against a Reflex backend"
+    )
+    parser.add_argument("--backend", default=BACKEND_URL)
+    parser.add_argument(
+        "--users", default="10,50,100", help="comma-separated session counts"
+    )
+    parser.add_argument(
+        "--hold", type=float, default=60, help="seconds measured per level"
+    )
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=REFRESH_INTERVAL,
+        help="seconds between reaching a level and measuring it",
+    )
+    parser.add_argument(
+        "--ramp-rate", type=float, default=10, help="new sessions per second"
+    )
+    parser.add_argument(
+        "--think",
+        type=float,
+        default=THINK_TIME,
+        help="mean seconds per page while holding; 0 stays on the dashboard",
+    )
+    parser.add_argument("--username", default=DEFAULT_USERNAME)
+    parser.add_argument("--password", default=None)
+    parser.add_argument(
+        "--accounts",
+        type=int,
+        default=0,
+        help="spread sessions over this many generated users",
+    )
+    parser.add_argument("--prefix", default="gen")
+    parser.add_argument(
+        "--pid", type=int, help="backend process id, for CPU and memory"
+    )
+    parser.add_argument("--out", help="write the results as JSON")
+    args = parser.parse_args()
+    if args.password is None:
+        args.password = "password123" if args.accounts else DEFAULT_PASSWORD
+    levels = sorted({int(u) for u in args.users.split(",") if u.strip()})
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    simulator = Simulator(
+        args.backend, _accounts(args), args.pid, args.think, args.ramp_rate
+    )
+    report = asyncio.run(simulator.ramp(levels, args.settle, args.hold))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.out}")
\ No newline at end of file